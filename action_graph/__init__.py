@@ -1,6 +1,6 @@
 #! /usr/bin/env python3
 
-from action_graph.action import Action, ActionStatus, State
+from action_graph.action import Action, ActionStatus, Decrement, GreaterEqual, Increment, LessThan, State
 from action_graph.agent import Agent
 
 name = 'action_graph'
@@ -9,6 +9,10 @@ __all__ = [
     'State',
     'Action',
     'ActionStatus',
+    'Increment',
+    'Decrement',
+    'GreaterEqual',
+    'LessThan',
     'ActionFailedException',
     'ActionAbortedException',
     'ActionTimedOutException',
@@ -19,14 +23,9 @@ __all__ = [
     '__version__',
 ]
 
-# logging setup
+# logging: the library does not configure logging on import;
+# see action_graph.log for console / non-blocking (queue based) logging
 import logging
 
-console = logging.StreamHandler()
-console.setLevel(logging.INFO)
-#
-formatter = logging.Formatter('>>>%(levelname)s > %(message)s')
-console.setFormatter(formatter)
-#
-logging.getLogger('').addHandler(console)
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
@@ -1,8 +1,13 @@
 #! /usr/bin/env python3
 
-from copy import deepcopy
+import multiprocessing
+import pickle
+from concurrent.futures import Future
 from enum import auto, Enum
-from threading import Thread
+from multiprocessing.connection import wait
+from threading import Condition, Event, Thread
+from time import monotonic, perf_counter
+from typing import Any, Callable, Dict, Iterable, List, Tuple
 
 
 class State(dict):
@@ -11,6 +16,180 @@ class State(dict):
         return hash(tuple(frozenset(sorted(self.items()))))
 
 
+class Increment():
+    """Relative effect on a numeric state variable: adds `amount` to its current value (0 if it is not set)"""
+
+    def __init__(self, amount: float = 1) -> None:
+        self.amount = amount
+
+    @property
+    def delta(self) -> float:
+        return self.amount
+
+    def apply(self, value: float) -> float:
+        return value + self.delta
+
+    def __eq__(self, __o: object) -> bool:
+        return isinstance(__o, Increment) and __o.delta == self.delta
+
+    def __hash__(self):
+        return hash(('Increment', self.delta))
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.amount})'
+
+
+class Decrement(Increment):
+    """Relative effect on a numeric state variable: subtracts `amount` from its current value"""
+
+    @property
+    def delta(self) -> float:
+        return -self.amount
+
+
+class Comparison():
+    """
+    Precondition (or goal) value met by a range of values instead of a single one.
+    It compares equal to the values that meet it; i.e. it can be used wherever state values are compared.
+    """
+
+    def __init__(self, bound: float) -> None:
+        self.bound = bound
+
+    def holds(self, value: Any) -> bool:
+        raise NotImplementedError()
+
+    def __eq__(self, __o: object) -> bool:
+        if isinstance(__o, Comparison):
+            return type(__o) is type(self) and __o.bound == self.bound
+        try:
+            return bool(self.holds(__o))
+        except TypeError:  # e.g. not a number
+            return False
+
+    def __hash__(self):
+        return hash((self.__class__.__name__, self.bound))
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.bound!r})'
+
+
+class GreaterEqual(Comparison):
+
+    def holds(self, value: Any) -> bool:
+        return value >= self.bound
+
+
+class LessThan(Comparison):
+
+    def holds(self, value: Any) -> bool:
+        return value < self.bound
+
+
+class Subscription():
+    """Subscription to changes of (some) keys of an ObservableState"""
+
+    def __init__(self, registry: dict, keys: tuple, callback: Callable[[Any, Any, Any], None]) -> None:
+        self.__registry = registry
+        self.keys = keys
+        self.callback = callback
+
+    def cancel(self):
+        for key in self.keys:
+            subscriptions = self.__registry.get(key)
+            if subscriptions and self in subscriptions:
+                subscriptions.remove(self)
+                if not subscriptions:
+                    del self.__registry[key]
+
+
+class ObservableState(State):
+    """State that notifies its subscribers when the value of a key changes; callback(key, old, new)"""
+
+    MISSING = object()  # old/new value of a key that does not exist
+    ANY = object()  # subscribe to all keys
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._subscriptions: Dict[Any, List[Subscription]] = {}
+
+    def subscribe(self, keys: Iterable[Any], callback: Callable[[Any, Any, Any], None]) -> Subscription:
+        """
+        Call `callback(key, old_value, new_value)` whenever the value of one of the keys changes.
+
+        :param keys:Iterable: Keys to watch; None watches all keys
+        :param callback:Callable: Called in the thread that changes the state
+        :return:Subscription: cancel() it to unsubscribe
+        """
+
+        keys = (self.ANY,) if keys is None else tuple(keys)
+        subscription = Subscription(self._subscriptions, keys, callback)
+        for key in keys:
+            self._subscriptions.setdefault(key, []).append(subscription)
+        return subscription
+
+    def handover(self, state: dict) -> 'ObservableState':
+        """
+        Replacement of this state (by `state`) that keeps the subscriptions; subscribers are notified of the differences.
+        """
+
+        successor = ObservableState(state)
+        successor._subscriptions = self._subscriptions
+        if self._subscriptions:
+            for key in set(self) | set(successor):
+                old, new = self.get(key, self.MISSING), successor.get(key, self.MISSING)
+                if old is self.MISSING or new is self.MISSING or old != new:
+                    successor._notify(key, old, new)
+        return successor
+
+    def _notify(self, key: Any, old: Any, new: Any):
+        subscriptions = self._subscriptions.get(key, []) + self._subscriptions.get(self.ANY, [])
+        for subscription in subscriptions:
+            subscription.callback(key, old, new)
+
+    def __setitem__(self, key: Any, value: Any):
+        if not self._subscriptions:
+            return super().__setitem__(key, value)
+        old = self.get(key, self.MISSING)
+        super().__setitem__(key, value)
+        if old is self.MISSING or old != value:
+            self._notify(key, old, value)
+
+    def __delitem__(self, key: Any):
+        old = self[key]
+        super().__delitem__(key)
+        if self._subscriptions:
+            self._notify(key, old, self.MISSING)
+
+    def update(self, *args, **kwargs):
+        if not self._subscriptions:
+            return super().update(*args, **kwargs)
+        for k, v in dict(*args, **kwargs).items():
+            self[k] = v
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key: Any, *default) -> Any:
+        if key not in self:
+            return super().pop(key, *default)
+        value = self[key]
+        del self[key]
+        return value
+
+    def popitem(self) -> tuple:
+        key, value = super().popitem()
+        if self._subscriptions:
+            self._notify(key, value, self.MISSING)
+        return key, value
+
+    def clear(self):
+        for key in list(self):
+            del self[key]
+
+
 class ActionStatus(Enum):
     FAILURE = auto()
     SUCCESS = auto()
@@ -20,28 +199,230 @@ class ActionStatus(Enum):
     REVOKED = auto()
 
 
+class CancellationToken():
+    """Cooperative cancellation of a running action; on_execute should check `cancelled` (or wait() on it)"""
+
+    def __init__(self) -> None:
+        self.__event = Event()
+        self.reason: str = None
+        self.cancelled_at: float = None  # time.perf_counter
+
+    @property
+    def cancelled(self) -> bool:
+        return self.__event.is_set()
+
+    def cancel(self, reason: str = None):
+        if not self.__event.is_set():
+            self.reason = reason
+            self.cancelled_at = perf_counter()
+            self.__event.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Sleep until cancelled or until the timeout expires.
+
+        :return:bool: True if cancelled
+        """
+
+        return self.__event.wait(timeout)
+
+
+class _Watchdog():
+    """Cancels actions that exceed their timeout; a single thread watches all running actions"""
+
+    def __init__(self) -> None:
+        self.__cond = Condition()
+        self.__deadlines: Dict[int, Tuple[float, 'Action']] = {}
+        self.__thread: Thread = None
+
+    def watch(self, action: 'Action', timeout: float):
+        with self.__cond:
+            self.__deadlines[id(action)] = (monotonic() + timeout, action)
+            if self.__thread is None:
+                self.__thread = Thread(target=self.__watch_loop, name='action_graph.watchdog', daemon=True)
+                self.__thread.start()
+            self.__cond.notify()
+
+    def unwatch(self, action: 'Action'):
+        with self.__cond:
+            self.__deadlines.pop(id(action), None)
+
+    def __watch_loop(self):
+        while True:
+            with self.__cond:
+                expired = []
+                while not expired:
+                    now = monotonic()
+                    expired = [k for k, (deadline, _) in self.__deadlines.items() if deadline <= now]
+                    if not expired:
+                        next_deadline = min((d for d, _ in self.__deadlines.values()), default=None)
+                        self.__cond.wait(None if next_deadline is None else next_deadline - now)
+                actions = [self.__deadlines.pop(k)[1] for k in expired]
+            for action in actions:
+                action._time_out()
+
+
+_watchdog = _Watchdog()
+
+
 class Action():
 
     effects: State = {}
     preconditions: State = {}
 
     cost: float = 1.0
-    status: ActionStatus = ActionStatus.SUCCESS
     timeout: float = 86_400.0  # 24 hours
     allow_async: bool = False
+    # run on_execute in a separate process; it can then be terminated when cancelled/timed out.
+    # on_execute runs on a copy of the action (its class must be importable; the picklable attributes are copied;
+    # its agent is not: self.agent is None); only the status is passed back.
+    run_in_process: bool = False
+    # multiprocessing start method of these processes; 'spawn' does not inherit the agent's threads
+    process_start_method: str = 'spawn'
+    # time allowed for on_execute to return after cancellation, before the agent moves on
+    cancel_grace: float = 1.0
+    # how long (seconds) a result of check_runtime_precondition from a pre-flight (see Agent.preflight) stays valid;
+    # 0: checked right before execution
+    runtime_check_validity: float = 0.0
+    # resources held while the action executes (see ResourceManager): exclusively; or shared with other shared claims
+    resources: Iterable = ()
+    shared_resources: Iterable = ()
+
+    _signature: tuple = None
+    _is_templated: bool = False
+
+    _status: ActionStatus = ActionStatus.SUCCESS
+    # execution timestamps (time.perf_counter); used for telemetry
+    _started_at: float = None
+    _finished_at: float = None
+    _status_changed_at: float = None
+
+    # cancellation of the current run; wakes up whoever waits for a status change
+    cancellation: CancellationToken = None
+    # resolved with the final status when on_execute returns
+    completion: Future = None
+    _wakeup: Event = None
+    _timed_out: bool = False
+    _process = None
+    # thread of the current run; created by _execute (not per instance: plans hold many copies of the actions)
+    __exec_thread: Thread = None
+    # loaded action this one is a (bound) copy of; see PlanStep
+    _definition: 'Action' = None
 
     def __init__(self, agent=None) -> None:
         self.agent = agent
-        self.__exec_thread: Thread = Thread(target=self.on_execute, args=())
 
     def check_runtime_precondition(self, outcome: State) -> bool:
         return True
 
+    @property
+    def status(self) -> ActionStatus:
+        return self._status
+
+    @status.setter
+    def status(self, status: ActionStatus):
+        self._status = status
+        self._status_changed_at = perf_counter()
+        if self._wakeup is not None:
+            self._wakeup.set()
+
     def _execute(self, outcome: State):
+        self.cancellation = CancellationToken()
+        self.completion = Future()
+        self._wakeup = Event()
+        self._timed_out = False
+        self._started_at = self._finished_at = None
         self.status = ActionStatus.RUNNING
-        self.__exec_thread = Thread(target=self.on_execute, args=(outcome,))
+        self.__exec_thread = Thread(target=self.__run, args=(outcome,))
         self.__exec_thread.start()
 
+    def __run(self, outcome: State):
+        self._started_at = perf_counter()
+        _watchdog.watch(self, self.timeout)
+        try:
+            if self.run_in_process:
+                self.__run_in_process(outcome)
+            else:
+                self.on_execute(outcome)
+        finally:
+            _watchdog.unwatch(self)
+            self._finished_at = perf_counter()
+            self._wakeup.set()
+            self.completion.set_result(self.status)
+
+    def __run_in_process(self, outcome: State):
+        context = multiprocessing.get_context(self.process_start_method)
+        receiver, sender = context.Pipe(duplex=False)
+        self._process = context.Process(target=_process_main, daemon=True,
+                                        args=(type(self), self.__process_attributes(), outcome, sender))
+        self._process.start()
+        sender.close()
+        if self.cancellation.cancelled:  # cancelled while starting
+            self._process.terminate()
+        wait([receiver, self._process.sentinel])
+        try:
+            status = receiver.recv() if receiver.poll() else None
+        except EOFError:
+            status = None
+        self._process.join()
+        receiver.close()
+        self._process = None
+        if status is None:  # terminated; or died without reporting
+            status = ActionStatus.ABORTED if self.cancellation.cancelled else ActionStatus.FAILURE
+        self.status = status
+
+    def __process_attributes(self) -> Dict[str, Any]:
+        # the picklable (definition) attributes of the action; not the agent or the run time state
+        attributes = {}
+        for k, v in self.__dict__.items():
+            if k in ('agent', 'cancellation', 'completion') or k.startswith('_'):
+                continue
+            try:
+                pickle.dumps(v)
+            except Exception:
+                continue
+            attributes[k] = v
+        return attributes
+
+    def cancel(self, reason: str = None):
+        """
+        Request the running action to stop: cancels its token (cooperative);
+        actions running in a separate process are terminated.
+        """
+
+        if self.cancellation is None:
+            return
+        self.cancellation.cancel(reason)
+        process = self._process
+        if process is not None and process.is_alive():
+            process.terminate()
+        self._wakeup.set()
+
+    def _time_out(self):
+        self._timed_out = True
+        self.cancel('timeout')
+
+    def _wait(self):
+        # block until the status changes, execution ends or the action is cancelled
+        self._wakeup.wait()
+
+    def _join(self, timeout: float = None) -> bool:
+        if self.__exec_thread is None:
+            return True
+        self.__exec_thread.join(timeout)
+        return not self.__exec_thread.is_alive()
+
+    def _run_time(self) -> float:
+        # run time of the last execution: until on_execute returned or, if the agent moved on before that,
+        # until the status was set
+        if self._started_at is None:
+            return None
+        if self._finished_at is not None:
+            return self._finished_at - self._started_at
+        if self._status_changed_at is not None and self._status_changed_at >= self._started_at:
+            return self._status_changed_at - self._started_at
+        return None
+
     def on_execute(self, outcome: State):
         # NOTE: Any overrides of this method has to explicitly set
         # the status either one of SUCCESS, FAILURE, ABORTED;
@@ -49,7 +430,7 @@ class Action():
         self.status = ActionStatus.SUCCESS
 
     def is_running(self):
-        return self.__exec_thread.is_alive()
+        return self.__exec_thread is not None and self.__exec_thread.is_alive()
 
     def on_success(self, outcome: State = None):
         pass
@@ -72,21 +453,29 @@ class Action():
     def apply_effects(self, outcome: State, state: State):
         # update the state with the predicted outcomes
         for k, v in self.effects.items():
-            state[k] = v
+            state[k] = v.apply(state.get(k, 0)) if isinstance(v, Increment) else v
 
     def __repr__(self) -> str:
         return self.__class__.__name__
 
     def __hash__(self):
-        return hash(self.__class__.__name__)
+        return hash(self._identity())
 
     def __eq__(self, __o: object) -> bool:
-        if self.__class__.__name__ == __o.__class__.__name__ and \
-                self.cost == __o.cost and \
-                self.__check_eq__(self.effects, __o.effects) and \
-                self.preconditions == __o.preconditions:
+        if self is __o:
+            return True
+        if not isinstance(__o, Action):
+            return False
+        s1, s2 = self.signature(), __o.signature()
+        if s1[0] != s2[0] or s1[1] != s2[1]:  # identity / cost
+            return False
+        if s1 == s2:
             return True
-        return False
+        if not (self._is_templated or __o._is_templated):
+            # fully bound steps with different signatures
+            return False
+        # templated (unbound) effects match any value
+        return self.__check_eq__(self.effects, __o.effects) and self.preconditions == __o.preconditions
 
     def __check_eq__(self, e1, e2):
         for k in e1.keys():
@@ -98,20 +487,55 @@ class Action():
             #
         return True
 
+    def _identity(self) -> str:
+        return self.__class__.__name__
+
+    def signature(self) -> tuple:
+        """
+        Identity of the (bound) action step: name, cost, effects and preconditions.
+        Computed once, on first use; the effects must not be re-bound after that.
+        """
+
+        if self._signature is None:
+            self._is_templated = Ellipsis in self.effects.values()
+            self._signature = (self._identity(), self.cost,
+                               tuple(sorted(self.effects.items(), key=lambda kv: repr(kv[0]))),
+                               tuple(sorted(self.preconditions.items(), key=lambda kv: repr(kv[0]))))
+        return self._signature
+
     def __copy__(self):
         # instantiate an object of Action (or its sub-class) type
         a_copy = type(self)(self.agent)
-        # shallow copy
-        a_copy.cost = self.cost
+        # shallow copy of the definition (attributes set per instance); not of the state of a run
+        a_copy.__dict__.update((k, v) for k, v in self.__dict__.items() if k not in _RUN_STATE)
         a_copy.status = self.status
-        a_copy.timeout = self.timeout
-        # deep copy
-        memo = {id(self): a_copy}
-        a_copy.effects = deepcopy(self.effects, memo)
-        a_copy.preconditions = deepcopy(self.preconditions, memo)
+        a_copy._definition = self._definition if self._definition is not None else self
+        # the effects are bound per copy; the values (as those of the preconditions) are shared, not copied
+        a_copy.effects = dict(self.effects)
+        a_copy.preconditions = self.preconditions
         return a_copy
 
 
+# instance attributes that are not part of the definition of an action (not copied by Action.__copy__)
+_RUN_STATE = frozenset(('agent', 'effects', 'preconditions', '_signature', '_is_templated', '_definition',
+                        '_status', '_status_changed_at', '_started_at', '_finished_at', 'cancellation',
+                        'completion', '_wakeup', '_timed_out', '_process', '_Action__exec_thread'))
+
+
+def _process_main(cls: type, attributes: Dict[str, Any], outcome: State, sender):
+    # runs in the child process (see Action.run_in_process)
+    action = cls.__new__(cls)
+    action.__dict__.update(attributes)
+    action.agent = None
+    action.cancellation = CancellationToken()
+    action._status = ActionStatus.RUNNING
+    try:
+        action.on_execute(outcome)
+    finally:
+        sender.send(action._status)
+        sender.close()
+
+
 class ImpossibleAction(Action):
     cost = float('inf')
 
@@ -138,3 +562,11 @@ class ActionTimedOutException(Exception):
 
 class ActionRevokedException(Exception):
     pass
+
+
+class AsyncActionFailedException(ActionFailedException):
+    """An async action (allow_async) did not succeed; detected after its effects were applied"""
+
+    def __init__(self, message: str, action: Action) -> None:
+        super().__init__(message)
+        self.action = action
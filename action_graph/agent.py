@@ -1,39 +1,279 @@
 #! /usr/bin/env python3
 
 import logging
-from time import sleep, time
-from typing import Iterable, List
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from heapq import heappop, heappush
+from itertools import count, islice
+from threading import Condition, Event, Lock, RLock, Thread
+from time import monotonic, perf_counter
+from typing import Any, Callable, Dict, Iterable, List, Tuple
 
-from action_graph.action import (Action, ActionStatus, State,
+from action_graph.action import (Action, ActionStatus, State, ObservableState, Subscription,
                                  ActionTimedOutException, ActionAbortedException, 
-                                 ActionFailedException, ActionRevokedException)
+                                 ActionFailedException, ActionRevokedException, AsyncActionFailedException)
+from action_graph.journal import Journal
+from action_graph.macro import MacroAction, MacroLearner, expand_macros
 from action_graph.planner import Planner, PlanningFailedException
+from action_graph.reliability import ActionStatistics
+from action_graph.resources import ResourceManager
+from action_graph.telemetry import Telemetry
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()  # marks state keys that did not exist
+
+
+class _PlanSuspended(GeneratorExit):
+    """Thrown into plan_and_execute to set its goal aside (e.g. preempted); it is neither finished nor failed"""
+    pass
+
+
+class GoalMonitor():
+    """Keeps track of whether a goal is met; re-evaluated only when the state keys of the goal change"""
+
+    def __init__(self, state: ObservableState, goal: State) -> None:
+        self.goal = goal
+        self.__unmet = {k for k, v in goal.items() if k not in state or state[k] != v}
+        self.__subscription = state.subscribe(goal.keys(), self.__on_change)
+
+    @property
+    def met(self) -> bool:
+        return not self.__unmet
+
+    def close(self):
+        self.__subscription.cancel()
+
+    def __on_change(self, key: Any, old: Any, new: Any):
+        if new is not ObservableState.MISSING and new == self.goal[key]:
+            self.__unmet.discard(key)
+        else:
+            self.__unmet.add(key)
+
+
+class PlanValidator():
+    """Invalidates a plan when a state key it depends on is changed by anything other than the agent's own actions"""
+
+    def __init__(self, agent: 'Agent') -> None:
+        self.__agent = agent
+        self.__keys: set = set()
+        self.__changed: bool = False
+        self.__subscription = agent.subscribe(None, self.__on_change)
+
+    def watch(self, plan: List[Action]):
+        self.__keys = {k for action in plan for k in list(action.preconditions) + list(action.effects)}
+        self.__changed = False
+
+    def is_valid(self, plan: List[Action]) -> bool:
+        """
+        Whether the rest of the plan (after its first, executed, step) can be executed as is.
+        """
+
+        if len(plan) < 2 or self.__changed:
+            return False
+        # the executed step has to have had its effects
+        return plan[0].status == ActionStatus.SUCCESS or plan[0].allow_async
+
+    def close(self):
+        self.__subscription.cancel()
+
+    def __on_change(self, key: Any, old: Any, new: Any):
+        if key in self.__keys and not self.__agent._is_applying_effects():
+            self.__changed = True
+
+
+class GoalTicket():
+    """Goal submitted to the goal scheduler of an agent (see Agent.submit_goal); its progress and queue metrics"""
+
+    def __init__(self, goal: State, priority: int, sequence: int) -> None:
+        self.goal = goal
+        self.priority = priority
+        self.sequence = sequence
+        # time.perf_counter
+        self.submitted_at: float = perf_counter()
+        self.started_at: float = None   # first started
+        self.finished_at: float = None
+        self.run_time: float = 0.0      # time pursued (not counting the time it was preempted)
+        self.preemptions: int = 0
+        # resolved with the outcome (ActionStatus); or the exception that stopped plan_and_execute
+        self.completion: Future = Future()
+        self._plan: List[Action] = None  # remaining plan when preempted
+
+    @property
+    def queue_latency(self) -> float:
+        """Time from submission until the goal was first pursued (seconds)"""
+
+        return self.started_at - self.submitted_at if self.started_at is not None else None
+
+    def result(self, timeout: float = None) -> ActionStatus:
+        """
+        Wait for the goal to be pursued to the end.
+
+        :return:ActionStatus: SUCCESS (goal met) or REVOKED
+        """
+
+        return self.completion.result(timeout)
+
+    def __lt__(self, other: 'GoalTicket') -> bool:
+        # highest priority first; first come first served within a priority
+        return (-self.priority, self.sequence) < (-other.priority, other.sequence)
+
+    def __repr__(self) -> str:
+        return f'GoalTicket({self.goal}, priority={self.priority})'
 
 
 class Agent:
     """Autonomous agent to monitor system state, keep track of feasible actions, generate plans and achive desired goals"""
 
-    __planner: Planner = Planner([])
     __abort: bool = False
     __revoked: bool = False
 
-    def __init__(self, agent_name=None) -> None:
+    def __init__(self, agent_name=None, telemetry: Telemetry = None, max_async_actions: int = None,
+                 reliability: ActionStatistics = None, macro_learner: MacroLearner = None,
+                 journal: Journal = None, resource_manager: ResourceManager = None) -> None:
         if not agent_name:
             agent_name = self.__class__.__name__
         self.name = agent_name
         #
-        self.state: State = {}
+        self.__state: ObservableState = ObservableState()
         self.__actions: List[Action] = []
+        self.__running: Dict[int, Action] = {}
+        self.__applying_effects: bool = False
+        # state updates queued by submit_state; applied (coalesced) by flush_state
+        self.__pending_states: deque = deque()
+        self.__state_lock: RLock = RLock()
+        self.__ingestion_thread: Thread = None
+        self.__ingestion_stop: Event = None
+        # outstanding async actions and the state changes (key: (previous, applied) value) their effects made
+        self.__async: Dict[int, Tuple[Action, Dict[Any, Tuple[Any, Any]]]] = {}
+        self.max_async_actions: int = max_async_actions
+        # set when an async action completes, or on abort/revoke
+        self.__async_wakeup: Event = Event()
+        # execution records (per action / per plan) are handed to the telemetry, if set
+        self.telemetry: Telemetry = telemetry
+        #
+        self.__planner: Planner = Planner([])
+        self.reliability = reliability
+        # if set, observes the generated plans (see load_macros)
+        self.macro_learner: MacroLearner = macro_learner
+        # if set, records the state changes, plans and action outcomes (see resume)
+        self.journal: Journal = journal
+        self.__resuming: bool = False
+        if journal is not None:
+            self.subscribe(None, self.__journal_change)
+        # if set, actions execute only once they hold their claims (shared with other agents)
+        self.resource_manager: ResourceManager = resource_manager
+        # pre-flight results of the runtime precondition checks: step: (result, valid until (monotonic))
+        self.__runtime_checks: Dict[Any, Tuple[bool, float]] = {}
+        self.__runtime_checks_lock: Lock = Lock()
+        self.preflight_workers: int = 8
+        # goal scheduler: queued goals (a heap of GoalTickets), pursued by a background thread
+        self.__goals: List[GoalTicket] = []
+        self.__goals_changed: Condition = Condition()
+        self.__goal_sequence = count()
+        self.__scheduler_thread: Thread = None
+        self.__scheduler_stop: Event = None
+
+    @property
+    def reliability(self) -> ActionStatistics:
+        """
+        Success/run time statistics of the executed actions; if set, the agent keeps them up to date and
+        plans with the expected costs of the actions (see ActionStatistics.expected_cost). A failed action
+        is then retried as long as it remains the best option, until it becomes unreliable.
+        """
+
+        return self.__reliability
 
-    def load_actions(self, actions: List[Action]):
+    @reliability.setter
+    def reliability(self, reliability: ActionStatistics):
+        self.__reliability = reliability
+        self.__planner.cost_model = reliability.expected_cost if reliability is not None else None
+        self.__planner.clear_cache()
+
+    def load_actions(self, actions: Iterable[Action]):
         """
         Load actions list; refresh in case of any changes to the actions data.
 
-        :param actions:List[Action]: List of actions.
+        :param actions:Iterable[Action]: List of actions; any iterable e.g. actions streamed
+                                         by the action_graph.loader functions.
+        """
+
+        self.__actions = list(actions)
+        self.__planner.update_actions(self.__actions)
+
+    def load_macros(self, macros: Iterable[MacroAction] = None):
+        """
+        Add macro actions (declared, or learned by the macro_learner) to the loaded actions.
+        The planner uses them as single steps; the agent executes their underlying steps.
+
+        :param macros:Iterable[MacroAction]=None: Macro actions; by default, those learned by the macro_learner
         """
 
-        self.__actions = actions
-        self.__planner.update_actions(actions)
+        if macros is None:
+            macros = self.macro_learner.macros(self) if self.macro_learner is not None else []
+        known = {str(a) for a in self.__actions}
+        macros = [m for m in macros if str(m) not in known]
+        self.__actions.extend(macros)
+        self.__planner.add_actions(macros)
+
+    @property
+    def state(self) -> ObservableState:
+        """System state; subscribe() to be notified of changes."""
+
+        return self.__state
+
+    @state.setter
+    def state(self, state: State):
+        # replacing the state keeps the subscriptions
+        self.__state = self.__state.handover(state)
+
+    def subscribe(self, keys: Iterable, callback: Callable[[Any, Any, Any], None]) -> Subscription:
+        """
+        Get notified when state keys change: callback(key, old_value, new_value) is called
+        (in the thread making the change) only for the given keys.
+
+        :param keys:Iterable: State keys to watch; None for all keys
+        :param callback:Callable: Called with the key, the old and the new value
+        :return:Subscription: Pass to unsubscribe() (or cancel()) to stop notifications
+        """
+
+        return self.__state.subscribe(keys, callback)
+
+    def unsubscribe(self, subscription: Subscription):
+        """
+        Stop the notifications of a subscription.
+        """
+
+        subscription.cancel()
+
+    def resume(self) -> Tuple[State, List[Action]]:
+        """
+        Restore the state recorded in the journal, e.g. after a restart; call it after loading the actions.
+        A step that was executing when the journal ended (or whose outcome was not recorded) is not counted as done.
+
+        :return:Tuple[State, List[Action]]: Goal and remaining steps of the plan_and_execute that did not finish;
+                                            (None, []) if there is none (or its steps are no longer loaded)
+        """
+
+        journal = self.journal
+        with self.__state_lock:
+            self.__resuming = True
+            try:
+                self.state = dict(journal.state)
+            finally:
+                self.__resuming = False
+        if journal.goal is None:
+            return None, []
+        actions = {str(a): a for a in self.__actions}
+        plan = []
+        for name, effects in journal.remaining_steps:
+            if name not in actions:
+                logger.warning('JOURNAL: ACTION %s NOT LOADED; REMAINING PLAN DROPPED', name)
+                return journal.goal, []
+            step = actions[name].__copy__()
+            step.effects = dict(effects)
+            plan.append(step)
+        return journal.goal, plan
 
     def update_state(self, state: State):
         """
@@ -42,21 +282,144 @@ class Agent:
         :param state:State: New state
         """
 
-        self.state.update(state)
+        with self.__state_lock:
+            self.state.update(state)
+
+    def submit_state(self, state: State):
+        """
+        Queue a state update without blocking (e.g. from high rate sensor callbacks).
+        Queued updates are coalesced per key and applied at once by flush_state();
+        plan_and_execute flushes them before each planning step.
+
+        :param state:State: New state
+        """
+
+        self.__pending_states.append(state)
+
+    def flush_state(self) -> int:
+        """
+        Apply the queued state updates (see submit_state) in one atomic update; the latest value of each key wins.
+
+        :return:int: Number of keys updated
+        """
+
+        merged: State = {}
+        pending = self.__pending_states
+        # drain and apply as one step; concurrent flushes would otherwise apply their batches out of order
+        with self.__state_lock:
+            while pending:
+                merged.update(pending.popleft())
+            if merged:
+                self.state.update(merged)
+        return len(merged)
+
+    def snapshot(self) -> State:
+        """
+        Consistent copy of the current state (queued updates are applied first).
+
+        :return:State: Copy of the state
+        """
+
+        self.flush_state()
+        with self.__state_lock:
+            return State(self.state)
+
+    def start_state_ingestion(self, period: float = 0.01):
+        """
+        Flush the queued state updates periodically on a background thread.
+
+        :param period:float: Time between flushes (seconds)
+        """
+
+        self.stop_state_ingestion()
+        self.__ingestion_stop = Event()
+        self.__ingestion_thread = Thread(target=self.__ingest, args=(period, self.__ingestion_stop),
+                                         name=f'{self.name}.state_ingestion', daemon=True)
+        self.__ingestion_thread.start()
+
+    def stop_state_ingestion(self):
+        """
+        Stop the background flushing of state updates; the remaining queued updates are applied.
+        """
+
+        if self.__ingestion_thread is not None:
+            self.__ingestion_stop.set()
+            self.__ingestion_thread.join()
+            self.__ingestion_thread = None
+        self.flush_state()
+
+    def submit_goal(self, goal: State, priority: int = 0) -> GoalTicket:
+        """
+        Queue a goal for the goal scheduler (see start_goal_scheduler). Goals are pursued by priority, highest first,
+        and in order of submission within a priority. A goal of higher priority preempts the goal being pursued
+        at the next action boundary; the preempted goal is resumed later, with the rest of its plan if that
+        still holds.
+
+        :param goal:State: Desired goal state
+        :param priority:int: Priority of the goal
+        :return:GoalTicket: Outcome (result()) and queue metrics of the goal
+        """
+
+        with self.__goals_changed:
+            ticket = GoalTicket(dict(goal), priority, next(self.__goal_sequence))
+            heappush(self.__goals, ticket)
+            self.__goals_changed.notify_all()
+        return ticket
+
+    def pending_goals(self) -> List[GoalTicket]:
+        """
+        Queued (and preempted) goals, in the order they will be pursued.
+        """
+
+        with self.__goals_changed:
+            return sorted(self.__goals)
+
+    def start_goal_scheduler(self):
+        """
+        Pursue the submitted goals (see submit_goal) on a background thread.
+        """
+
+        self.stop_goal_scheduler()
+        self.__scheduler_stop = Event()
+        self.__scheduler_thread = Thread(target=self.__schedule_goals, args=(self.__scheduler_stop,),
+                                         name=f'{self.name}.goal_scheduler', daemon=True)
+        self.__scheduler_thread.start()
+
+    def stop_goal_scheduler(self):
+        """
+        Stop the goal scheduler at the next action boundary; the goal being pursued is queued again.
+        """
+
+        if self.__scheduler_thread is not None:
+            with self.__goals_changed:
+                self.__scheduler_stop.set()
+                self.__goals_changed.notify_all()
+            self.__scheduler_thread.join()
+            self.__scheduler_thread = None
 
     def abort(self):
         """
-        Abort execution.
+        Abort execution; running actions are cancelled.
         """
 
         self.__abort = True
+        self.__wake_running()
+        self.__cancel_async('aborted')
+        self.__async_wakeup.set()
+        if self.resource_manager is not None:
+            self.resource_manager.interrupt()
 
     def revoke(self):
         """
-        Revoke goals.
+        Revoke goals; running actions are cancelled.
         """
 
         self.__revoked = True
+        self.__wake_running()
+        self.__cancel_async('revoked')
+        self.__async_wakeup.set()
+        if self.resource_manager is not None:
+            self.resource_manager.interrupt()
 
     def reset(self):
         """
@@ -77,13 +440,17 @@ class Agent:
         if not goal:
             return True
 
-        for k, v in goal.items():
-            if k not in self.state or self.state[k] != v:
-                return False
+        self.flush_state()
+        with self.__state_lock:  # only the keys of the goal are compared; the state is not copied
+            state = self.state
+            for k, v in goal.items():
+                if k not in state or state[k] != v:
+                    return False
 
         return True
 
-    def get_plan(self, goal: State, start_state: State = None, actions: List[Action] = None) -> List[Action]:
+    def get_plan(self, goal: State, start_state: State = None, actions: List[Action] = None,
+                 lifted: bool = False) -> List[Action]:
         """
         Generate an action plan for the specified goal state.
         If no start_state is provided, the current state of the system is used. 
@@ -93,22 +460,58 @@ class Agent:
         :param actions:List[Action]=None: List of actions that the planner can use; 
                                           If this is not specified, the planner will use the 
                                           previously loaded actions to plan.
+        :param lifted:bool=False: if True, reuse the cached plan skeleton of the goal key
+                                  (see Planner.generate_lifted_plan)
         :return:List[Action]: The plan - dictionary of actions and their expected outcomes. 
         """
 
         if not start_state:
-            start_state = self.state
+            start_state = self.snapshot()
 
         if actions:
             self.__planner.update_actions(actions)
 
         try:
-            return self.__planner.generate_plan(goal, start_state)
+            if lifted:
+                return expand_macros(self.__planner.generate_lifted_plan(goal, start_state), start_state)
+            return expand_macros(self.__planner.generate_plan(goal, start_state), start_state)
             #
         except PlanningFailedException as pfx:
-            logging.error(f"PLANNING FAILED! {pfx}")
+            logger.error("PLANNING FAILED! %s", pfx)
             return []
 
+    def preflight(self, plan: List[Action]) -> List[Action]:
+        """
+        Run the runtime precondition checks of the steps of a plan concurrently, ahead of their execution.
+        A result stays valid for the runtime_check_validity of the step; execute_action uses it instead of
+        checking again, and steps with a valid result are not checked again here.
+
+        :param plan:List[Action]: Plan (e.g. from get_plan)
+        :return:List[Action]: Steps whose check failed (or raised)
+        """
+
+        results: Dict[int, bool] = {}
+        pending: List[Action] = []
+        now = monotonic()
+        with self.__runtime_checks_lock:
+            for key in [k for k, (_, valid_until) in self.__runtime_checks.items() if valid_until < now]:
+                del self.__runtime_checks[key]
+            for step in plan:
+                cached = self.__runtime_checks.get(self.__check_key(step))
+                if cached is not None:
+                    results[id(step)] = cached[0]
+                else:
+                    pending.append(step)
+        if pending:
+            with ThreadPoolExecutor(min(self.preflight_workers, len(pending)), f'{self.name}.preflight') as pool:
+                checked = list(pool.map(self.__runtime_check, pending))
+            for step, (passed, checked_at) in zip(pending, checked):
+                results[id(step)] = passed
+                if step.runtime_check_validity > 0:
+                    with self.__runtime_checks_lock:
+                        self.__runtime_checks[self.__check_key(step)] = (passed, checked_at + step.runtime_check_validity)
+        return [step for step in plan if not results[id(step)]]
+
     def execute_plan(self, plan: List[Action]):
         """
         Execute a previously generated plan.
@@ -121,27 +524,138 @@ class Agent:
                 self.execute_action(action)
 
             except Exception as _ex:
-                logging.error(f"{_ex}")
+                logger.error("%s", _ex)
                 raise
 
-        logging.info(f"EXECUTION SUCCEDED!")
+        logger.info("EXECUTION SUCCEDED!")
 
-    def plan_and_execute(self, goal: State, verbose: bool = False) -> Iterable:
+    def plan_and_execute(self, goal: State, verbose: bool = False, stream: bool = False,
+                         reuse_plan: bool = False, failover: int = 0, plan: List[Action] = None,
+                         preflight: bool = False) -> Iterable:
         """
         Creates a plan to satisfy the goal state; executes it action-by-action; re-evaluates the plan at each step;
 
         :param goal:State: Desired goal state
         :param verbose:bool: if True, prints formatted plan to console at each step
+        :param stream:bool: if True, the first step is executed as soon as its position in the plan is fixed,
+                            without waiting for the rest of the plan to be searched; the yielded plan
+                            then holds only that step.
+        :param reuse_plan:bool: if True, the rest of the plan is executed without replanning, as long as
+                                its steps succeed and no state key it depends on is changed by anything
+                                other than the plan's own actions.
+        :param failover:int: Number of alternative plans to compute along with each plan (see Planner.generate_plans);
+                             when an action fails, execution continues with the first alternative that does not use it
+                             and still holds in the current state, instead of replanning.
+        :param plan:List[Action]: Plan to start with (e.g. of a previous, interrupted run): its remaining steps are
+                                  executed if it still holds in the current state (see Planner.check_plan)
+        :param preflight:bool: if True, the runtime precondition checks of each new plan are run (concurrently, see
+                               preflight) before its first step; a plan with a failed check is replaced right away.
+                               Each step is pre-flighted once per call (the replans mostly repeat the steps).
+        :return: The outcome (ActionStatus), as the value of the StopIteration that ends the iteration
         """
 
+        trace = {'planning_time': 0.0, 'preflight_time': 0.0, 'execution_time': 0.0, 'plans': 0, 'failovers': 0,
+                 'outcome': ActionStatus.FAILURE, 'suspended': False}
+        try:
+            yield from self.__plan_and_execute(goal, verbose, stream, reuse_plan, failover, plan, preflight, trace)
+            return trace['outcome']
+        except _PlanSuspended:
+            trace['suspended'] = True  # to be continued (see __pursue); its plan stays unfinished in the journal
+            return None
+        finally:
+            if self.journal is not None:
+                if trace['suspended']:
+                    self.journal.sync()
+                else:
+                    self.journal.record_finish(trace['outcome'])
+            if self.telemetry is not None:
+                self.telemetry.record({'type': 'plan', 'agent': self.name, 'goal': goal,
+                                       'outcome': 'SUSPENDED' if trace['suspended'] else trace['outcome'].name,
+                                       'planning_time': trace['planning_time'],
+                                       'preflight_time': trace['preflight_time'],
+                                       'execution_time': trace['execution_time'],
+                                       'replans': max(trace['plans'] - 1, 0),
+                                       'failovers': trace['failovers']})
+
+    def __plan_and_execute(self, goal: State, verbose: bool, stream: bool, reuse_plan: bool, failover: int,
+                           resumed: List[Action], preflight: bool, trace: dict) -> Iterable:
+        self.flush_state()
+        with self.__state_lock:
+            goal_monitor = GoalMonitor(self.state, goal)
+        suffix_validator = PlanValidator(self) if reuse_plan and not stream else None
+        try:
+            yield from self.__execution_loop(goal, goal_monitor, suffix_validator, stream, verbose, failover,
+                                             resumed, preflight, trace)
+        finally:
+            goal_monitor.close()
+            if suffix_validator is not None:
+                suffix_validator.close()
+
+    def __execution_loop(self, goal: State, goal_monitor: 'GoalMonitor', suffix_validator: 'PlanValidator',
+                         stream: bool, verbose: bool, failover: int, resumed: List[Action], preflight: bool,
+                         trace: dict) -> Iterable:
         blacklisted_actions: List[str] = []
+        plan: List[Action] = []
+        alternatives: List[List[Action]] = []
+        preflighted: set = set()  # steps checked by a pre-flight of this loop (the plans are mostly the same)
 
         # state might have changed since the last step was executed
-        while not self.is_goal_met(goal):
+        while not goal_monitor.met or self.__async:
 
             try:
-                # (re)generate the plan
-                plan: List[Action] = self.__planner.generate_plan(goal, self.state, blacklisted_actions)
+                if goal_monitor.met:
+                    # goal met on the expected effects of async actions; wait for their outcomes
+                    self.join_async()
+                    continue
+
+                self.flush_state()
+                if suffix_validator is not None and suffix_validator.is_valid(plan):
+                    # continue with the rest of the previous plan
+                    plan = plan[1:]
+                else:
+                    # after a failure, continue with a precomputed alternative that still holds (if any)
+                    plan = self.__failover(goal, alternatives, blacklisted_actions) if not plan else []
+                    if plan:
+                        trace['failovers'] += 1
+                        logger.info("FAILING OVER TO AN ALTERNATIVE PLAN")
+                    elif resumed:
+                        plan = self.__failover(goal, [list(resumed)], blacklisted_actions)
+                        if plan:
+                            logger.info("RESUMING THE PREVIOUS PLAN")
+                    resumed = None
+                    if not plan:
+                        # (re)generate the plan
+                        t0 = perf_counter()
+                        if stream:
+                            # the plan is re-evaluated after each step; only the first step is needed
+                            plan = list(islice(self.__planner.iter_plan(goal, self.snapshot(), blacklisted_actions), 1))
+                        elif failover:
+                            plan, *alternatives = self.__planner.generate_plans(goal, self.snapshot(), blacklisted_actions,
+                                                                               k=failover + 1, min_difference=1)
+                        else:
+                            plan = self.__planner.generate_plan(goal, self.snapshot(), blacklisted_actions)
+                        trace['planning_time'] += perf_counter() - t0
+                        trace['plans'] += 1
+                        plan = expand_macros(plan, self.snapshot())
+                        if self.macro_learner is not None and not stream and trace['plans'] == 1:
+                            self.macro_learner.observe(plan)  # (the replans are mostly suffixes of it)
+                    unchecked = [a for a in plan if self.__check_key(a) not in preflighted] if preflight else []
+                    if unchecked:
+                        t0 = perf_counter()
+                        failed = self.preflight(unchecked)
+                        preflighted.update(self.__check_key(a) for a in unchecked)
+                        trace['preflight_time'] += perf_counter() - t0
+                        if failed:
+                            # replan before anything is executed
+                            logger.error("PREFLIGHT: RUNTIME PRECONDITION CHECK FAILED: %s / ATTEMPTING ALTERNATIVE PLAN",
+                                         [str(a) for a in failed])
+                            blacklisted_actions.extend(str(a) for a in failed if str(a) not in blacklisted_actions)
+                            plan = []
+                            continue
+                    if self.journal is not None:
+                        self.journal.record_plan(goal, plan)
+                    if suffix_validator is not None:
+                        suffix_validator.watch(plan)
                 # print formatted plan to console
                 if verbose:
                     self.print_plan_to_console(plan)
@@ -150,7 +664,11 @@ class Agent:
 
                 # execute one plan step at a time
                 first_action = plan[0]
-                self.execute_action(first_action)
+                t0 = perf_counter()
+                try:
+                    self.execute_action(first_action)
+                finally:
+                    trace['execution_time'] += perf_counter() - t0
                 #
                 # if the latest executed action has the same effect as any of the blacklisted actions,
                 # then it is prudent(?) to remove such a blacklisted action
@@ -160,21 +678,41 @@ class Agent:
                         blacklisted_actions.remove(str(action))
 
             except ActionFailedException as ex_fail:
-                logging.error(f"{ex_fail} / ATTEMPTING ALTERNATIVE PLAN")
-                if str(first_action) not in blacklisted_actions:
-                    blacklisted_actions.append(str(first_action))
+                plan = []
+                logger.error("%s / ATTEMPTING ALTERNATIVE PLAN", ex_fail)
+                failed_action = ex_fail.action if isinstance(ex_fail, AsyncActionFailedException) else first_action
+                if self.__reliability is not None and not self.__reliability.is_unreliable(failed_action):
+                    continue  # its expected cost went up; alternatives are preferred if they are cheaper now
+                if str(failed_action) not in blacklisted_actions:
+                    blacklisted_actions.append(str(failed_action))
                 continue
 
             except ActionRevokedException as _ex_revoked:
-                logging.info(f"{_ex_revoked} / STOPPING.")
+                logger.info("%s / STOPPING.", _ex_revoked)
                 self.__revoked = False  # reset revoked status
+                trace['outcome'] = ActionStatus.REVOKED
                 break
 
             except Exception as _ex:
-                logging.error(f"{_ex}")
+                logger.error("%s", _ex)
                 raise
 
-        logging.info(f"EXECUTION SUCCEDED!")
+        else:
+            trace['outcome'] = ActionStatus.SUCCESS
+
+        logger.info("EXECUTION SUCCEDED!")
+
+    def __failover(self, goal: State, alternatives: List[List[Action]], blacklisted_actions: List[str]) -> List[Action]:
+        # remaining steps of the first alternative that avoids the failed actions and still holds
+        state = self.snapshot()
+        while alternatives:
+            alternative = alternatives.pop(0)
+            if any(str(a) in blacklisted_actions for a in alternative):
+                continue
+            steps = self.__planner.check_plan(alternative, goal, state)
+            if steps:
+                return expand_macros(steps, state)
+        return []
 
     def print_plan_to_console(self, plan: List[Action]):
         if plan:
@@ -184,59 +722,123 @@ class Agent:
             print(plan_str)
 
     def execute_action(self, action: Action):
-        # Check for abort status
-        if self.__abort:
-            # logging.error(f'ACTION: {action} : EXECUTION ABORTED BEFORE START !!')
-            action.on_aborted(action.effects)
-            raise ActionAbortedException(f'ACTION: {action} FAILED. ABORTED STATE IS ACTIVE!!')
+        if self.telemetry is None and self.__reliability is None and self.journal is None:
+            return self.__execute_action(action)
 
-        # Check for revoked status
-        if self.__revoked:
-            # logging.error(f'ACTION: {action} : EXECUTION REVOKED BEFORE START !!')
-            action.on_revoked(action.effects)
-            raise ActionRevokedException(f'ACTION/GOALS REVOKED WHILE AT ACTION: {action}')
+        trace = {'called_at': perf_counter()}
+        try:
+            self.__execute_action(action, trace)
+        except Exception as _ex:
+            trace['error'] = _ex.__class__.__name__
+            raise
+        finally:
+            if self.__reliability is not None and trace.get('dispatched') and not action.allow_async:
+                self.__learn(action)  # async actions: once their outcome is collected
+            if self.journal is not None and trace.get('dispatched'):
+                self.journal.record_outcome(action)
+            if self.telemetry is not None:
+                self.__record_action(action, trace)
+
+    def __execute_action(self, action: Action, trace: dict = None):
+        self.__check_abort_revoke(action)
 
-        # Check runtime precondition
-        if not action.check_runtime_precondition(action.effects):
+        # Outcomes of the async actions; wait for those this action depends on
+        self.__collect_async()
+        self.__await_async_dependencies(action)
+        if action.allow_async:
+            self.__await_async_capacity(action)
+
+        # Check runtime precondition; or use the result of a pre-flight, while valid
+        cached = None
+        if self.__runtime_checks:
+            with self.__runtime_checks_lock:
+                cached = self.__runtime_checks.pop(self.__check_key(action), None)
+        if cached is not None and cached[1] >= monotonic():
+            passed = cached[0]
+        else:
+            passed = action.check_runtime_precondition(action.effects)
+        if not passed:
             raise ActionFailedException(f'ACTION: {action} RUNTIME PRECONDITION CHECK FAILED!!.')
 
+        if self.resource_manager is None:
+            return self.__dispatch(action, trace)
+        # Claim the resources of the action; held until it is done (async actions: until their outcome)
+        t0 = perf_counter()
+        exclusive, shared = self.resource_manager.claims(action)
+        if not self.resource_manager.acquire(action, exclusive, shared, abandon=lambda: self.__abort or self.__revoked):
+            self.__check_abort_revoke(action)
+        if trace is not None:
+            trace['claim_wait'] = perf_counter() - t0
+        try:
+            self.__dispatch(action, trace)
+        except BaseException:
+            self.resource_manager.release(action)
+            raise
+        if action.allow_async:
+            action.completion.add_done_callback(lambda _: self.resource_manager.release(action))
+        else:
+            self.resource_manager.release(action)
+
+    def __dispatch(self, action: Action, trace: dict):
         # Execute the plan step
         action._execute(action.effects)
         # action.execute is an async process inside _execute,
+        if trace is not None:
+            trace['dispatched'] = True
 
         if action.allow_async:
-            # if this is an async action; just apply the effects and return
-            action.apply_effects(action.effects, self.state)
+            # if this is an async action; just apply the effects and return;
+            # the outcome is checked later (see join_async)
+            with self.__state_lock:
+                before = dict(self.state)
+                self.__apply_effects(action)
+                changes = {k: (before.get(k, _MISSING), self.state.get(k, _MISSING)) for k in set(before) | set(self.state)
+                           if self.state.get(k, _MISSING) != before.get(k, _MISSING)}
+            self.__async[id(action)] = (action, changes)
+            action.completion.add_done_callback(lambda _: self.__async_wakeup.set())
             return
 
-        # monitor the status; wait until execution is complete
-        time0 = time()
-        while action.is_running():
-            if self.__abort:
-                # if an abort was signalled
-                # logging.critical(f'ACTION: {action} : EXECUTION ABORTED!!')
-                action.status = ActionStatus.ABORTED
-                break
-            if self.__revoked:
-                # if an revoke was signalled
-                # logging.critical(f'ACTION: {action} : GOALS REVOKED. STOPPING!!')
-                action.status = ActionStatus.REVOKED
-                break
-            if time()-time0 > action.timeout:
-                # Action timeout exceeded
-                raise ActionTimedOutException(f'ACTION: {action} : TIMED OUT!!')
-            if not action.status == ActionStatus.RUNNING:
-                # thread is alive but the status has changed
-                break  # so move on
-            sleep(0.05)  # throttle loop
-            # logging.debug(f'Action: {str(action)} is running...')
+        # monitor the status; wait until execution is complete;
+        # the watchdog cancels the action once its timeout expires
+        self.__running[id(action)] = action
+        try:
+            while True:
+                action._wakeup.clear()
+                if action._timed_out:
+                    # Action timeout exceeded
+                    self.__stop(action, 'timeout')
+                    raise ActionTimedOutException(f'ACTION: {action} : TIMED OUT!!')
+                if action._finished_at is not None:
+                    break  # on_execute returned
+                if self.__abort:
+                    # if an abort was signalled
+                    self.__stop(action, 'aborted')
+                    action.status = ActionStatus.ABORTED
+                    break
+                if self.__revoked:
+                    # if an revoke was signalled
+                    self.__stop(action, 'revoked')
+                    action.status = ActionStatus.REVOKED
+                    break
+                if not action.status == ActionStatus.RUNNING:
+                    # thread is alive but the status has changed
+                    break  # so move on
+                action._wait()  # until status change, completion, cancellation or abort/revoke
+        finally:
+            self.__running.pop(id(action), None)
+
+        if trace is not None:
+            trace['detected_at'] = perf_counter()
+            # status change; or the end of on_execute if the status was not set
+            trace['changed_at'] = action._finished_at if action.status == ActionStatus.RUNNING \
+                else action._status_changed_at
 
         # Execution completed but with RUNNING Status
         if action.status == ActionStatus.RUNNING:
             # the user forgot to set the status; or something bad happened;
             # let's treat this as FAILURE!
             action.status = ActionStatus.FAILURE
-            logging.warning(f'ACTION: {action} STATUS UNKNOWN; ASSUMING FAILURE!!')
+            logger.warning('ACTION: %s STATUS UNKNOWN; ASSUMING FAILURE!!', action)
 
         # Execution completed with NEUTRAL Status
         if action.status == ActionStatus.NEUTRAL:
@@ -247,7 +849,7 @@ class Agent:
         # Execution completed with SUCCESS Status
         if action.status == ActionStatus.SUCCESS:
             # Action executed without errors;
-            action.apply_effects(action.effects, self.state)
+            self.__apply_effects(action)
             # logging.debug(f'ACTION: {action} Action succeded.')
             action.on_success(action.effects)
 
@@ -271,3 +873,265 @@ class Agent:
 
         # Any clean up needed after execution e.g. updating system states
         action.on_exit(action.effects)
+
+    def async_actions(self) -> List[Action]:
+        """
+        The async actions (allow_async) that were started but whose outcome was not yet collected.
+        """
+
+        return [action for action, _ in self.__async.values()]
+
+    def join_async(self, timeout: float = None) -> bool:
+        """
+        Barrier: wait for the outstanding async actions to complete and collect their outcomes.
+        Raises AsyncActionFailedException if any of them did not succeed; its effects on the state are reverted.
+
+        :param timeout:float=None: Maximum time to wait (seconds)
+        :return:bool: True if all async actions completed
+        """
+
+        completed = self.__await_async(self.async_actions(), timeout=timeout)
+        self.__collect_async()
+        return completed
+
+    def __await_async_dependencies(self, action: Action):
+        # join point: wait for the async actions that change what this action reads or writes
+        keys = set(action.preconditions) | set(action.effects)
+        dependencies = [a for a, changes in self.__async.values() if keys.intersection(changes)]
+        if dependencies:
+            self.__await_async(dependencies)
+            self.__check_abort_revoke(action)  # abort/revoke while waiting
+            self.__collect_async()
+
+    def __await_async_capacity(self, action: Action):
+        while self.max_async_actions is not None and len(self.__async) >= self.max_async_actions:
+            self.__await_async(self.async_actions(), any_completed=True)
+            self.__check_abort_revoke(action)  # abort/revoke while waiting
+            self.__collect_async()
+
+    def __await_async(self, actions: List[Action], any_completed: bool = False, timeout: float = None) -> bool:
+        # wait until the async actions (or any of them) are settled: completed; or gave no sign of stopping within
+        # cancel_grace of their cancellation (by abort/revoke, or by the watchdog once their timeout expired)
+        deadline = None if timeout is None else perf_counter() + timeout
+        while True:
+            self.__async_wakeup.clear()
+            now = perf_counter()
+            pending = [a for a in actions if not self.__async_settled(a, now)]
+            if not pending or (any_completed and len(pending) < len(actions)):
+                return True
+            if deadline is not None and now >= deadline:
+                return False
+            wake_at = [t for t in [deadline] + [self.__async_give_up_at(a) for a in pending] if t is not None]
+            self.__async_wakeup.wait(max(min(wake_at) - now, 0) if wake_at else None)
+
+    def __async_give_up_at(self, action: Action) -> float:
+        if action.cancellation.cancelled:
+            return action.cancellation.cancelled_at + action.cancel_grace
+        if action._started_at is not None:
+            return action._started_at + action.timeout + action.cancel_grace
+        return None
+
+    def __async_settled(self, action: Action, now: float) -> bool:
+        if action.completion.done():
+            return True
+        give_up_at = self.__async_give_up_at(action)
+        return give_up_at is not None and now >= give_up_at
+
+    def __collect_async(self):
+        failed: AsyncActionFailedException = None
+        now = perf_counter()
+        for key, (action, changes) in list(self.__async.items()):
+            if not self.__async_settled(action, now):
+                continue
+            del self.__async[key]
+            if not action.completion.done():
+                logger.warning('ACTION: %s (ASYNC) DID NOT STOP WITHIN %ss OF CANCELLATION; ABANDONED',
+                               action, action.cancel_grace)
+            if self.__reliability is not None:
+                self.__learn(action)
+            if self.journal is not None:
+                # (recorded as RUNNING when dispatched); a timed out action failed, whatever its status
+                self.journal.record_outcome(action, ActionStatus.FAILURE if action._timed_out else None)
+            if action.status == ActionStatus.SUCCESS and not action._timed_out:
+                action.on_success(action.effects)
+                action.on_exit(action.effects)
+                continue
+            # revert the effects that were applied in advance (unless changed since)
+            with self.__state_lock:
+                for k, (previous, applied) in changes.items():
+                    if self.state.get(k, _MISSING) != applied:
+                        continue
+                    if previous is _MISSING:
+                        self.state.pop(k, None)
+                    else:
+                        self.state[k] = previous
+            if action.status == ActionStatus.NEUTRAL:
+                action.on_neutral(action.effects)
+                continue
+            action.on_failure(action.effects)
+            if failed is None:
+                failed = AsyncActionFailedException(f'ACTION: {action} (ASYNC) FAILED!', action)
+        if failed is not None:
+            raise failed
+
+    def __cancel_async(self, reason: str):
+        for action, _ in list(self.__async.values()):
+            action.cancel(reason)
+
+    def __schedule_goals(self, stop: Event):
+        while True:
+            with self.__goals_changed:
+                while not self.__goals and not stop.is_set():
+                    self.__goals_changed.wait()
+                if stop.is_set():
+                    return
+                ticket = heappop(self.__goals)
+            self.__pursue(ticket, stop)
+
+    def __pursue(self, ticket: GoalTicket, stop: Event):
+        t0 = perf_counter()
+        if ticket.started_at is None:
+            ticket.started_at = t0
+        runs = self.plan_and_execute(ticket.goal, reuse_plan=True, plan=ticket._plan)
+        ticket._plan = None
+        try:
+            while True:
+                try:
+                    plan = next(runs)
+                except StopIteration as done:
+                    outcome = done.value
+                    break
+                # action boundary: the next step is not executed yet
+                preempted = self.__preempts(ticket)
+                if preempted or stop.is_set():
+                    try:
+                        runs.throw(_PlanSuspended())
+                    except StopIteration:
+                        pass
+                    ticket.run_time += perf_counter() - t0
+                    ticket._plan = plan
+                    if preempted:
+                        ticket.preemptions += 1
+                        logger.info("GOAL %s PREEMPTED", ticket.goal)
+                    with self.__goals_changed:
+                        heappush(self.__goals, ticket)
+                    return
+        except Exception as _ex:
+            self.__finish_goal(ticket, t0, None, _ex)
+            return
+        self.__finish_goal(ticket, t0, outcome, None)
+
+    def __preempts(self, ticket: GoalTicket) -> bool:
+        with self.__goals_changed:
+            return bool(self.__goals) and self.__goals[0].priority > ticket.priority
+
+    def __finish_goal(self, ticket: GoalTicket, t0: float, outcome: ActionStatus, error: Exception):
+        ticket.finished_at = perf_counter()
+        ticket.run_time += ticket.finished_at - t0
+        if self.telemetry is not None:
+            record = {'type': 'goal', 'agent': self.name, 'goal': ticket.goal, 'priority': ticket.priority,
+                      'outcome': outcome.name if outcome is not None else None,
+                      'queue_latency': ticket.queue_latency, 'goal_run_time': ticket.run_time,
+                      'preemptions': ticket.preemptions}
+            if error is not None:
+                record['error'] = error.__class__.__name__
+            self.telemetry.record(record)
+        if error is not None:
+            ticket.completion.set_exception(error)
+        else:
+            ticket.completion.set_result(outcome)
+
+    def __ingest(self, period: float, stop: Event):
+        while not stop.wait(period):
+            self.flush_state()
+
+    def _is_applying_effects(self) -> bool:
+        return self.__applying_effects
+
+    def __apply_effects(self, action: Action):
+        # state changes made by the executed actions themselves (as opposed to external updates)
+        with self.__state_lock:
+            self.__applying_effects = True
+            try:
+                action.apply_effects(action.effects, self.state)
+            finally:
+                self.__applying_effects = False
+
+    def __check_abort_revoke(self, action: Action):
+        # Check for abort status
+        if self.__abort:
+            # logging.error(f'ACTION: {action} : EXECUTION ABORTED BEFORE START !!')
+            action.on_aborted(action.effects)
+            raise ActionAbortedException(f'ACTION: {action} FAILED. ABORTED STATE IS ACTIVE!!')
+
+        # Check for revoked status
+        if self.__revoked:
+            # logging.error(f'ACTION: {action} : EXECUTION REVOKED BEFORE START !!')
+            action.on_revoked(action.effects)
+            raise ActionRevokedException(f'ACTION/GOALS REVOKED WHILE AT ACTION: {action}')
+
+    def __wake_running(self):
+        # running actions are cancelled by the thread monitoring them
+        for action in list(self.__running.values()):
+            action._wakeup.set()
+
+    def __stop(self, action: Action, reason: str):
+        # cancel the action and wait (for a limited time) for it to stop
+        action.cancel(reason)
+        if not action._join(action.cancel_grace):
+            logger.warning('ACTION: %s DID NOT STOP WITHIN %ss OF CANCELLATION (%s)', action, action.cancel_grace, reason)
+
+    def __learn(self, action: Action):
+        # successes and failures (incl. timeouts); aborted/revoked/neutral executions say nothing about reliability
+        if action._timed_out:
+            success = False
+        elif action.status in (ActionStatus.SUCCESS, ActionStatus.FAILURE):
+            success = action.status == ActionStatus.SUCCESS
+        else:
+            return
+        self.__reliability.record(action, success, action._run_time())
+        self.__planner.clear_cache()
+
+    def __check_key(self, action: Action) -> Any:
+        # equal (bound) steps of successive plans share their pre-flight results
+        try:
+            key = action.signature()
+            hash(key)
+            return key
+        except TypeError:  # unhashable state values
+            return id(action)
+
+    def __runtime_check(self, action: Action) -> Tuple[bool, float]:
+        # (result, start time) of the check
+        checked_at = monotonic()
+        try:
+            return bool(action.check_runtime_precondition(action.effects)), checked_at
+        except Exception as _ex:
+            logger.warning('ACTION: %s RUNTIME PRECONDITION CHECK RAISED %r', action, _ex)
+            return False, checked_at
+
+    def __journal_change(self, key: Any, old: Any, new: Any):
+        if self.__resuming:
+            return  # restored from the journal
+        if new is ObservableState.MISSING:
+            self.journal.record_change(key)
+        else:
+            self.journal.record_change(key, new)
+
+    def __record_action(self, action: Action, trace: dict):
+        now = perf_counter()
+        record = {'type': 'action', 'agent': self.name, 'action': str(action),
+                  'outcome': action.status.name if trace.get('dispatched') else None,
+                  'dispatch_latency': None, 'run_time': None, 'detection_latency': None, 'callback_time': None}
+        if 'claim_wait' in trace:
+            record['claim_wait'] = trace['claim_wait']
+        if trace.get('dispatched') and action._started_at is not None:
+            record['dispatch_latency'] = action._started_at - trace['called_at']
+            record['run_time'] = action._run_time()
+        if 'detected_at' in trace:
+            if trace['changed_at'] is not None and trace['changed_at'] >= trace['called_at']:
+                record['detection_latency'] = max(trace['detected_at'] - trace['changed_at'], 0.0)
+            record['callback_time'] = now - trace['detected_at']
+        if 'error' in trace:
+            record['error'] = trace['error']
+        self.telemetry.record(record)
@@ -0,0 +1,140 @@
+#! /usr/bin/env python3
+
+import sys
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Union
+
+from action_graph.action import Action, State
+from action_graph.planner import Planner, PlanningFailedException
+
+INFINITE_COST = float('inf')
+
+
+class PlanReport():
+    """The plan chosen for a goal (from a start state) and how sensitive that choice is to the costs of the actions"""
+
+    def __init__(self, goal: State, state: State, plan: List[Action], cost: float,
+                 alternative: List[Action], alternative_cost: float, flips: Dict[str, float]) -> None:
+        self.goal = goal
+        self.state = state
+        self.plan = plan                         # None if infeasible
+        self.cost = cost
+        self.alternative = alternative           # best plan that differs from the chosen one; None if there is none
+        self.alternative_cost = alternative_cost
+        # action -> change of its cost beyond which another plan is chosen
+        # (> 0: increase of an action in the plan; < 0: decrease of an action in an alternative plan)
+        self.flips = flips
+
+    @property
+    def feasible(self) -> bool:
+        return self.plan is not None
+
+    @property
+    def margin(self) -> float:
+        return self.alternative_cost - self.cost
+
+    def __repr__(self) -> str:
+        plan = [str(a) for a in self.plan] if self.feasible else 'INFEASIBLE'
+        return f'{self.goal}: {plan} cost={self.cost} margin={self.margin}'
+
+
+class PlanProfiler():
+    """
+    What-if analysis of the plans a Planner chooses: for goals and start states, the chosen plans,
+    their cost margins to the second-best alternative and the cost changes that would flip the decision.
+
+    The second-best alternative is the cheapest of the plans found by avoiding (in turn) each action of
+    the chosen plan. Sub-plans are memoised across the whole analysis, so a sweep searches each
+    (sub-goal, state, avoided action) combination only once.
+    """
+
+    def __init__(self, planner: Union[Planner, Iterable[Action]]) -> None:
+        self.planner = planner if isinstance(planner, Planner) else Planner(list(planner))
+        self.__memo: dict = {}
+
+    def reset(self):
+        """
+        Forget the memoised sub-plans; required after the actions (or their costs) of the planner change.
+        """
+
+        self.__memo = {}
+
+    def analyse(self, goal: State, state: State, avoid_actions: List[str] = None) -> PlanReport:
+        """
+        Plan for the goal and find out how close the next best plan is.
+
+        :param goal:State: Desired goal (target) state
+        :param state:State: Start state
+        :param avoid_actions:List[str]=None: Actions not to consider
+        :return:PlanReport: The chosen plan, its margin and flip points
+        """
+
+        avoid_actions = list(avoid_actions or ())
+        plan, cost = self.__plan(goal, state, avoid_actions)
+        if plan is None:
+            return PlanReport(goal, state, None, INFINITE_COST, None, INFINITE_COST, {})
+
+        chosen = Counter(str(a) for a in plan)
+        flips: Dict[str, float] = {}
+        alternative, alternative_cost = None, INFINITE_COST
+        for name, count in chosen.items():
+            other, other_cost = self.__plan(goal, state, avoid_actions + [name])
+            gap = other_cost - cost
+            # the chosen plan is kept until its cost exceeds the best plan without this action
+            flips[name] = gap / count
+            if other is None:
+                continue
+            if other_cost < alternative_cost:
+                alternative, alternative_cost = other, other_cost
+            # ...and an alternative is chosen once it gets cheaper than the chosen plan
+            for other_name, other_count in Counter(str(a) for a in other).items():
+                if other_name not in chosen:
+                    flips[other_name] = max(flips.get(other_name, -INFINITE_COST), -gap / other_count)
+
+        return PlanReport(goal, state, plan, cost, alternative, alternative_cost, flips)
+
+    def sweep(self, goals: Iterable[State], states: Iterable[State]) -> List[PlanReport]:
+        """
+        Analyse every goal from every start state (e.g. states sampled from their expected distribution).
+
+        :param goals:Iterable[State]: Goals (single state items, as for Planner.generate_plan)
+        :param states:Iterable[State]: Start states
+        :return:List[PlanReport]: One report per goal and state
+        """
+
+        states = list(states)
+        return [self.analyse(goal, state) for goal in goals for state in states]
+
+    def __plan(self, goal: State, state: State, avoid_actions: List[str]):
+        try:
+            plan = self.planner.generate_plan(goal, state, avoid_actions, memo=self.__memo)
+        except PlanningFailedException:
+            return None, INFINITE_COST
+        cost = sum(a.cost for a in plan)
+        if cost >= sys.float_info.max:  # e.g. no action available for the goal
+            return None, INFINITE_COST
+        return plan, cost
+
+
+def summarise(reports: Iterable[PlanReport]) -> Dict[Any, Dict[str, Any]]:
+    """
+    Aggregate reports per goal: how often each plan was chosen, the smallest margin
+    and, per action, the smallest cost change that flips the plan for any of the states.
+
+    :param reports:Iterable[PlanReport]: Reports of PlanProfiler.analyse/sweep
+    :return:Dict[Any, Dict[str, Any]]: goal item -> {'plans': Counter, 'infeasible': int, 'min_margin': float, 'flips': dict}
+    """
+
+    summary: Dict[Any, Dict[str, Any]] = defaultdict(lambda: {'plans': Counter(), 'infeasible': 0,
+                                                              'min_margin': INFINITE_COST, 'flips': {}})
+    for report in reports:
+        entry = summary[next(iter(report.goal.items()))]
+        if not report.feasible:
+            entry['infeasible'] += 1
+            continue
+        entry['plans'][tuple(str(a) for a in report.plan)] += 1
+        entry['min_margin'] = min(entry['min_margin'], report.margin)
+        for name, delta in report.flips.items():
+            if name not in entry['flips'] or abs(delta) < abs(entry['flips'][name]):
+                entry['flips'][name] = delta
+    return dict(summary)
@@ -0,0 +1,221 @@
+#! /usr/bin/env python3
+
+import logging
+import os
+import pickle
+import struct
+import threading
+import zlib
+from typing import Any, Dict, List, Set, Tuple
+
+from action_graph.action import Action, ActionStatus, State
+
+logger = logging.getLogger(__name__)
+
+# record: length and crc32 of the (pickled) payload; a torn or corrupt tail (crash while writing) is dropped
+_HEADER = struct.Struct('<II')
+# (final) statuses after which the executed step counts as done; async steps count once their outcome is recorded
+_DONE = (ActionStatus.SUCCESS.name, ActionStatus.NEUTRAL.name)
+_MISSING = object()
+
+
+class Journal():
+    """
+    Append-only journal of the execution of an agent: state changes, the plans chosen and the outcomes of the
+    executed steps; e.g. to resume after a restart (see Agent.resume). Records are written as they happen
+    and fsync'ed in batches (at most sync_interval later). Once snapshot_every records were written, the journal
+    is compacted into a single snapshot (the state and the unfinished plan); i.e. replay time stays bounded.
+
+    The records are pickled: the state values have to be picklable, and the file must come from a trusted source.
+    """
+
+    def __init__(self, path: str, sync_interval: float = 0.05, snapshot_every: int = 10_000) -> None:
+        """
+        :param path:str: Journal file; replayed if it exists
+        :param sync_interval:float: (Seconds) fsync the written records this long after the first of them; 0: immediately
+        :param snapshot_every:int: Compact the journal after this many records
+        """
+
+        self.path = path
+        self.sync_interval = sync_interval
+        self.snapshot_every = snapshot_every
+        # replayed (and kept up to date) execution: state, the last plan (goal, steps) and its steps done
+        self.state: Dict[Any, Any] = {}
+        self.goal: State = None
+        self.steps: List[Tuple[str, State]] = []
+        self.done: Set[int] = set()  # (indices of the steps; async steps may complete out of order)
+        # unfinished plans (goal, remaining steps) set aside for a plan of another goal (e.g. a preempted goal);
+        # the last one is the current plan again once that plan finishes
+        self.suspended: List[Tuple[State, List[Tuple[str, State]]]] = []
+        self.__lock = threading.Lock()
+        self.__records = 0
+        self.__unsynced = threading.Event()
+        self.__stop = threading.Event()
+        self.__closed = False
+        valid = self.__replay()
+        self.__file = open(path, 'ab')
+        if self.__file.tell() > valid:  # drop the torn tail
+            self.__file.truncate(valid)
+        self.__syncer: threading.Thread = None
+        if sync_interval > 0:
+            self.__syncer = threading.Thread(target=self.__sync_loop, name='action_graph.journal', daemon=True)
+            self.__syncer.start()
+
+    @property
+    def remaining_steps(self) -> List[Tuple[str, State]]:
+        """(name, effects) of the steps of the unfinished plan that were not executed (yet)"""
+
+        return [step for i, step in enumerate(self.steps) if i not in self.done]
+
+    def record_change(self, key: Any, value: Any = _MISSING):
+        """
+        Record the new value of a state key; without a value, its removal.
+        """
+
+        self.__append(('-', key) if value is _MISSING else ('=', key, value))
+
+    def record_plan(self, goal: State, plan: List[Action]):
+        self.__append(('P', dict(goal), [(str(step), dict(step.effects)) for step in plan]))
+
+    def record_outcome(self, action: Action, status: ActionStatus = None):
+        self.__append(('A', str(action), (status or action.status).name))
+
+    def record_finish(self, outcome: ActionStatus = None):
+        """
+        Record the end of the current plan; not for a suspended one (it is set aside by the next plan).
+        """
+
+        self.__append(('F', outcome.name if outcome is not None else None))
+        self.sync()
+
+    def sync(self):
+        """
+        Write the records to disk now (fsync).
+        """
+
+        with self.__lock:
+            if self.__closed:
+                return
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+            self.__unsynced.clear()
+
+    def compact(self):
+        """
+        Replace the journal by a snapshot of the current state and unfinished plan (atomically).
+        """
+
+        with self.__lock:
+            self.__compact()
+
+    def close(self):
+        self.sync()
+        with self.__lock:
+            self.__closed = True
+            self.__file.close()
+        self.__stop.set()
+        self.__unsynced.set()  # wake up the syncer
+        if self.__syncer is not None and self.__syncer is not threading.current_thread():
+            self.__syncer.join()
+
+    def __append(self, record: tuple):
+        try:
+            payload = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+        except Exception as _ex:
+            logger.warning('JOURNAL: %s NOT RECORDED: %s', record[:2], _ex)
+            return
+        with self.__lock:
+            if self.__closed:
+                return
+            self.__apply(record)
+            self.__file.write(_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            self.__records += 1
+            if self.__records >= self.snapshot_every:
+                self.__compact()
+            elif self.sync_interval <= 0:
+                self.__file.flush()
+                os.fsync(self.__file.fileno())
+            else:
+                self.__unsynced.set()
+
+    def __apply(self, record: tuple):
+        kind = record[0]
+        if kind == '=':
+            self.state[record[1]] = record[2]
+        elif kind == '-':
+            self.state.pop(record[1], None)
+        elif kind == 'P':
+            self.suspended = [s for s in self.suspended if s[0] != record[1]]
+            if self.goal is not None and self.goal != record[1]:
+                self.suspended.append((self.goal, self.remaining_steps))
+            self.goal, self.steps, self.done = record[1], record[2], set()
+        elif kind == 'A':
+            if record[2] in _DONE:  # the first step of that name not done yet
+                for i, (name, _) in enumerate(self.steps):
+                    if name == record[1] and i not in self.done:
+                        self.done.add(i)
+                        break
+        elif kind == 'F':
+            self.goal, self.steps = self.suspended.pop() if self.suspended else (None, [])
+            self.done = set()
+        elif kind == 'S':  # snapshot
+            self.state, self.goal, self.steps, self.done = dict(record[1]), record[2], list(record[3]), set()
+            self.suspended = list(record[4]) if len(record) > 4 else []
+
+    def __compact(self):
+        snapshot = ('S', self.state, self.goal, self.remaining_steps, list(self.suspended))
+        payload = pickle.dumps(snapshot, pickle.HIGHEST_PROTOCOL)
+        temporary = self.path + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            f.flush()
+            os.fsync(f.fileno())
+        self.__file.close()
+        os.replace(temporary, self.path)
+        self.__sync_directory()
+        self.__file = open(self.path, 'ab')
+        self.__apply(snapshot)
+        self.__records = 0
+        self.__unsynced.clear()
+
+    def __sync_directory(self):
+        # make the rename durable (POSIX)
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def __replay(self) -> int:
+        # apply the records of an existing journal; returns the length of its valid part
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        offset = 0
+        while offset + _HEADER.size <= len(data):
+            length, crc = _HEADER.unpack_from(data, offset)
+            payload = data[offset + _HEADER.size:offset + _HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                logger.warning('JOURNAL: %s: DROPPING %d BYTES OF INCOMPLETE RECORDS', self.path, len(data) - offset)
+                break
+            self.__apply(pickle.loads(payload))
+            self.__records += 1
+            offset += _HEADER.size + length
+        return offset
+
+    def __sync_loop(self):
+        while True:
+            self.__unsynced.wait()
+            if self.__stop.wait(self.sync_interval):  # (collects the records of the interval) closed
+                return
+            try:
+                self.sync()
+            except (OSError, ValueError):  # closed meanwhile
+                return
@@ -0,0 +1,171 @@
+#! /usr/bin/env python3
+
+import csv
+import json
+import os
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List
+
+from action_graph.action import Action, State
+
+
+# a literal "..." in the data files marks a templated (variable) effect
+TEMPLATE_MARKER = '...'
+
+
+class ActionDefinitionException(Exception):
+    pass
+
+
+class DataAction(Action):
+    """Action defined by data (rows of a JSON/YAML/CSV file) rather than by a subclass of Action"""
+
+    def __init__(self, agent=None, name: str = None, effects: State = None, preconditions: State = None,
+                 cost: float = None, timeout: float = None, allow_async: bool = None,
+                 handler: Callable = None) -> None:
+        super().__init__(agent)
+        self.name = name or self.__class__.__name__
+        if effects is not None:
+            self.effects = effects
+        if preconditions is not None:
+            self.preconditions = preconditions
+        if cost is not None:
+            self.cost = cost
+        if timeout is not None:
+            self.timeout = timeout
+        if allow_async is not None:
+            self.allow_async = allow_async
+        # optional callable bound as on_execute; called as handler(action, outcome)
+        self.handler = handler
+
+    def on_execute(self, outcome: State):
+        if self.handler is None:
+            return super().on_execute(outcome)
+        return self.handler(self, outcome)
+
+    def __repr__(self) -> str:
+        return self.name
+
+    def _identity(self) -> str:
+        return self.name
+
+
+def actions_from_rows(rows: Iterable[Dict[str, Any]], agent=None,
+                      handlers: Dict[str, Callable] = None) -> Iterator[DataAction]:
+    """
+    Build actions from an iterable of rows (dictionaries); rows are consumed lazily.
+
+    Recognized fields: name, effects, preconditions, cost, timeout, allow_async, handler.
+    The value "..." in effects marks a templated effect; handler is looked up in `handlers`.
+
+    :param rows:Iterable[Dict]: Action definitions
+    :param agent:Agent=None: Agent the actions belong to
+    :param handlers:Dict[str, Callable]=None: Named callables to bind as on_execute
+    :return:Iterator[DataAction]: Actions, in the order of the rows
+    """
+
+    handlers = handlers or {}
+    for ix, row in enumerate(rows):
+        if not row.get('name'):
+            raise ActionDefinitionException(f'Row {ix}: action name is missing')
+        handler = None
+        if row.get('handler'):
+            if row['handler'] not in handlers:
+                raise ActionDefinitionException(f"Row {ix}: unknown handler [{row['handler']}]")
+            handler = handlers[row['handler']]
+        yield DataAction(agent,
+                         name=row['name'],
+                         effects=_decode_effects(row.get('effects')),
+                         preconditions=dict(row.get('preconditions') or {}),
+                         cost=_optional(float, row.get('cost')),
+                         timeout=_optional(float, row.get('timeout')),
+                         allow_async=_optional(_to_bool, row.get('allow_async')),
+                         handler=handler)
+
+
+def load_json(stream: IO, agent=None, handlers: Dict[str, Callable] = None) -> Iterator[DataAction]:
+    """
+    Load actions from a JSON array of rows or from JSON lines (one row per line; streamed).
+    """
+
+    first = stream.read(1)
+    while first and first.isspace():
+        first = stream.read(1)
+    if first == '[':
+        return actions_from_rows(json.loads(first + stream.read()), agent, handlers)
+    return actions_from_rows(_json_lines(first, stream), agent, handlers)
+
+
+def load_yaml(stream: IO, agent=None, handlers: Dict[str, Callable] = None) -> Iterator[DataAction]:
+    """
+    Load actions from YAML; either a list of rows, or one row per document. Requires PyYAML.
+    """
+
+    try:
+        import yaml
+    except ImportError as _ex:
+        raise ImportError('PyYAML is required to load actions from YAML files') from _ex
+
+    def rows():
+        for doc in yaml.safe_load_all(stream):
+            if isinstance(doc, list):
+                yield from doc
+            elif doc:
+                yield doc
+
+    return actions_from_rows(rows(), agent, handlers)
+
+
+def load_csv(stream: IO, agent=None, handlers: Dict[str, Callable] = None) -> Iterator[DataAction]:
+    """
+    Load actions from CSV with a header row; effects/preconditions columns hold JSON objects.
+    """
+
+    def rows():
+        for row in csv.DictReader(stream):
+            row = {k: v for k, v in row.items() if v not in (None, '')}
+            for field in ('effects', 'preconditions'):
+                if field in row:
+                    row[field] = json.loads(row[field])
+            yield row
+
+    return actions_from_rows(rows(), agent, handlers)
+
+
+def load_file(path: str, agent=None, handlers: Dict[str, Callable] = None) -> List[DataAction]:
+    """
+    Load all actions from a .json/.jsonl/.yaml/.yml/.csv file.
+
+    :param path:str: File path; the format is chosen by the extension
+    :return:List[DataAction]: Loaded actions
+    """
+
+    loaders = {'.json': load_json, '.jsonl': load_json,
+               '.yaml': load_yaml, '.yml': load_yaml,
+               '.csv': load_csv}
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in loaders:
+        raise ActionDefinitionException(f'Unsupported action definition file: {path}')
+    with open(path, 'r', encoding='utf-8', newline='') as stream:
+        return list(loaders[ext](stream, agent, handlers))
+
+
+def _json_lines(first: str, stream: IO) -> Iterator[Dict[str, Any]]:
+    line = first + stream.readline()
+    while line:
+        if line.strip():
+            yield json.loads(line)
+        line = stream.readline()
+
+
+def _decode_effects(effects: Dict[str, Any]) -> State:
+    return {k: (Ellipsis if v == TEMPLATE_MARKER else v) for k, v in (effects or {}).items()}
+
+
+def _optional(cast: Callable, value: Any) -> Any:
+    return None if value is None else cast(value)
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes')
+    return bool(value)
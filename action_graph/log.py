@@ -0,0 +1,95 @@
+#! /usr/bin/env python3
+
+import copy
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import List
+
+LOGGER_NAME = 'action_graph'
+CONSOLE_FORMAT = '>>>%(levelname)s > %(message)s'
+
+_listener: QueueListener = None
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queue handler that leaves the formatting (layout) of the records to the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the arguments may be live (mutable) objects, e.g. the agent state, that change before the
+        # listener gets to the record: merge them into the message now. Render the traceback too,
+        # so that the record does not keep the frames (and their locals) alive while queued.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def enable_console_logging(level: int = logging.INFO, fmt: str = CONSOLE_FORMAT) -> logging.Handler:
+    """
+    Log the messages of action_graph to the console (stderr).
+
+    :param level:int: Logging level of the console handler
+    :param fmt:str: Format of the messages
+    :return:logging.Handler: The console handler
+    """
+
+    console = logging.StreamHandler()
+    console.setLevel(level)
+    console.setFormatter(logging.Formatter(fmt))
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.addHandler(console)
+    if logger.getEffectiveLevel() > level:
+        logger.setLevel(level)
+    return console
+
+
+def enable_async_logging(handlers: List[logging.Handler] = None) -> QueueListener:
+    """
+    Non-blocking logging: the action_graph loggers only put the records on a queue;
+    formatting and writing happens on a background thread.
+
+    :param handlers:List[logging.Handler]=None: Handlers that do the actual writing;
+                                                by default, the handlers currently attached to the action_graph logger.
+    :return:QueueListener: The (started) listener
+    """
+
+    global _listener
+    disable_async_logging()
+
+    logger = logging.getLogger(LOGGER_NAME)
+    if handlers is None:
+        handlers = [h for h in logger.handlers if not isinstance(h, logging.NullHandler)]
+    for handler in list(logger.handlers):
+        if not isinstance(handler, logging.NullHandler):
+            logger.removeHandler(handler)
+
+    records = queue.SimpleQueue()
+    logger.addHandler(_DeferredQueueHandler(records))
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def disable_async_logging():
+    """
+    Stop the background logging thread (flushing the queued records) and
+    re-attach its handlers directly to the action_graph logger.
+    """
+
+    global _listener
+    if _listener is None:
+        return
+
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        if isinstance(handler, _DeferredQueueHandler):
+            logger.removeHandler(handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        logger.addHandler(handler)
+    _listener = None
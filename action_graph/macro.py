@@ -0,0 +1,145 @@
+#! /usr/bin/env python3
+
+from collections import Counter
+from typing import Dict, Iterable, List
+
+from action_graph.action import Action, Increment, State
+from action_graph.loader import ActionDefinitionException
+
+
+class MacroAction(Action):
+    """
+    Composite action: a fixed sequence of (bound) actions that the planner uses as a single step.
+    Its preconditions, effects and cost are aggregated from the steps: the preconditions not
+    satisfied by earlier steps, the final values of all effects (relative effects add up) and the sum of the costs.
+    The agent executes the underlying steps (see expand_macros).
+    """
+
+    steps: List[Action] = []
+
+    def __init__(self, agent=None, steps: List[Action] = None, name: str = None) -> None:
+        super().__init__(agent)
+        if steps is not None:
+            self.steps = list(steps)
+        self.name = name or '+'.join(str(s) for s in self.steps) or self.__class__.__name__
+        self.preconditions, self.effects = self.__aggregate(self.steps)
+        self.cost = sum(s.cost for s in self.steps)
+
+    def __aggregate(self, steps: List[Action]):
+        preconditions: State = {}
+        effects: State = {}
+        for step in steps:
+            if Ellipsis in step.effects.values():
+                raise ActionDefinitionException(f'{self.name}: step {step} has templated (unbound) effects')
+            for pk, pv in step.preconditions.items():
+                # references to the step's own effects
+                while isinstance(pv, str) and pv[:1] == '$' and pv[1:] in step.effects:
+                    pv = step.effects[pv[1:]]
+                if pk in effects:
+                    if isinstance(effects[pk], Increment):
+                        raise ActionDefinitionException(f'{self.name}: step {step} requires {pk}={pv}; '
+                                                        f'earlier steps change it by {effects[pk]}')
+                    if effects[pk] != pv:
+                        raise ActionDefinitionException(f'{self.name}: step {step} requires {pk}={pv}; '
+                                                        f'earlier steps set it to {effects[pk]}')
+                    continue
+                if pk in preconditions and preconditions[pk] != pv:
+                    raise ActionDefinitionException(f'{self.name}: conflicting preconditions {pk}={pv}')
+                preconditions[pk] = pv
+            for k, v in step.effects.items():
+                if isinstance(v, Increment) and k in effects:  # relative (numeric) effects add up
+                    previous = effects[k]
+                    v = Increment(previous.delta + v.delta) if isinstance(previous, Increment) else v.apply(previous)
+                effects[k] = v
+        return preconditions, effects
+
+    def on_execute(self, outcome: State):
+        raise ActionDefinitionException(f'{self.name}: macro actions are executed step by step (see expand_macros)')
+
+    def __repr__(self) -> str:
+        return self.name
+
+    def _identity(self) -> str:
+        return self.name
+
+
+def expand_macros(plan: List[Action], state: State = None) -> List[Action]:
+    """
+    Replace the macro actions of a plan by (copies of) their steps.
+    A macro stands for its whole sequence, also when part of it was already executed; given the
+    (start) state, the steps of a macro whose effects already hold at that point are left out.
+
+    :param plan:List[Action]: Plan
+    :param state:State=None: State the plan starts from
+    :return:List[Action]: Plan of executable actions
+    """
+
+    state = dict(state) if state is not None else None
+    expanded: List[Action] = []
+    for action in plan:
+        if isinstance(action, MacroAction):
+            for step in expand_macros(action.steps):
+                if state is not None and all(k in state and state[k] == v for k, v in step.effects.items()):
+                    continue  # already achieved
+                expanded.append(step.__copy__())
+                if state is not None:
+                    step.apply_effects(step.effects, state)
+        else:
+            expanded.append(action)
+            if state is not None:
+                action.apply_effects(action.effects, state)
+    return expanded
+
+
+class MacroLearner():
+    """Learns macro actions from the fragments (contiguous sub-sequences) that recur in the observed plans"""
+
+    def __init__(self, min_length: int = 2, max_length: int = 4, min_support: int = 3) -> None:
+        """
+        :param min_length:int: Minimum number of steps of a macro
+        :param max_length:int: Maximum number of steps of a macro
+        :param min_support:int: Number of times a fragment has to be observed before it becomes a macro
+        """
+
+        self.min_length = min_length
+        self.max_length = max_length
+        self.min_support = min_support
+        self.__counts: Counter = Counter()
+        self.__fragments: Dict[tuple, List[Action]] = {}
+
+    def observe(self, plan: Iterable[Action]):
+        """
+        Count the fragments of a (generated or executed) plan.
+
+        :param plan:Iterable[Action]: Plan; macro actions in it are expanded
+        """
+
+        plan = expand_macros(list(plan))
+        for length in range(self.min_length, min(self.max_length, len(plan)) + 1):
+            for i in range(len(plan) - length + 1):
+                fragment = plan[i:i + length]
+                key = tuple(step.signature() for step in fragment)
+                try:
+                    self.__counts[key] += 1
+                except TypeError:  # unhashable state values
+                    continue
+                if key not in self.__fragments:
+                    self.__fragments[key] = [step.__copy__() for step in fragment]
+
+    def macros(self, agent=None) -> List[MacroAction]:
+        """
+        Macro actions of the frequent fragments; the longest fragments first.
+        Fragments whose steps do not form a consistent sequence are left out.
+
+        :param agent:Agent=None: Agent the macro actions are created for
+        :return:List[MacroAction]: Macro actions
+        """
+
+        macros: List[MacroAction] = []
+        frequent = [key for key, count in self.__counts.items() if count >= self.min_support]
+        for key in sorted(frequent, key=len, reverse=True):
+            try:
+                macros.append(MacroAction(agent, self.__fragments[key]))
+            except ActionDefinitionException:
+                continue
+        return macros
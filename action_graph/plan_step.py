@@ -0,0 +1,93 @@
+#! /usr/bin/env python3
+
+from typing import Any, Tuple
+
+from action_graph.action import Action, State
+
+
+class PlanStep():
+    """
+    Compact, immutable step of a plan; e.g. to retain plans (histories, caches) in memory.
+    Holds the loaded action the step was planned from, and only the effect values bound when planning
+    (templated values, numeric totals); the preconditions and the other effect values are those of the action,
+    shared by all its steps. to_action() returns an executable step again.
+    """
+
+    __slots__ = ('action', 'bound', 'cost')
+
+    def __init__(self, action: Action, bound: Tuple[Tuple[Any, Any], ...] = (), cost: float = None) -> None:
+        """
+        :param action:Action: Loaded action (the definition of the step)
+        :param bound:Tuple: (effect key, value) pairs that differ from the effects of the action
+        :param cost:float=None: Cost of the step, if it differs from that of the action
+        """
+
+        object.__setattr__(self, 'action', action)
+        object.__setattr__(self, 'bound', bound)
+        object.__setattr__(self, 'cost', cost)
+
+    @classmethod
+    def of(cls, step: Action) -> 'PlanStep':
+        """
+        Compact form of a planned step (a copy of a loaded action, see Action.__copy__).
+        """
+
+        action = step._definition if step._definition is not None else step
+        defined = action.effects
+        bound = tuple((k, v) for k, v in step.effects.items()
+                      if k not in defined or (defined[k] is not v and not _same(defined[k], v)))
+        return cls(action, bound, step.cost if step.cost != action.cost else None)
+
+    @property
+    def name(self) -> str:
+        return str(self.action)
+
+    @property
+    def effects(self) -> State:
+        """Expected outcome of the step (a new dict)"""
+
+        effects = dict(self.action.effects)
+        effects.update(self.bound)
+        return effects
+
+    @property
+    def preconditions(self) -> State:
+        return self.action.preconditions
+
+    def to_action(self) -> Action:
+        """
+        Executable (bound) copy of the action.
+        """
+
+        step = self.action.__copy__()
+        step.effects.update(self.bound)
+        if self.cost is not None:
+            step.cost = self.cost
+        return step
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def __delattr__(self, name: str):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def __eq__(self, __o: object) -> bool:
+        if not isinstance(__o, PlanStep):
+            return NotImplemented
+        return self.action is __o.action and self.bound == __o.bound and self.cost == __o.cost
+
+    def __hash__(self):
+        try:
+            return hash((id(self.action), self.bound, self.cost))
+        except TypeError:  # unhashable effect values
+            return hash((id(self.action), self.cost))
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+def _same(defined: Any, value: Any) -> bool:
+    try:
+        return type(defined) is type(value) and bool(defined == value)
+    except Exception:
+        return False
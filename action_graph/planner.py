@@ -2,19 +2,210 @@
 
 import sys
 from collections import defaultdict
-from typing import Any, Dict, List, Tuple
+from heapq import heappop, heappush
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
 
-from action_graph.action import Action, State, ImpossibleAction
+from action_graph.action import Action, Comparison, Increment, State, ImpossibleAction
+from action_graph.loader import ActionDefinitionException
+from action_graph.macro import MacroAction
+from action_graph.plan_step import PlanStep
 
 
 class PlanningFailedException(Exception):
     pass
 
 
+# kinds of the (precompiled) precondition values; see Planner.__compile_references
+_VALUE, _BOUND_EFFECT, _STATE_REFERENCE = 0, 1, 2
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class _Placeholder():
+    """Symbolic target value used for lifted planning; equal only to itself"""
+
+    def __repr__(self) -> str:
+        return '<?>'
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class _RecordedState():
+    """Read-only view of a start state; records the values read from it (during a lifted search)"""
+
+    ABSENT = object()
+
+    def __init__(self, state: State) -> None:
+        self.state = state
+        self.reads: Dict[Any, Any] = {}
+
+    def __contains__(self, key: Any) -> bool:
+        self.reads[key] = self.state.get(key, self.ABSENT)
+        return key in self.state
+
+    def __getitem__(self, key: Any) -> Any:
+        self.reads[key] = self.state.get(key, self.ABSENT)
+        return self.state[key]
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def matches(self, state: State) -> bool:
+        # whether the values read are the same in another state
+        return all(state.get(k, self.ABSENT) == v for k, v in self.reads.items())
+
+
+class _LiftedGuards():
+    """Comparisons under which a lifted plan (skeleton) is valid for a concrete target value"""
+
+    def __init__(self) -> None:
+        # keys whose state value / exact achievers were looked up with the placeholder
+        self.keys: set = set()
+        # keys that (for numeric target values) are reached by repeating relative effects
+        self.numeric_keys: set = set()
+        # (action, effect key) slots bound to the placeholder; and the concrete values bound to them
+        self.symbolic_slots: set = set()
+        self.bindings: defaultdict = defaultdict(set)
+        self.hashable: bool = True
+
+    def bind(self, action: Action, key: Any, value: Any):
+        slot = (action._identity(), key)
+        if isinstance(value, _Placeholder):
+            self.symbolic_slots.add(slot)
+            return
+        try:
+            self.bindings[slot].add(value)
+        except TypeError:
+            self.hashable = False
+
+    def admit(self, value: Any, start_state: State, action_lookup: Dict[Tuple[Any, Any], List[Action]]) -> bool:
+        for k in self.keys:
+            if (k in start_state and start_state[k] == value) or action_lookup.get((k, value)):
+                return False
+            if k in self.numeric_keys and (_is_number(value) or isinstance(value, Comparison)):
+                return False
+        # a concrete step with the same value would have been merged with the symbolic one
+        return not any(value in self.bindings.get(slot, ()) for slot in self.symbolic_slots)
+
+
+class _Reachability():
+    """
+    Forward (relaxed) reachability of the state values from a start state: a value is reachable if an action
+    whose preconditions are all reachable sets it. Each reachable value has a lower bound (h_max) of the cost
+    of any plan that achieves it: the cost of its cheapest achiever plus that of its most expensive precondition.
+    """
+
+    ANY = object()  # any value of the key (set by templated or relative effects); as a precondition: not known yet
+
+    def __init__(self, actions: List[Tuple[Action, List[Tuple[Any, Any]], float]], start_state: State) -> None:
+        """
+        :param actions:List[Tuple[Action, List[Tuple[Any, Any]], float]]: (action, its (resolved) preconditions, cost)
+        :param start_state:State: Start state
+        """
+
+        self.costs: Dict[Any, Dict[Any, float]] = defaultdict(dict)  # key: {value: lower bound of the cost}
+        self.__queue: List[tuple] = []
+        self.__pushed = 0
+        # pending preconditions, indexed by the (key, value) that meets them; comparisons (and unhashable values) by key
+        exact: Dict[Tuple[Any, Any], List[Tuple[int, int]]] = defaultdict(list)
+        compared: Dict[Any, List[Tuple[int, int]]] = defaultdict(list)
+        by_key: Dict[Any, List[Tuple[int, int]]] = defaultdict(list)
+        remaining: List[int] = []
+        for i, (action, preconditions, cost) in enumerate(actions):
+            remaining.append(0)
+            for j, (pk, pv) in enumerate(preconditions):
+                if pv is self.ANY:
+                    continue
+                remaining[i] += 1
+                by_key[pk].append((i, j))
+                try:
+                    exact[(pk, pv)].append((i, j)) if not isinstance(pv, Comparison) else compared[pk].append((i, j))
+                except TypeError:
+                    compared[pk].append((i, j))
+        for k, v in start_state.items():
+            self.__reach(k, v, 0.0)
+        for i, (action, _, cost) in enumerate(actions):
+            if not remaining[i]:
+                self.__apply(action, cost)
+        # values in order of their cost (Dijkstra); an action applies once its last precondition is reached
+        met: set = set()
+        reached: set = set()
+        while self.__queue:
+            cost, _, k, v = heappop(self.__queue)
+            if (k, v) in reached:
+                continue
+            reached.add((k, v))
+            if v is self.ANY:
+                candidates = by_key.get(k, ())
+            else:
+                candidates = exact.get((k, v), []) + [(i, j) for i, j in compared.get(k, ()) if v == actions[i][1][j][1]]
+            for i, j in candidates:
+                if (i, j) in met:
+                    continue
+                met.add((i, j))
+                remaining[i] -= 1
+                if not remaining[i]:
+                    self.__apply(actions[i][0], cost + actions[i][2])
+
+    def cost(self, key: Any, value: Any) -> float:
+        """
+        :return:float: Lower bound of the cost of achieving the value; infinite if it is not reachable
+        """
+
+        if value is self.ANY:
+            return 0.0
+        values = self.costs.get(key)
+        if not values:
+            return float('inf')
+        any_value = values.get(self.ANY, float('inf'))
+        try:
+            if not isinstance(value, Comparison):
+                return min(any_value, values.get(value, float('inf')))
+        except TypeError:  # unhashable; reached as ANY
+            pass
+        return min([any_value] + [c for v, c in values.items() if v is not self.ANY and v == value])
+
+    def __apply(self, action: Action, cost: float):
+        for k, v in action.effects.items():
+            self.__reach(k, self.ANY if v is Ellipsis or isinstance(v, Increment) else v, cost)
+
+    def __reach(self, key: Any, value: Any, cost: float):
+        try:
+            hash(value)
+        except TypeError:
+            value = self.ANY
+        values = self.costs[key]
+        if value in values and values[value] <= cost:
+            return
+        values[value] = cost
+        self.__pushed += 1
+        heappush(self.__queue, (cost, self.__pushed, key, value))
+
+
 class Planner():
     """Search and determine a plan (sequence of actions) that satifies a desired goal state"""
 
-    def __init__(self, actions: List[Action]) -> None:
+    LIFTED_CACHE_SIZE: int = 1024
+    # (maximum) number of values of a numeric state variable explored to plan the repetition of relative effects
+    NUMERIC_SEARCH_LIMIT: int = 100_000
+
+    def __init__(self, actions: List[Action], cost_model: Callable[[Action], float] = None) -> None:
+        """
+        :param actions:List[Action]: Actions available to the Planner
+        :param cost_model:Callable[[Action], float]=None: Cost of a plan step (e.g. ActionStatistics.expected_cost);
+                                                          by default, the cost of the action.
+        """
+
+        self.cost_model = cost_model
+        # search effort, accumulated over the calls: sub-goals searched (nodes) and action paths costed
+        self.expanded: int = 0
+        self.costed: int = 0
         self.update_actions(actions)
 
     def update_actions(self, actions: List[Action]):
@@ -24,58 +215,246 @@ class Planner():
         :param actions:List[Action]: List of actions (instances of Action class)
         """
 
+        self._references: Dict[int, List[Tuple[Any, int, Any]]] = {}
+        self._actions: List[Action] = []
+        self._macros: int = 0  # number of macro actions; see generate_plan
+        self._reachability: Tuple[Any, _Reachability] = (None, None)  # of the last start state (and avoided actions)
+        # key: actions with a numeric (absolute or relative) effect on it
+        self._numeric_actions: defaultdict = defaultdict(list)
+        self._lifted_plans: Dict[Tuple, Tuple[_Placeholder, List[Action], _LiftedGuards, _RecordedState]] = {}
         self._action_lookup: defaultdict = self.__create_action_lookup(actions)
 
-    def generate_plan(self, target_state: State, start_state: State, avoid_actions: List[Action] = None) -> List[Action]:
+    def add_actions(self, actions: Iterable[Action]):
+        """
+        Adds actions to the ones already available to the Planner; actions are indexed
+        as they are consumed, so large (streamed) action libraries need not be held in a list.
+
+        :param actions:Iterable[Action]: Actions (instances of Action class) to add
+        """
+
+        for action in actions:
+            self.__index_action(self._action_lookup, action)
+        self._lifted_plans.clear()
+        self._reachability = (None, None)
+
+    def clear_cache(self):
+        """
+        Forget the cached plan skeletons (see generate_lifted_plan); required after the costs of actions
+        (or the cost model) change.
+        """
+
+        self._lifted_plans.clear()
+        self._reachability = (None, None)
+
+    def generate_plan(self, target_state: State, start_state: State, avoid_actions: List[Action] = None,
+                      memo: dict = None, bidirectional: bool = False) -> List[Action]:
         """
         Find and return an optimal sequence of actions (the plan) that will 
         lead from the start state to the target state.
 
         :param target_state:State: Desired goal (target) state
         :param start_state:State: Current/start state of the system
+        :param memo:dict=None: Sub-plans searched in this call are kept in (and reused from) this dict;
+                               share it between calls to plan in batch (e.g. many goals from the same states).
+                               Valid only as long as the actions of the Planner do not change.
+        :param bidirectional:bool=False: Sweep forward from the start state first (see _Reachability); the backward
+                                         search then skips the actions whose preconditions cannot be reached and
+                                         the alternatives whose lower bound cannot beat the best plan found so far.
+                                         Returns the same plan; on deep domains with a large fan-in, much faster.
         :return:List[Action]: List of actions updated with their expected outcomes (effects)
         """
 
+        tk, tv = self.__target_item(target_state, start_state)
+        if memo is None and self._macros:
+            # macros add alternatives for the same sub-goals (over and over); each is searched once per call
+            memo = {}
+        if memo is not None:
+            try:  # sub-plans depend on the start state and the avoided actions (and the search mode)
+                memo = memo.setdefault((frozenset(start_state.items()), frozenset(avoid_actions or ()), bidirectional), {})
+            except TypeError:  # unhashable state values; cannot be memoised
+                memo = None
+        reach = self.__reachability(start_state, avoid_actions) if bidirectional else None
+        plan = self.__plan(tk, tv, start_state, avoid_actions, memo=memo, reach=reach)
+        # memoised steps are shared between plans; each plan gets its own (executable) copies
+        return [step.__copy__() for step in plan] if memo is not None else plan
+
+    def generate_plans(self, target_state: State, start_state: State, avoid_actions: List[Action] = None,
+                       k: int = 3, min_difference: int = 0) -> List[List[Action]]:
+        """
+        Find the k cheapest plans (in a single search) from the start state to the target state.
+        Each sub-goal keeps its cheapest sub-plans instead of only the cheapest one; the first plan
+        is the one generate_plan returns (if it finds one). Where sub-plans share actions, the ranking of the
+        alternatives beyond the first is approximate.
+
+        :param target_state:State: Desired goal (target) state
+        :param start_state:State: Current/start state of the system
+        :param k:int: (Maximum) number of plans to return
+        :param min_difference:int: Minimum number of actions in which each plan differs from each cheaper one
+        :return:List[List[Action]]: Plans, cheapest first
+        """
+
+        tk, tv = self.__target_item(target_state, start_state)
+        # diversity filters out candidates; keep proportionally more of them per sub-goal
+        width = k * (min_difference + 1)
+        candidates = self.__plans(tk, tv, start_state, avoid_actions, width, {}, True)
+        plans: List[Tuple[List[Action], set]] = []
+        for path, _ in candidates:
+            steps = set(path)
+            if all(len(steps ^ other) >= min_difference for _, other in plans):
+                plans.append((path, steps))
+                if len(plans) == k:
+                    break
+        return [path for path, _ in plans]
+
+    def check_plan(self, plan: List[Action], target_state: State, start_state: State) -> List[Action]:
+        """
+        Check whether a (previously generated) plan still leads from the start state to the target state.
+
+        :param plan:List[Action]: Plan, e.g. from generate_plan/generate_plans
+        :param target_state:State: Desired goal (target) state
+        :param start_state:State: Current/start state of the system
+        :return:List[Action]: The steps of the plan still to be executed (steps whose effects
+                              already hold are left out); None if the plan does not lead to the target
+        """
+
+        state = dict(start_state)
+        steps: List[Action] = []
+        for action in plan:
+            if all(k in state and state[k] == v for k, v in action.effects.items()):
+                continue  # already achieved
+            for pk, pv in action.preconditions.items():
+                # `@` refers to the start state (as when the plan was generated)
+                pv = self.__parse_references(self.__parse_references(pv, action.effects, '$'), start_state, '@')
+                if pk not in state or state[pk] != pv:
+                    return None
+            action.apply_effects(action.effects, state)
+            steps.append(action)
+        for tk, tv in target_state.items():
+            if tk not in state or state[tk] != self.__parse_references(tv, start_state, '@'):
+                return None
+        return steps
+
+    def iter_plan(self, target_state: State, start_state: State, avoid_actions: List[Action] = None) -> Iterator[Action]:
+        """
+        Generate the optimal plan step by step; each step is yielded as soon as its position
+        in the plan is fixed, i.e. before the rest of the plan is searched.
+        A step is fixed once no cheaper alternative can displace it; where a goal has alternative
+        actions, those alternatives are costed (fully searched) before their steps are yielded.
+        The feasibility of the whole plan is checked (without costing it) before the first step is
+        yielded; i.e. PlanningFailedException is raised before any step, as by generate_plan.
+
+        :param target_state:State: Desired goal (target) state
+        :param start_state:State: Current/start state of the system
+        :return:Iterator[Action]: Actions updated with their expected outcomes (effects), in plan order
+        """
+
+        tk, tv = self.__target_item(target_state, start_state)
+        if not self.__feasible(tk, tv, start_state, avoid_actions, {}, set()):
+            # no action for the goal; same (single impossible step) as generate_plan
+            yield from self.__plan(tk, tv, start_state, avoid_actions)
+            return
+        yield from self.__iter_plan(tk, tv, start_state, avoid_actions, set(), True)
+
+    def generate_lifted_plan(self, target_state: State, start_state: State, avoid_actions: List[Action] = None) -> List[Action]:
+        """
+        Same as generate_plan; but templated actions are planned with a symbolic target value.
+        The resulting plan skeleton is cached per goal key and instantiated with the requested value;
+        e.g. planning for another product id does not search again. A skeleton is reused as long as
+        the state values it was searched with (only those the search read) are unchanged.
+        Falls back to generate_plan whenever the skeleton does not hold for the requested value.
+
+        :param target_state:State: Desired goal (target) state
+        :param start_state:State: Current/start state of the system
+        :return:List[Action]: List of actions updated with their expected outcomes (effects)
+        """
+
+        tk, tv = self.__target_item(target_state, start_state)
+        try:
+            cache_key = (tk, tuple(avoid_actions or ()))
+            hash(cache_key)
+            hash(tv)
+        except TypeError:  # unhashable values; cannot be cached
+            return self.__plan(tk, tv, start_state, avoid_actions)
+
+        cached = self._lifted_plans.get(cache_key)
+        if cached is None or not cached[3].matches(start_state):
+            placeholder, guards, recorded = _Placeholder(), _LiftedGuards(), _RecordedState(start_state)
+            try:
+                # kept compact; the skeletons are retained (up to LIFTED_CACHE_SIZE of them)
+                skeleton = [PlanStep.of(step) for step in self.__plan(tk, placeholder, recorded, avoid_actions, guards)]
+            except PlanningFailedException:
+                skeleton = None
+            if cache_key not in self._lifted_plans and len(self._lifted_plans) >= self.LIFTED_CACHE_SIZE:
+                self._lifted_plans.pop(next(iter(self._lifted_plans)))
+            cached = self._lifted_plans[cache_key] = (placeholder, skeleton, guards, recorded)
+
+        placeholder, skeleton, guards, _ = cached
+        if skeleton is None or not guards.hashable or not guards.admit(tv, start_state, self._action_lookup):
+            return self.__plan(tk, tv, start_state, avoid_actions)
+        # instantiate the skeleton with the requested value
+        plan: List[Action] = []
+        for step in skeleton:
+            action = step.to_action()
+            for k, v in action.effects.items():
+                if v is placeholder:
+                    action.effects[k] = tv
+            plan.append(action)
+        return plan
+
+    def __target_item(self, target_state: State, start_state: State) -> Tuple[Any, Any]:
         if len(target_state.items()) > 1:
             raise PlanningFailedException(f'target_state [{target_state}] should be a single state')
         tk, tv = list(target_state.items())[0]
         # in case target state value is a reference to another state variable
-        tv = self.__parse_references(tv, start_state, '@')
+        return tk, self.__parse_references(tv, start_state, '@')
+
+    def __plan(self, tk: Any, tv: Any, start_state: State, avoid_actions: List[Action],
+               guards: _LiftedGuards = None, memo: dict = None, reach: _Reachability = None) -> List[Action]:
+        # (references in the target value are resolved by the caller; see __target_item and __preconditions)
+        if memo is not None:
+            try:
+                cached = memo.get((tk, tv))
+            except TypeError:  # unhashable target value
+                return self.__search(tk, tv, start_state, avoid_actions, guards, None, reach)
+            if cached is None:
+                try:
+                    cached = memo[(tk, tv)] = self.__search(tk, tv, start_state, avoid_actions, guards, memo, reach)
+                except PlanningFailedException as ex:
+                    cached = memo[(tk, tv)] = ex
+            if isinstance(cached, PlanningFailedException):
+                raise cached
+            return cached
+        return self.__search(tk, tv, start_state, avoid_actions, guards, None, reach)
+
+    def __search(self, tk: Any, tv: Any, start_state: State, avoid_actions: List[Action],
+                 guards: _LiftedGuards, memo: dict, reach: _Reachability = None) -> List[Action]:
+        self.expanded += 1
+        if guards is not None and isinstance(tv, _Placeholder):
+            guards.keys.add(tk)  # the concrete value decides the two lookups below (see _LiftedGuards.admit)
         # check if the target state is already satisfied
-        if (tk, tv) in list(start_state.items()):
+        elif tk in start_state and start_state[tk] == tv:
             return []   # goal already met, move on
         #
-        # find action(s) that satisfy the state current effect-item
-        probable_actions: List[Action] = self._action_lookup[(tk, tv)]
-        if not probable_actions:  # if no actions are found, try with templated actions
-            probable_actions = self._action_lookup[(tk, Ellipsis)]
-        if avoid_actions:  # actions we do not want to consider for planning
-            probable_actions = [a for a in probable_actions if str(a) not in avoid_actions]
+        probable_actions = self.__probable_actions(tk, tv, start_state, avoid_actions, guards)
         if not probable_actions:
             return [ImpossibleAction(effects={tk: tv})]
+        return self.__choose(probable_actions, start_state, avoid_actions, guards, memo, reach)
 
+    def __choose(self, probable_actions: List[Tuple[Action, list]], start_state: State, avoid_actions: List[Action],
+                 guards: _LiftedGuards, memo: dict, reach: _Reachability = None) -> List[Action]:
+        if reach is not None:
+            return self.__choose_bounded(probable_actions, start_state, avoid_actions, memo, reach)
         chosen_path: List[Action] = []
-        for p_action in probable_actions:  # explore each available action...
-            action = p_action.__copy__()
-            if action.effects[tk] is Ellipsis:
-                action.effects[tk] = tv  # apply variable effects
-            #
-            action_path: List[Action] = []
-            for pk, pv in action.preconditions.items():  # for each pre-condition ...
-                try:  # choose the shortest feasible path
-                    pv = self.__parse_references(pv, action.effects, '$')
-                    action_path.extend(self.generate_plan({pk: pv}, start_state, avoid_actions))  # merge the actions
-                except RecursionError:  # watch out for cyclic references
-                    raise PlanningFailedException(f'Found cyclic references! {pk}:{pv}')
-            # include the current action;  remove duplicates; keep the order intact
-            action_path = self.__make_unique(action_path + [action])
+        chosen_cost: float = 0.0
+        for action, references in probable_actions:  # explore each available action...
+            action_path, path_cost = self.__action_path(action, references, start_state, avoid_actions, guards, memo)
             #
             if not chosen_path:  # if no other path is available...
-                chosen_path = action_path  # use the current path
+                chosen_path, chosen_cost = action_path, path_cost  # use the current path
                 continue
             # if alternative paths exist, use the one with the lowest cost
-            if sum(a.cost for a in action_path) < sum(a.cost for a in chosen_path):
-                chosen_path = action_path
+            if path_cost < chosen_cost:
+                chosen_path, chosen_cost = action_path, path_cost
 
         # check if path is feasible; path cost should be < infinite cost
         impossible_actions = [a for a in chosen_path if a.cost >= sys.float_info.max]
@@ -83,18 +462,382 @@ class Planner():
             raise PlanningFailedException(f'No action available to satisfy: {ia.effects}')
         return chosen_path
 
-    def __create_action_lookup(self, actions: List[Action]) -> Dict[Tuple[Any, Any], List[Action]]:
+    def __choose_bounded(self, probable_actions: List[Tuple[Action, list]], start_state: State,
+                         avoid_actions: List[Action], memo: dict, reach: _Reachability) -> List[Action]:
+        # same choice as __choose (the cheapest path; the first of equally cheap ones); the alternatives are
+        # explored in the order of their lower bounds, those that cannot be chosen (or reached) are skipped
+        bounded: List[Tuple[float, int, Action, list]] = []
+        for index, (action, references) in enumerate(probable_actions):
+            bound = self.__step_cost(action) + max((reach.cost(pk, pv) for pk, pv in
+                                                    self.__preconditions(action, references, start_state)), default=0.0)
+            if bound < float('inf'):
+                bounded.append((bound, index, action, references))
+        if not bounded:  # every alternative includes an unreachable precondition
+            raise PlanningFailedException(f'No action available to satisfy: {probable_actions[0][0].effects}')
+        chosen_path: List[Action] = []
+        chosen_cost, chosen_index = float('inf'), len(probable_actions)
+        for bound, index, action, references in sorted(bounded, key=lambda b: (b[0], b[1])):
+            if chosen_path and (bound > chosen_cost or (bound == chosen_cost and index > chosen_index)):
+                continue
+            action_path, path_cost = self.__action_path(action, references, start_state, avoid_actions, None, memo, reach)
+            if not chosen_path or path_cost < chosen_cost or (path_cost == chosen_cost and index < chosen_index):
+                chosen_path, chosen_cost, chosen_index = action_path, path_cost, index
+        impossible_actions = [a for a in chosen_path if a.cost >= sys.float_info.max]
+        for ia in impossible_actions:
+            raise PlanningFailedException(f'No action available to satisfy: {ia.effects}')
+        return chosen_path
+
+    def __plans(self, tk: Any, tv: Any, start_state: State, avoid_actions: List[Action],
+                width: int, memo: dict, top_level: bool = False) -> List[Tuple[List[Action], float]]:
+        # same search as __plan; keeps (up to) `width` cheapest (path, cost) pairs per sub-goal
+        if tk in start_state and start_state[tk] == tv:
+            return [([], 0.0)]
+        try:
+            memo_key = (tk, tv)
+            if memo_key in memo:
+                return memo[memo_key]
+        except TypeError:  # unhashable target value
+            memo_key = None
+        #
+        self.expanded += 1
+        probable_actions = self.__probable_actions(tk, tv, start_state, avoid_actions)
+        if not probable_actions:
+            impossible = ImpossibleAction(effects={tk: tv})
+            return [([impossible], impossible.cost)]
+
+        candidates: List[Tuple[List[Action], float]] = []
+        for action, references in probable_actions:
+            self.costed += 1
+            paths: List[Tuple[List[Action], float]] = [([], 0.0)]
+            for pk, pv in self.__preconditions(action, references, start_state):
+                try:
+                    sub_paths = self.__plans(pk, pv, start_state, avoid_actions, width, memo)
+                except RecursionError:  # watch out for cyclic references
+                    raise PlanningFailedException(f'Found cyclic references! {pk}:{pv}')
+                paths = self.__best([self.__make_unique(path + sub_path)
+                                     for path, _ in paths for sub_path, _ in sub_paths], width)
+            candidates.extend(self.__make_unique(path + [action]) for path, _ in paths)
+        # infeasible paths (with impossible actions) cost at least the impossible action itself
+        feasible = [c for c in self.__best(candidates, width) if c[1] < sys.float_info.max]
+        if not feasible:
+            if top_level:
+                raise PlanningFailedException(f'No action available to satisfy: {({tk: tv})}')
+            impossible = ImpossibleAction(effects={tk: tv})
+            feasible = [([impossible], impossible.cost)]
+        if memo_key is not None:
+            memo[memo_key] = feasible
+        return feasible
+
+    def __best(self, paths: List[Tuple[List[Action], float]], width: int) -> List[Tuple[List[Action], float]]:
+        # cheapest distinct paths; stable, i.e. ties are kept in search order (as in __plan)
+        best: List[Tuple[List[Action], float]] = []
+        seen = set()
+        for path, cost in sorted(paths, key=lambda pc: pc[1]):
+            steps = tuple(path)
+            if steps in seen:
+                continue
+            seen.add(steps)
+            best.append((path, cost))
+            if len(best) == width:
+                break
+        return best
+
+    def __iter_plan(self, tk: Any, tv: Any, start_state: State, avoid_actions: List[Action],
+                    emitted: set, top_level: bool) -> Iterator[Action]:
+        if tk in start_state and start_state[tk] == tv:
+            return
+        #
+        self.expanded += 1
+        probable_actions = self.__probable_actions(tk, tv, start_state, avoid_actions)
+        if len(probable_actions) == 1:
+            # no alternatives; the sub-plans of the preconditions come first, in order
+            action, references = probable_actions[0]
+            for pk, pv in self.__preconditions(action, references, start_state):
+                try:
+                    yield from self.__iter_plan(pk, pv, start_state, avoid_actions, emitted, False)
+                except RecursionError:  # watch out for cyclic references
+                    raise PlanningFailedException(f'Found cyclic references! {pk}:{pv}')
+            steps = [action]
+        else:
+            # alternatives (or none at all) have to be costed before any step is fixed
+            steps = self.__plan(tk, tv, start_state, avoid_actions)
+        #
+        for step in steps:
+            if step.cost >= sys.float_info.max and not top_level:
+                raise PlanningFailedException(f'No action available to satisfy: {step.effects}')
+            if step not in emitted:
+                emitted.add(step)
+                yield step
+
+    def __feasible(self, tk: Any, tv: Any, start_state: State, avoid_actions: List[Action],
+                   memo: dict, visiting: set) -> bool:
+        # whether __plan finds a plan, without costing the paths: True if it does; False if it returns
+        # an impossible step (no action for the goal); raises PlanningFailedException where __plan does
+        if tk in start_state and start_state[tk] == tv:
+            return True
+        try:
+            item = (tk, tv)
+            if item in memo:
+                return memo[item]
+            if item in visiting:  # __plan recurses until RecursionError
+                raise PlanningFailedException(f'Found cyclic references! {tk}:{tv}')
+        except TypeError:  # unhashable target value; no memo/cycle check
+            item = None
+        self.expanded += 1
+        probable_actions = self.__probable_actions(tk, tv, start_state, avoid_actions)
+        if not probable_actions:
+            feasible = False
+        else:
+            if item is not None:
+                visiting.add(item)
+            try:
+                feasible = self.__any_feasible(probable_actions, start_state, avoid_actions, memo, visiting)
+            finally:
+                if item is not None:
+                    visiting.discard(item)
+            if not feasible:  # the cheapest path includes an impossible step
+                raise PlanningFailedException(f'No action available to satisfy: {({tk: tv})}')
+        if item is not None:
+            memo[item] = feasible
+        return feasible
+
+    def __any_feasible(self, probable_actions: List[Tuple[Action, list]], start_state: State,
+                       avoid_actions: List[Action], memo: dict, visiting: set) -> bool:
+        any_feasible = False
+        for action, references in probable_actions:  # all are explored (and may raise), as by __choose
+            feasible = True
+            for pk, pv in self.__preconditions(action, references, start_state):
+                feasible = self.__feasible(pk, pv, start_state, avoid_actions, memo, visiting) and feasible
+            any_feasible = any_feasible or feasible
+        return any_feasible
+
+    def __probable_actions(self, tk: Any, tv: Any, start_state: State, avoid_actions: List[Action],
+                           guards: _LiftedGuards = None) -> List[Tuple[Action, list]]:
+        # find action(s) that satisfy the state current effect-item
+        probable_actions: List[Action] = self._action_lookup.get((tk, tv))
+        if isinstance(tv, Comparison):  # actions that set a value that meets the condition
+            probable_actions = probable_actions or [a for a in self._numeric_actions.get(tk, ())
+                                                    if _is_number(a.effects[tk]) and tv == a.effects[tk]]
+        elif not probable_actions:  # if no actions are found, try with templated actions
+            probable_actions = self._action_lookup.get((tk, Ellipsis), [])
+        if not probable_actions and tk in self._numeric_actions:
+            if guards is not None and isinstance(tv, _Placeholder):
+                guards.numeric_keys.add(tk)
+            elif _is_number(tv) or isinstance(tv, Comparison):  # repeat actions with relative effects
+                return self.__repetition(tk, tv, start_state, avoid_actions)
+        if avoid_actions:  # actions we do not want to consider for planning (also as steps of macro actions)
+            probable_actions = [a for a in probable_actions if str(a) not in avoid_actions and
+                                not any(str(step) in avoid_actions for step in getattr(a, 'steps', ()))]
+        # macro actions that end with achieving the target come first; i.e. they win ties with the flat
+        # actions (the same steps); otherwise they compete on cost as any other alternative
+        if any(isinstance(a, MacroAction) for a in probable_actions):
+            probable_actions = sorted(probable_actions,
+                                      key=lambda a: not (isinstance(a, MacroAction) and tk in a.steps[-1].effects))
+        # copies of the actions, with the templated effect bound to the target value
+        bound_actions: List[Tuple[Action, list]] = []
+        for p_action in probable_actions:
+            action = p_action.__copy__()
+            if action.effects[tk] is Ellipsis:
+                action.effects[tk] = tv  # apply variable effects
+                if guards is not None:
+                    guards.bind(action, tk, tv)
+            bound_actions.append((action, self._references[id(p_action)]))
+        return bound_actions
+
+    def __repetition(self, tk: Any, tv: Any, start_state: State, avoid_actions: List[Action]) -> List[Tuple[Action, list]]:
+        # the cheapest sequence of actions with relative (Increment/Decrement) effects on tk that takes it
+        # from its start value to the target value; a single (macro) step with the values bound along the way.
+        # The variable has to be in the start state (a missing key does not meet any precondition).
+        start = start_state[tk] if tk in start_state else None
+        if not _is_number(start):
+            return []
+        steps: List[Tuple[Action, float, float, list]] = []  # action, delta, cost, preconditions on tk
+        for action in self._numeric_actions[tk]:
+            effect = action.effects[tk]
+            if not isinstance(effect, Increment) or not effect.delta or Ellipsis in action.effects.values():
+                continue
+            if avoid_actions and str(action) in avoid_actions:
+                continue
+            guards = [self.__parse_references(pv, start_state, '@') if kind == _STATE_REFERENCE else pv
+                      for pk, kind, pv in self._references[id(action)] if pk == tk]
+            cost = action.cost if self.cost_model is None else self.cost_model(action)
+            steps.append((action, effect.delta, cost, guards))
+        if not steps:
+            return []
+        # values beyond the start and target values (by more than a step) do not lead to a cheaper plan
+        bound = tv.bound if isinstance(tv, Comparison) else tv
+        max_delta = max(abs(delta) for _, delta, _, _ in steps)
+        low, high = min(start, bound) - max_delta, max(start, bound) + max_delta
+        # cheapest path over the values of tk (Dijkstra); ties in search order
+        best: Dict[Any, float] = {start: 0.0}
+        previous: Dict[Any, Tuple[Any, int]] = {}
+        queue = [(0.0, 0, start)]
+        pushed = explored = 0
+        while queue:
+            cost, _, value = heappop(queue)
+            if cost > best[value]:
+                continue
+            if value == tv:
+                break
+            explored += 1
+            if explored > self.NUMERIC_SEARCH_LIMIT:
+                return []
+            for i, (action, delta, step_cost, guards) in enumerate(steps):
+                if not all(value == pv for pv in guards):
+                    continue
+                next_value = value + delta
+                if not low <= next_value <= high:
+                    continue
+                if next_value not in best or cost + step_cost < best[next_value]:
+                    best[next_value] = cost + step_cost
+                    previous[next_value] = (value, i)
+                    pushed += 1
+                    heappush(queue, (cost + step_cost, pushed, next_value))
+        else:
+            return []
+        # the repeated steps, each bound to the value of tk it results in
+        path: List[Action] = []
+        while value in previous:
+            value, i = previous[value][0], previous[value][1]
+            path.append(steps[i][0])
+        repeated: List[Action] = []
+        value = start
+        for action in reversed(path):
+            step = action.__copy__()
+            value = step.effects[tk].apply(value)
+            step.effects[tk] = value
+            repeated.append(step)
+        name = '+'.join(f'{a}*{n}' for a, n in self.__runs(repeated))
+        try:
+            macro = MacroAction(None, repeated, name)
+            references = self.__compile_references(macro)
+        except ActionDefinitionException:  # e.g. later steps depend on other (relative) effects of earlier ones
+            return []
+        return [(macro, references)]
+
+    def __runs(self, steps: List[Action]) -> Iterator[Tuple[str, int]]:
+        # (name, count) of the consecutive repetitions of the same action
+        name, count = None, 0
+        for step in steps:
+            if str(step) != name:
+                if count:
+                    yield name, count
+                name, count = str(step), 0
+            count += 1
+        yield name, count
+
+    def __preconditions(self, action: Action, references: List[Tuple[Any, int, Any]],
+                        start_state: State) -> Iterator[Tuple[Any, Any]]:
+        # resolve the preconditions of a bound action using its precompiled references
+        for pk, kind, pv in references:
+            if kind == _STATE_REFERENCE:  # `@` reference; the value depends on the start state
+                pv = self.__parse_references(pv, start_state, '@')
+            elif kind == _BOUND_EFFECT:  # value of a templated effect; known only once the action is bound
+                pv = action.effects[pv]
+                if isinstance(pv, str):  # the bound (target) value may itself be a reference
+                    pv = self.__parse_references(self.__parse_references(pv, action.effects, '$'), start_state, '@')
+            yield pk, pv
+
+    def __action_path(self, action: Action, references: List[Tuple[Any, int, Any]], start_state: State,
+                      avoid_actions: List[Action], guards: _LiftedGuards = None,
+                      memo: dict = None, reach: _Reachability = None) -> Tuple[List[Action], float]:
+        self.costed += 1
+        action_path: List[Action] = []
+        for pk, pv in self.__preconditions(action, references, start_state):  # for each pre-condition ...
+            try:  # choose the shortest feasible path
+                action_path.extend(self.__plan(pk, pv, start_state, avoid_actions, guards, memo, reach))  # merge the actions
+            except RecursionError:  # watch out for cyclic references
+                raise PlanningFailedException(f'Found cyclic references! {pk}:{pv}')
+        # include the current action;  remove duplicates; keep the order intact
+        return self.__make_unique(action_path + [action])
+
+    def __reachability(self, start_state: State, avoid_actions: List[Action]) -> _Reachability:
+        # forward sweep from the start state; the one of the last start state is kept
+        try:
+            key = (frozenset(start_state.items()), tuple(avoid_actions or ()))
+            hash(key)
+        except TypeError:  # unhashable state values
+            key = None
+        if key is not None and self._reachability[0] == key:
+            return self._reachability[1]
+        actions = []
+        for action in self._actions:
+            if avoid_actions and (str(action) in avoid_actions or
+                                  any(str(step) in avoid_actions for step in getattr(action, 'steps', ()))):
+                continue
+            preconditions = []
+            for pk, kind, pv in self._references[id(action)]:
+                if kind == _STATE_REFERENCE:
+                    try:
+                        pv = self.__parse_references(pv, start_state, '@')
+                    except PlanningFailedException:  # (cyclic) reported when the action is planned, if ever
+                        pv = _Reachability.ANY
+                elif kind == _BOUND_EFFECT:  # known only once the templated effect is bound
+                    pv = _Reachability.ANY
+                preconditions.append((pk, pv))
+            actions.append((action, preconditions, self.__step_cost(action)))
+        reach = _Reachability(actions, start_state)
+        self._reachability = (key, reach)
+        return reach
+
+    def __step_cost(self, action: Action) -> float:
+        return action.cost if self.cost_model is None else self.cost_model(action)
+
+    def __create_action_lookup(self, actions: Iterable[Action]) -> Dict[Tuple[Any, Any], List[Action]]:
         action_lookup: Dict[Tuple[Any, Any], List[Action]] = defaultdict(list)
         for action in actions:
-            for k, v in action.effects.items():
-                action_lookup[(k, v)].append(action)
+            self.__index_action(action_lookup, action)
         return action_lookup
 
+    def __index_action(self, action_lookup: Dict[Tuple[Any, Any], List[Action]], action: Action):
+        self._references[id(action)] = self.__compile_references(action)
+        self._actions.append(action)
+        self._macros += isinstance(action, MacroAction)
+        for k, v in action.effects.items():
+            action_lookup[(k, v)].append(action)
+            if isinstance(v, Increment) or _is_number(v):
+                self._numeric_actions[k].append(action)
+
+    def __compile_references(self, action: Action) -> List[Tuple[Any, int, Any]]:
+        # resolve `$` references of the preconditions as far as the (unbound) effects allow;
+        # (key, _VALUE, value): value is final; (key, _BOUND_EFFECT, effect): value of a templated effect;
+        # (key, _STATE_REFERENCE, '@key'): looked up in the start state (which is known only when planning)
+        references: List[Tuple[Any, int, Any]] = []
+        for pk, pv in action.preconditions.items():
+            kind, visited = _VALUE, set()
+            while isinstance(pv, str) and pv[:1] == '$' and pv[1:] in action.effects:
+                if pv in visited:
+                    raise PlanningFailedException(f'Found cyclic references! {action}: {pk}:{pv}')
+                visited.add(pv)
+                if action.effects[pv[1:]] is Ellipsis:
+                    kind, pv = _BOUND_EFFECT, pv[1:]
+                    break
+                pv = action.effects[pv[1:]]
+            if kind == _VALUE and isinstance(pv, str) and pv[:1] == '@':
+                kind = _STATE_REFERENCE
+            references.append((pk, kind, pv))
+        return references
+
     def __parse_references(self, ref: Any, state: State, prefix: str) -> Any:
-        while ref and isinstance(ref, str) and ref[0] == prefix and ref[1:] in state:
+        visited = None
+        while isinstance(ref, str) and ref[:1] == prefix and ref[1:] in state:
+            if visited is None:
+                visited = set()
+            elif ref in visited:
+                raise PlanningFailedException(f'Found cyclic references! {ref}')
+            visited.add(ref)
             ref = state[ref[1:]]
         return ref
 
-    def __make_unique(self, path):
+    def __make_unique(self, path: List[Action]) -> Tuple[List[Action], float]:
+        # remove duplicates, keep the order intact; accumulate the cost of the unique path
         unique = set()
-        return [x for x in path if x not in unique and not unique.add(x)]
+        unique_path: List[Action] = []
+        cost: float = 0.0
+        cost_model = self.cost_model
+        for x in path:
+            if x not in unique:
+                unique.add(x)
+                unique_path.append(x)
+                cost += x.cost if cost_model is None else cost_model(x)
+        return unique_path, cost
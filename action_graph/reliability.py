@@ -0,0 +1,80 @@
+#! /usr/bin/env python3
+
+import threading
+from collections import defaultdict
+from typing import Any, Dict
+
+from action_graph.action import Action
+from action_graph.macro import MacroAction
+
+
+class ActionStatistics():
+    """
+    Success rate and run time of each action (by name), learned from the executions of an agent.
+    Used as the cost model of the planner: the expected cost of an action is its cost divided by
+    its (smoothed) probability of success, so that the alternatives of flaky actions are preferred.
+    """
+
+    def __init__(self, prior_successes: float = 1.0, prior_failures: float = 1.0,
+                 min_success: float = 0.2, latency_weight: float = 0.0) -> None:
+        """
+        :param prior_successes:float: Pseudo-count of successes of an action that was never executed
+        :param prior_failures:float: Pseudo-count of failures of an action that was never executed
+        :param min_success:float: Actions less likely to succeed are not retried (blacklisted) after a failure
+        :param latency_weight:float: Cost per second of (mean) run time added to the cost of the action
+        """
+
+        self.prior_successes = prior_successes
+        self.prior_failures = prior_failures
+        self.min_success = min_success
+        self.latency_weight = latency_weight
+        self.__lock = threading.Lock()
+        # name: [successes, failures, total run time, timed executions]
+        self.__stats: Dict[str, list] = defaultdict(lambda: [0, 0, 0.0, 0])
+
+    def record(self, action: Action, success: bool, run_time: float = None):
+        """
+        Record the outcome of an execution of the action.
+
+        :param action:Action: Executed action
+        :param success:bool: True if the action succeeded
+        :param run_time:float=None: Run time of the execution (seconds)
+        """
+
+        with self.__lock:
+            stats = self.__stats[str(action)]
+            stats[0 if success else 1] += 1
+            if run_time is not None:
+                stats[2] += run_time
+                stats[3] += 1
+
+    def success_probability(self, action: Action) -> float:
+        successes, failures, _, _ = self.__stats.get(str(action), (0, 0, 0.0, 0))
+        return (successes + self.prior_successes) / \
+            (successes + failures + self.prior_successes + self.prior_failures)
+
+    def mean_run_time(self, action: Action) -> float:
+        _, _, total, count = self.__stats.get(str(action), (0, 0, 0.0, 0))
+        return total / count if count else 0.0
+
+    def expected_cost(self, action: Action) -> float:
+        """
+        Cost of the action (and its expected run time) accounting for the expected number of attempts.
+
+        :param action:Action: Action (plan step)
+        :return:float: Expected cost
+        """
+
+        if isinstance(action, MacroAction):
+            return sum(self.expected_cost(step) for step in action.steps)
+        return (action.cost + self.latency_weight * self.mean_run_time(action)) / self.success_probability(action)
+
+    def is_unreliable(self, action: Action) -> bool:
+        return self.success_probability(action) < self.min_success
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        with self.__lock:
+            names = list(self.__stats)
+        return {name: {'successes': self.__stats[name][0], 'failures': self.__stats[name][1],
+                       'success_probability': self.success_probability(name),
+                       'mean_run_time': self.mean_run_time(name)} for name in names}
@@ -0,0 +1,199 @@
+#! /usr/bin/env python3
+
+import logging
+import threading
+from collections import defaultdict
+from time import monotonic, perf_counter
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Set, Tuple
+
+from action_graph.action import Action, ActionFailedException
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlockException(ActionFailedException):
+    """Claims that would close a cycle of owners waiting for each other; the requester gives way"""
+    pass
+
+
+def state_key(key: Any) -> tuple:
+    """Resource standing for a state key (see ResourceManager.claims)"""
+
+    return ('state', key)
+
+
+class ResourceManager():
+    """
+    Arbitrates the resources claimed by concurrently executing actions (of one or more agents, see Agent):
+    an action runs once it holds its claims; exclusive claims conflict with any other claim on the
+    resource, shared claims only with exclusive ones. The claims of an action are acquired at once (all or none)
+    and released when it is done; an owner may acquire more while it holds claims (e.g. from on_execute).
+    Owners that would end up waiting for each other are detected: the request that closes the cycle fails
+    with a DeadlockException.
+
+    Contention is recorded per resource (see statistics).
+    """
+
+    def __init__(self, claim_effects: bool = True) -> None:
+        """
+        :param claim_effects:bool: Actions also claim the state keys of their effects (exclusively)
+        """
+
+        self.claim_effects = claim_effects
+        self.__changed = threading.Condition()
+        # owners are told apart by identity (equal actions may run concurrently): id(owner) below
+        self.__owners: Dict[int, Any] = {}
+        self.__exclusive: Dict[Hashable, int] = {}                        # resource: owner
+        self.__shared: Dict[Hashable, Set[int]] = defaultdict(set)        # resource: owners
+        self.__held: Dict[int, Tuple[Set[Hashable], Set[Hashable]]] = {}  # owner: (exclusive, shared) resources
+        self.__waiting: Dict[int, Tuple[Set[Hashable], Set[Hashable]]] = {}  # owner: (exclusive, shared) requested
+        # resource: [acquisitions, contended acquisitions, total wait, max wait]
+        self.__contention: Dict[Hashable, list] = defaultdict(lambda: [0, 0, 0.0, 0.0])
+        self.deadlocks = 0
+
+    def claims(self, action: Action) -> Tuple[Set[Hashable], Set[Hashable]]:
+        """
+        Exclusive and shared resources an action claims: its declared resources (and effect keys).
+        """
+
+        exclusive = set(action.resources)
+        if self.claim_effects:
+            exclusive.update(state_key(k) for k in action.effects)
+        return exclusive, set(action.shared_resources) - exclusive
+
+    def acquire(self, owner: Any, exclusive: Iterable[Hashable] = (), shared: Iterable[Hashable] = (),
+                timeout: float = None, abandon: Callable[[], bool] = None) -> bool:
+        """
+        Wait until the owner holds all the claims.
+
+        :param owner:Any: Holder of the claims (e.g. the action)
+        :param exclusive:Iterable: Resources to hold exclusively
+        :param shared:Iterable: Resources to hold along with other shared claims
+        :param timeout:float=None: Seconds to wait at most
+        :param abandon:Callable=None: Stop waiting once it returns True (re-checked on interrupt())
+        :return:bool: True if acquired; False on timeout or abandon
+        """
+
+        exclusive, shared = set(exclusive), set(shared) - set(exclusive)
+        key = id(owner)
+        deadline = monotonic() + timeout if timeout is not None else None
+        t0 = perf_counter()
+        with self.__changed:
+            contended = False
+            while True:
+                blockers = self.__blockers(key, exclusive, shared)
+                if not blockers:
+                    break
+                contended = True
+                if abandon is not None and abandon():
+                    self.__waiting.pop(key, None)
+                    return False
+                self.__waiting[key] = (exclusive, shared)
+                if self.__closes_cycle(key, blockers):
+                    self.__waiting.pop(key, None)
+                    self.deadlocks += 1
+                    names = sorted(str(self.__owners[k]) for k in blockers)
+                    logger.warning('DEADLOCK: %s WAITING FOR %s', owner, names)
+                    raise DeadlockException(f'DEADLOCK: {owner} WAITING FOR {names}')
+                remaining = deadline - monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    self.__waiting.pop(key, None)
+                    return False
+                self.__changed.wait(remaining)
+            self.__waiting.pop(key, None)
+
+            self.__owners[key] = owner
+            held_exclusive, held_shared = self.__held.setdefault(key, (set(), set()))
+            for resource in exclusive:
+                self.__exclusive[resource] = key
+                held_exclusive.add(resource)
+                if resource in held_shared:  # upgraded
+                    self.__shared[resource].discard(key)
+                    held_shared.discard(resource)
+            for resource in shared:
+                if resource not in held_exclusive:
+                    self.__shared[resource].add(key)
+                    held_shared.add(resource)
+            waited = perf_counter() - t0
+            for resource in exclusive | shared:
+                stats = self.__contention[resource]
+                stats[0] += 1
+                if contended:
+                    stats[1] += 1
+                    stats[2] += waited
+                    stats[3] = max(stats[3], waited)
+        return True
+
+    def release(self, owner: Any):
+        """
+        Release all the claims of the owner.
+        """
+
+        key = id(owner)
+        with self.__changed:
+            held_exclusive, held_shared = self.__held.pop(key, ((), ()))
+            self.__owners.pop(key, None)
+            for resource in held_exclusive:
+                if self.__exclusive.get(resource) == key:
+                    del self.__exclusive[resource]
+            for resource in held_shared:
+                owners = self.__shared.get(resource)
+                if owners is not None:
+                    owners.discard(key)
+                    if not owners:
+                        del self.__shared[resource]
+            self.__changed.notify_all()
+
+    def interrupt(self):
+        """
+        Wake up the waiting requests; they re-check their abandon condition.
+        """
+
+        with self.__changed:
+            self.__changed.notify_all()
+
+    def holders(self, resource: Hashable) -> List[Any]:
+        """Owners that hold a claim on the resource"""
+
+        with self.__changed:
+            keys = set(self.__shared.get(resource, ()))
+            if resource in self.__exclusive:
+                keys.add(self.__exclusive[resource])
+            return [self.__owners[k] for k in keys]
+
+    def statistics(self) -> Dict[Hashable, Dict[str, float]]:
+        """
+        Contention per resource: acquisitions, contended (those that had to wait), wait_time (total) and
+        max_wait (seconds).
+        """
+
+        with self.__changed:
+            return {resource: {'acquisitions': n, 'contended': contended, 'wait_time': wait, 'max_wait': max_wait}
+                    for resource, (n, contended, wait, max_wait) in self.__contention.items()}
+
+    def __blockers(self, key: int, exclusive: Set[Hashable], shared: Set[Hashable]) -> Set[int]:
+        # owners holding conflicting claims
+        blockers = set()
+        for resource in exclusive:
+            holder = self.__exclusive.get(resource)
+            if holder is not None and holder != key:
+                blockers.add(holder)
+            blockers.update(k for k in self.__shared.get(resource, ()) if k != key)
+        for resource in shared:
+            holder = self.__exclusive.get(resource)
+            if holder is not None and holder != key:
+                blockers.add(holder)
+        return blockers
+
+    def __closes_cycle(self, key: int, blockers: Set[int]) -> bool:
+        # whether the owner (transitively) waits for itself; by the current claims of the waiting owners
+        visited, stack = set(), list(blockers)
+        while stack:
+            other = stack.pop()
+            if other == key:
+                return True
+            if other in visited or other not in self.__waiting:
+                continue
+            visited.add(other)
+            stack.extend(self.__blockers(other, *self.__waiting[other]))
+        return False
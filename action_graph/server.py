@@ -0,0 +1,378 @@
+#! /usr/bin/env python3
+"""
+Planning server: one (warm, cached) Planner shared by the local processes that need plans, over a
+Unix domain socket or localhost TCP.
+
+    python -m action_graph.server --actions-file actions.json --unix /tmp/action_graph.sock
+    python -m action_graph.server --actions-file actions.json --port 7301
+
+Requests and responses are JSON documents, each framed by its length (little endian uint32). Values other than
+None, bool, numbers and str are encoded as tagged lists (see _encode); only the types of _TAGS are accepted,
+i.e. the states hold plain values (tuples, lists, sets, dicts, bytes, ...), `...` and the numeric effects and
+comparisons (Increment, Decrement, GreaterEqual, LessThan). A connection answers its requests in order,
+so clients may send several before reading the responses (pipelining).
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import struct
+import threading
+from queue import Empty, LifoQueue
+from typing import Any, Iterable, List, NamedTuple, Tuple, Union
+
+from action_graph.action import Action, Decrement, GreaterEqual, Increment, LessThan, State
+from action_graph.loader import load_file
+from action_graph.log import enable_console_logging
+from action_graph.macro import expand_macros
+from action_graph.planner import Planner, PlanningFailedException
+
+logger = logging.getLogger(__name__)
+
+Address = Union[str, Tuple[str, int]]  # Unix socket path; or (host, port)
+
+_FRAME = struct.Struct('<I')
+MAX_FRAME = 64 * 1024 * 1024
+# response status
+_OK, _PLANNING_FAILED, _ERROR = 0, 1, 2
+
+
+class RemotePlanningError(Exception):
+    """The planning server could not handle a request"""
+    pass
+
+
+class RemoteStep(NamedTuple):
+    """Plan step as returned by the planning server"""
+    name: str
+    cost: float
+    effects: dict
+
+
+# tag: type of the values encoded as [tag, ...]; any other type is refused (both ways)
+_TAGS = {'l': list, 't': tuple, 'd': dict, 's': set, 'f': frozenset, 'b': bytes, 'e': type(Ellipsis),
+         'inc': Increment, 'dec': Decrement, 'ge': GreaterEqual, 'lt': LessThan}
+_TYPE_TAGS = {t: tag for tag, t in _TAGS.items()}
+_SCALARS = (str, bool, int, float, type(None))
+
+
+def _encode(value: Any) -> Any:
+    # value as JSON: scalars as they are; other (whitelisted) types as [tag, payload]
+    tag = _TYPE_TAGS.get(type(value))
+    if tag is None:
+        if type(value) in _SCALARS:
+            return value
+        raise ValueError(f'Cannot encode {type(value).__name__}: {value!r}')
+    if tag == 'd':
+        return [tag, [[_encode(k), _encode(v)] for k, v in value.items()]]
+    if tag in ('l', 't', 's', 'f'):
+        return [tag, [_encode(v) for v in value]]
+    if tag == 'b':
+        return [tag, value.hex()]
+    if tag == 'e':
+        return [tag]
+    if tag in ('inc', 'dec'):
+        return [tag, _encode(value.amount)]
+    return [tag, _encode(value.bound)]  # comparisons
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, dict):
+        raise ValueError(f'Unknown value: {str(value)[:64]}')  # not produced by _encode
+    if not isinstance(value, list):
+        return value  # scalar
+    if not value or value[0] not in _TAGS:
+        raise ValueError(f'Unknown value: {str(value)[:64]}')
+    tag = value[0]
+    if tag == 'e':
+        return Ellipsis
+    if len(value) != 2:
+        raise ValueError(f'Malformed value: {str(value)[:64]}')
+    payload = value[1]
+    if tag == 'b':
+        return bytes.fromhex(payload)
+    if tag in ('inc', 'dec', 'ge', 'lt'):
+        number = _decode(payload)
+        if not isinstance(number, (int, float)) or isinstance(number, bool):
+            raise ValueError(f'Not a number: {number!r}')
+        return _TAGS[tag](number)
+    if not isinstance(payload, list):
+        raise ValueError(f'Malformed value: {str(value)[:64]}')
+    if tag == 'd':
+        if not all(isinstance(item, list) and len(item) == 2 for item in payload):
+            raise ValueError(f'Malformed dict: {str(value)[:64]}')
+        return {_decode(k): _decode(v) for k, v in payload}
+    return _TAGS[tag](_decode(v) for v in payload)
+
+
+def _dumps(message: Any) -> bytes:
+    return json.dumps(_encode(message), separators=(',', ':')).encode()
+
+
+def _loads(payload: bytes) -> Any:
+    # ValueError for anything but an encoded message (also unhashable keys and too deeply nested ones)
+    try:
+        return _decode(json.loads(payload))
+    except (TypeError, RecursionError) as ex:
+        raise ValueError(f'Malformed message: {ex}') from None
+
+
+def _frame(payload: bytes) -> bytes:
+    return _FRAME.pack(len(payload)) + payload
+
+
+def _read_frame(stream) -> Any:
+    header = stream.read(_FRAME.size)
+    if not header:
+        raise EOFError
+    if len(header) < _FRAME.size:
+        raise EOFError('connection closed within a frame')
+    length, = _FRAME.unpack(header)
+    if length > MAX_FRAME:
+        raise ValueError(f'Frame too large: {length} bytes')
+    payload = stream.read(length)
+    if len(payload) < length:
+        raise EOFError('connection closed within a frame')
+    return _loads(payload)
+
+
+class _Connection(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        planning: PlanningServer = self.server.planning
+        planning.connections += 1
+        while True:
+            try:
+                request = _read_frame(self.rfile)
+            except EOFError:
+                return
+            except ValueError as _ex:  # not our protocol; drop the connection
+                logger.warning('PLANNING SERVER: %s', _ex)
+                return
+            self.wfile.write(_frame(planning._respond(request)))
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+class PlanningServer():
+    """
+    Serves the plans of a Planner to the clients (PlanningClient) of a Unix socket or TCP address.
+    The searches are serialised (the planner is not thread safe); the sub-plans are memoised across requests
+    (up to memo_limit start states), so requests from the same states are answered from the cache.
+    """
+
+    def __init__(self, actions: Iterable[Action], address: Address, memo_limit: int = 1024) -> None:
+        """
+        :param actions:Iterable[Action]: Actions to plan with
+        :param address:Address: Path of the Unix socket; or (host, port) to listen on TCP (port 0: any free port)
+        :param memo_limit:int: Number of start states whose sub-plans are kept
+        """
+
+        self.planner = Planner(list(actions))
+        self.memo_limit = memo_limit
+        self.connections = 0  # accepted so far
+        self.__memo: dict = {}
+        self.__lock = threading.Lock()
+        self.__thread: threading.Thread = None
+        if isinstance(address, str):
+            try:
+                if stat.S_ISSOCK(os.stat(address).st_mode):
+                    os.unlink(address)  # left over by a previous server
+            except FileNotFoundError:
+                pass
+            self.__server = _UnixServer(address, _Connection)
+        else:
+            self.__server = _TCPServer(address, _Connection)
+        self.__server.planning = self
+
+    @property
+    def address(self) -> Address:
+        """Address the server listens on (with the actual port)"""
+
+        return self.__server.server_address
+
+    def serve_forever(self):
+        self.__server.serve_forever()
+
+    def start(self) -> 'PlanningServer':
+        """
+        Serve in a background thread.
+        """
+
+        self.__thread = threading.Thread(target=self.serve_forever, name='action_graph.server', daemon=True)
+        self.__thread.start()
+        return self
+
+    def shutdown(self):
+        if self.__thread is not None:
+            self.__server.shutdown()
+            self.__thread.join()
+            self.__thread = None
+        self.__server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def _respond(self, request: Any) -> bytes:
+        try:
+            method, args = request
+            if method != 'plan':
+                raise ValueError(f'Unknown method: {method!r}')
+            goal, start_state, avoid_actions, bidirectional = args
+            return _dumps((_OK, self.__plan(goal, start_state, avoid_actions, bidirectional)))
+        except PlanningFailedException as ex:
+            return _dumps((_PLANNING_FAILED, str(ex)))
+        except Exception as ex:
+            return _dumps((_ERROR, f'{ex.__class__.__name__}: {ex}'))
+
+    def __plan(self, goal: State, start_state: State, avoid_actions: List[str], bidirectional: bool) -> list:
+        with self.__lock:
+            if len(self.__memo) >= self.memo_limit:
+                self.__memo.clear()
+            plan = self.planner.generate_plan(goal, start_state, avoid_actions, memo=self.__memo,
+                                              bidirectional=bidirectional)
+            plan = expand_macros(plan, dict(start_state))
+        return [(str(step), step.cost, dict(step.effects)) for step in plan]
+
+
+class PlanningClient():
+    """
+    Client of a PlanningServer. Keeps a pool of open connections (thread safe); get_plans sends all
+    its requests on one connection before reading the responses.
+    """
+
+    def __init__(self, address: Address, pool_size: int = 4, timeout: float = None) -> None:
+        """
+        :param address:Address: Path of the server's Unix socket; or its (host, port)
+        :param pool_size:int: Number of idle connections kept open
+        :param timeout:float=None: Seconds to wait for the server; None: no limit
+        """
+
+        self.address = address
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.__idle: LifoQueue = LifoQueue()
+
+    def get_plan(self, goal: State, start_state: State, avoid_actions: List[str] = None,
+                 bidirectional: bool = False) -> List[RemoteStep]:
+        """
+        Plan on the server (see Planner.generate_plan); macro steps are expanded.
+
+        :param goal:State: Desired goal state
+        :param start_state:State: Current/start state of the system
+        :param avoid_actions:List[str]: Names of the actions not to use
+        :param bidirectional:bool: See Planner.generate_plan
+        :return:List[RemoteStep]: Name, cost and expected outcome (effects) of each step
+        """
+
+        return self.get_plans([(goal, start_state)], avoid_actions, bidirectional)[0]
+
+    def get_plans(self, requests: Iterable[Tuple[State, State]], avoid_actions: List[str] = None,
+                  bidirectional: bool = False) -> List[List[RemoteStep]]:
+        """
+        Plan for several (goal, start state) pairs in one round trip.
+
+        :param requests:Iterable[Tuple[State, State]]: (goal, start state) pairs
+        :return:List[List[RemoteStep]]: The plans, in the order of the requests
+        """
+
+        avoid_actions = [str(a) for a in avoid_actions or ()]
+        frames = [_frame(_dumps(('plan', (dict(goal), dict(start_state), avoid_actions, bidirectional))))
+                  for goal, start_state in requests]
+        connection = self.__acquire()
+        try:
+            connection[0].sendall(b''.join(frames))
+            responses = [_read_frame(connection[1]) for _ in frames]
+        except BaseException:
+            self.__discard(connection)
+            raise
+        self.__release(connection)
+
+        plans = []
+        for status, result in responses:
+            if status == _PLANNING_FAILED:
+                raise PlanningFailedException(result)
+            if status != _OK:
+                raise RemotePlanningError(result)
+            plans.append([RemoteStep(*step) for step in result])
+        return plans
+
+    def close(self):
+        """
+        Close the idle connections.
+        """
+
+        while True:
+            try:
+                self.__discard(self.__idle.get_nowait())
+            except Empty:
+                return
+
+    def __enter__(self) -> 'PlanningClient':
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __acquire(self):
+        try:
+            return self.__idle.get_nowait()
+        except Empty:
+            pass
+        if isinstance(self.address, str):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.address)
+        except BaseException:
+            sock.close()
+            raise
+        return sock, sock.makefile('rb')
+
+    def __release(self, connection):
+        if self.__idle.qsize() < self.pool_size:
+            self.__idle.put(connection)
+        else:
+            self.__discard(connection)
+
+    def __discard(self, connection):
+        connection[1].close()
+        connection[0].close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--actions-file', required=True, help='.json/.jsonl/.yaml/.yml/.csv action definitions')
+    parser.add_argument('--unix', help='path of the Unix socket to listen on')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7301)
+    args = parser.parse_args()
+
+    enable_console_logging()
+    actions = load_file(args.actions_file)
+    server = PlanningServer(actions, args.unix or (args.host, args.port))
+    logger.info('PLANNING SERVER: %d ACTIONS; LISTENING ON %s', len(actions), server.address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
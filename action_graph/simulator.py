@@ -0,0 +1,186 @@
+#! /usr/bin/env python3
+
+import random
+from collections import Counter
+from typing import Any, Callable, Dict, List, Union
+
+from action_graph.action import Action, ActionStatus, State
+from action_graph.macro import expand_macros
+from action_graph.reliability import ActionStatistics
+
+# outcomes that end the execution of the plan (as in Agent.execute_action; RUNNING is treated as FAILURE)
+_STOPPING = (ActionStatus.FAILURE, ActionStatus.ABORTED, ActionStatus.REVOKED, ActionStatus.RUNNING)
+
+
+class SimulationReport():
+    """Outcome of the Monte Carlo rollouts of a plan"""
+
+    def __init__(self, rollouts: int, successes: int, costs: Counter, failures: Counter,
+                 unmet_preconditions: Counter, goal_unmet: int) -> None:
+        self.rollouts = rollouts
+        self.successes = successes
+        self.costs = costs                              # cost of a rollout: number of rollouts
+        self.failures = failures                        # step (name): rollouts that stopped there
+        self.unmet_preconditions = unmet_preconditions  # step (name): rollouts where its preconditions did not hold
+        self.goal_unmet = goal_unmet                    # rollouts that executed all steps but did not meet the goal
+
+    @property
+    def success_probability(self) -> float:
+        return self.successes / self.rollouts if self.rollouts else 0.0
+
+    @property
+    def expected_cost(self) -> float:
+        return sum(cost * n for cost, n in self.costs.items()) / self.rollouts if self.rollouts else 0.0
+
+    def __repr__(self) -> str:
+        return f'rollouts={self.rollouts} success_probability={self.success_probability:.4f} ' \
+               f'expected_cost={self.expected_cost:.4f}'
+
+
+class PlanSimulator():
+    """
+    Monte Carlo simulation of the execution of a plan, in-process: no threads, no on_execute; the status of
+    each step is drawn from its outcome distribution and a successful step applies its effects (apply_effects)
+    to a snapshot of the state. As in Agent.execute_plan, a NEUTRAL step leaves the state unchanged and the
+    plan stops at the first FAILURE (ABORTED, REVOKED); a step whose preconditions do not hold fails as well.
+
+    The rollouts are simulated together: rollouts with the same outcomes so far share their state, so a step
+    costs one apply_effects per distinct state (and one draw per rollout). apply_effects has to be a function
+    of the state (deterministic; no side effects outside of it).
+    """
+
+    def __init__(self, outcomes: Union[Dict[str, Dict[ActionStatus, float]], Callable[[Action], Dict[ActionStatus, float]],
+                                       ActionStatistics] = None, seed: Any = None) -> None:
+        """
+        :param outcomes: Probability of each ActionStatus per step: a dict (action name: {status: probability}),
+                         a callable (action -> {status: probability}) or the ActionStatistics learned by an agent
+                         (success or failure). Steps without a distribution always succeed.
+        :param seed:Any=None: Seed of the random numbers; for reproducible simulations
+        """
+
+        self.outcomes = outcomes
+        self.random = random.Random(seed)
+
+    def simulate(self, plan: List[Action], start_state: State, rollouts: int = 10_000, goal: State = None) -> SimulationReport:
+        """
+        Simulate the plan `rollouts` times.
+
+        :param plan:List[Action]: Plan (e.g. from Agent.get_plan); macro actions are expanded
+        :param start_state:State: State the plan starts from
+        :param rollouts:int: Number of simulated executions
+        :param goal:State=None: If given, a rollout succeeds only if the goal is met after the last step
+        :return:SimulationReport: Success probability, expected cost, where the rollouts failed
+        """
+
+        plan = expand_macros(list(plan), start_state)
+        costs: Counter = Counter()
+        failures: Counter = Counter()
+        unmet_preconditions: Counter = Counter()
+        # rollouts with the same history: [state, number of rollouts, cost so far, hash of the state (None: unhashable)]
+        start = dict(start_state)
+        groups: List[list] = [[start, rollouts, 0.0, self.__hash(start)]] if rollouts > 0 else []
+        for action in plan:
+            statuses, weights = self.__distribution(action)
+            # the base implementation changes the effect keys only; the hash of the state is updated for those
+            applies_effects_only = type(action).apply_effects is Action.apply_effects
+            next_groups: Dict[Any, List[list]] = {}
+            for state, count, cost, state_hash in groups:
+                if not self.__preconditions_hold(action, state, start):
+                    unmet_preconditions[str(action)] += count
+                    failures[str(action)] += count
+                    costs[cost] += count
+                    continue
+                cost += action.cost
+                if len(statuses) == 1:
+                    drawn = ((statuses[0], count),)
+                elif count == 1:
+                    drawn = ((self.random.choices(statuses, weights)[0], 1),)
+                else:
+                    drawn = Counter(self.random.choices(statuses, weights, k=count)).items()
+                for status, n in drawn:
+                    if status in _STOPPING:
+                        failures[str(action)] += n
+                        costs[cost] += n
+                        continue
+                    if status == ActionStatus.SUCCESS:
+                        next_state = dict(state)
+                        if applies_effects_only and state_hash is not None:
+                            next_hash = self.__apply(action, next_state, state_hash)
+                        else:
+                            action.apply_effects(action.effects, next_state)
+                            next_hash = self.__hash(next_state)
+                    else:  # NEUTRAL: no change to the state
+                        next_state, next_hash = state, state_hash
+                    self.__merge(next_groups, next_state, n, cost, next_hash)
+            groups = [group for merged in next_groups.values() for group in merged]
+
+        successes = goal_unmet = 0
+        for state, count, cost, _ in groups:
+            costs[cost] += count
+            if goal is not None and not all(k in state and state[k] == v for k, v in goal.items()):
+                goal_unmet += count
+            else:
+                successes += count
+        return SimulationReport(rollouts, successes, costs, failures, unmet_preconditions, goal_unmet)
+
+    def __distribution(self, action: Action):
+        outcomes = self.outcomes
+        if outcomes is None:
+            distribution = None
+        elif isinstance(outcomes, ActionStatistics):
+            p = outcomes.success_probability(action)
+            distribution = {ActionStatus.SUCCESS: p, ActionStatus.FAILURE: 1.0 - p}
+        elif callable(outcomes):
+            distribution = outcomes(action)
+        else:
+            distribution = outcomes.get(str(action))
+        if not distribution:
+            return [ActionStatus.SUCCESS], [1.0]
+        statuses = [s for s, p in distribution.items() if p > 0]
+        return statuses, [distribution[s] for s in statuses]
+
+    def __merge(self, groups: Dict[Any, List[list]], state: State, count: int, cost: float, state_hash: int):
+        # rollouts that reach the same state (at the same cost) are simulated as one group from here on
+        bucket = groups.setdefault((id(state) if state_hash is None else state_hash, cost), [])
+        for group in bucket:
+            if group[0] is state or (state_hash is not None and group[0] == state):
+                group[1] += count
+                return
+        bucket.append([state, count, cost, state_hash])
+
+    def __hash(self, state: State) -> int:
+        # order independent hash of the items; updated item by item (see __apply)
+        state_hash = 0
+        try:
+            for item in state.items():
+                state_hash ^= hash(item)
+        except TypeError:  # unhashable values
+            return None
+        return state_hash
+
+    def __apply(self, action: Action, state: State, state_hash: int) -> int:
+        try:
+            for k in action.effects:
+                if k in state:
+                    state_hash ^= hash((k, state[k]))
+            action.apply_effects(action.effects, state)
+            for k in action.effects:
+                state_hash ^= hash((k, state[k]))
+        except TypeError:  # unhashable values
+            return None
+        return state_hash
+
+    def __preconditions_hold(self, action: Action, state: State, start_state: State) -> bool:
+        for pk, pv in action.preconditions.items():
+            # `@` refers to the start state of the plan (as for the planner)
+            pv = self.__parse_references(self.__parse_references(pv, action.effects, '$'), start_state, '@')
+            if pk not in state or state[pk] != pv:
+                return False
+        return True
+
+    def __parse_references(self, ref: Any, state: State, prefix: str) -> Any:
+        visited = set()
+        while isinstance(ref, str) and ref[:1] == prefix and ref[1:] in state and ref not in visited:
+            visited.add(ref)
+            ref = state[ref[1:]]
+        return ref
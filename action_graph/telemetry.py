@@ -0,0 +1,137 @@
+#! /usr/bin/env python3
+
+import json
+import threading
+from collections import defaultdict, deque
+from typing import Any, Dict, IO, Iterable, List
+
+
+# Record fields (seconds):
+#   action: dispatch_latency - execute_action() call until on_execute started running
+#           run_time         - on_execute run time (until it returned; or set the status, if noticed first)
+#           detection_latency- status change (or end of on_execute) until the agent noticed it
+#           callback_time    - on_success/on_failure/.../on_exit run time
+#           claim_wait       - waiting for the claimed resources (agents with a ResourceManager only)
+#   plan:   planning_time, preflight_time, execution_time, replans, failovers
+#   goal:   queue_latency    - submit_goal() until the goal scheduler first pursued the goal
+#           goal_run_time    - time the goal was pursued (not counting the time it was preempted); preemptions
+
+
+class Exporter():
+    """Receives the telemetry records of an agent"""
+
+    def export(self, record: Dict[str, Any]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class RingBufferExporter(Exporter):
+    """Keeps the most recent records in memory"""
+
+    def __init__(self, capacity: int = 10_000) -> None:
+        self.records: deque = deque(maxlen=capacity)
+
+    def export(self, record: Dict[str, Any]):
+        self.records.append(record)
+
+
+class JsonLinesExporter(Exporter):
+    """Writes each record as a line of JSON to a file (path) or an open stream"""
+
+    def __init__(self, target, flush: bool = False) -> None:
+        self.__own_stream = isinstance(target, str)
+        self.stream: IO = open(target, 'a', encoding='utf-8') if self.__own_stream else target
+        self.flush = flush
+        self.__lock = threading.Lock()
+
+    def export(self, record: Dict[str, Any]):
+        line = json.dumps(record, default=str) + '\n'
+        with self.__lock:
+            self.stream.write(line)
+            if self.flush:
+                self.stream.flush()
+
+    def close(self):
+        with self.__lock:
+            if self.__own_stream:
+                self.stream.close()
+            else:
+                self.stream.flush()
+
+
+class OpenMetricsExporter(Exporter):
+    """Aggregates the records into counters/summaries; render() returns them in OpenMetrics text format"""
+
+    ACTION_TIMINGS = ('claim_wait', 'dispatch_latency', 'run_time', 'detection_latency', 'callback_time')
+    PLAN_TIMINGS = ('planning_time', 'preflight_time', 'execution_time')
+    GOAL_TIMINGS = ('queue_latency', 'goal_run_time')
+
+    def __init__(self, prefix: str = 'action_graph') -> None:
+        self.prefix = prefix
+        self.__lock = threading.Lock()
+        self.__counters: Dict[str, Dict[tuple, float]] = defaultdict(lambda: defaultdict(float))
+        self.__summaries: Dict[str, Dict[tuple, List[float]]] = defaultdict(lambda: defaultdict(lambda: [0.0, 0]))
+
+    def export(self, record: Dict[str, Any]):
+        with self.__lock:
+            if record.get('type') == 'action':
+                labels = (('agent', record.get('agent')), ('action', record.get('action')))
+                self.__counters['action_outcomes'][labels + (('outcome', record.get('outcome')),)] += 1
+                self.__observe(self.ACTION_TIMINGS, record, labels)
+            elif record.get('type') == 'plan':
+                labels = (('agent', record.get('agent')), ('outcome', record.get('outcome')))
+                self.__counters['plans'][labels] += 1
+                self.__counters['replans'][labels[:1]] += record.get('replans', 0)
+                self.__observe(self.PLAN_TIMINGS, record, labels[:1])
+            elif record.get('type') == 'goal':
+                labels = (('agent', record.get('agent')), ('priority', record.get('priority')))
+                self.__counters['goals'][labels + (('outcome', record.get('outcome')),)] += 1
+                self.__counters['preemptions'][labels] += record.get('preemptions', 0)
+                self.__observe(self.GOAL_TIMINGS, record, labels)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self.__lock:
+            for name, series in sorted(self.__counters.items()):
+                lines.append(f'# TYPE {self.prefix}_{name} counter')
+                for labels, value in series.items():
+                    lines.append(f'{self.prefix}_{name}_total{self.__labels(labels)} {value:g}')
+            for name, series in sorted(self.__summaries.items()):
+                lines.append(f'# TYPE {self.prefix}_{name}_seconds summary')
+                lines.append(f'# UNIT {self.prefix}_{name}_seconds seconds')
+                for labels, (total, count) in series.items():
+                    lines.append(f'{self.prefix}_{name}_seconds_sum{self.__labels(labels)} {total:g}')
+                    lines.append(f'{self.prefix}_{name}_seconds_count{self.__labels(labels)} {count}')
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def __observe(self, fields: Iterable[str], record: Dict[str, Any], labels: tuple):
+        for field in fields:
+            if record.get(field) is not None:
+                summary = self.__summaries[field][labels]
+                summary[0] += record[field]
+                summary[1] += 1
+
+    def __labels(self, labels: tuple) -> str:
+        return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Telemetry():
+    """Hands the execution records of an agent to the exporters"""
+
+    def __init__(self, exporters: Iterable[Exporter] = None) -> None:
+        self.exporters: List[Exporter] = list(exporters or [])
+
+    def record(self, record: Dict[str, Any]):
+        for exporter in self.exporters:
+            exporter.export(record)
+
+    def close(self):
+        for exporter in self.exporters:
+            exporter.close()
@@ -0,0 +1,160 @@
+#! /usr/bin/env python3
+"""
+Differential harness of the planner engines: random domains (with templated `...` effects and `$`/`@` references)
+are planned by every engine; each plan has to be valid (its steps, replayed with apply_effects from the start state,
+meet their preconditions and the goal) and as cheap as the plan of the reference engine (Planner.generate_plan).
+Latency and search effort (Planner.expanded / Planner.costed) are reported per engine, side by side.
+
+    python benchmarks/harness.py [--domains 1000] [--seed 0] [--keys 6] [--actions 12]
+
+Exits with status 1 if an engine disagrees with the reference. To add an engine, add it to ENGINES.
+"""
+
+import argparse
+import os
+import random
+import sys
+from collections import defaultdict
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from action_graph.action import Action, State
+from action_graph.loader import DataAction
+from action_graph.macro import expand_macros
+from action_graph.planner import Planner, PlanningFailedException
+
+# name: plan(planner, goal, start state); the first one is the reference
+ENGINES: Dict[str, Callable[[Planner, State, State], List[Action]]] = {
+    'reference': lambda planner, goal, state: planner.generate_plan(goal, state),
+    'bidirectional': lambda planner, goal, state: planner.generate_plan(goal, state, bidirectional=True),
+    'memo': lambda planner, goal, state: planner.generate_plan(goal, state, memo={}),
+    'lifted': lambda planner, goal, state: planner.generate_lifted_plan(goal, state),
+    'k_best': lambda planner, goal, state: planner.generate_plans(goal, state, k=1)[0],
+    'streaming': lambda planner, goal, state: list(planner.iter_plan(goal, state)),
+}
+
+VALUES = (True, False, 'a', 'b')
+
+
+def random_domain(rng: random.Random, keys: int, actions: int, prefix: str = 'H') -> Tuple[List[Action], State, State]:
+    names = [f'{prefix}_K{i}' for i in range(keys)]
+
+    def value(effects: State = None):
+        r = rng.random()
+        if r < 0.15:
+            return '@' + rng.choice(names)  # value of a key in the start state
+        if r < 0.3 and effects:
+            return '$' + rng.choice(list(effects))  # value (bound) of an effect of the action
+        return rng.choice(VALUES)
+
+    domain = []
+    for i in range(actions):
+        effects = {k: ... if rng.random() < 0.2 else rng.choice(VALUES) for k in rng.sample(names, rng.randint(1, 2))}
+        preconditions = {k: value(effects) for k in rng.sample(names, rng.randint(0, 2))}
+        domain.append(DataAction(name=f'{prefix}_A{i}', cost=rng.randint(1, 5), effects=effects,
+                                 preconditions=preconditions))
+    start_state = {k: rng.choice(VALUES) for k in rng.sample(names, keys // 2)}
+    goal = {rng.choice(names): rng.choice(VALUES)}
+    return domain, start_state, goal
+
+
+def _resolve(value: Any, state: State, prefix: str) -> Any:
+    visited = set()
+    while isinstance(value, str) and value[:1] == prefix and value[1:] in state and value not in visited:
+        visited.add(value)
+        value = state[value[1:]]
+    return value
+
+
+def replay(plan: List[Action], goal: State, start_state: State) -> bool:
+    """
+    Whether the plan is valid: replayed (apply_effects) from the start state, each step meets its preconditions
+    ($: its effects, @: the start state) and the last one meets the goal.
+    """
+
+    state = dict(start_state)
+    for step in expand_macros(list(plan), dict(start_state)):
+        if Ellipsis in step.effects.values():
+            return False  # unbound
+        for pk, pv in step.preconditions.items():
+            pv = _resolve(_resolve(pv, step.effects, '$'), start_state, '@')
+            if pk not in state or state[pk] != pv:
+                return False
+        step.apply_effects(step.effects, state)
+    return all(k in state and state[k] == v for k, v in goal.items())
+
+
+def plan_cost(plan: List[Action]) -> float:
+    return sum(step.cost for step in plan)
+
+
+def run_engine(engine: Callable, actions: List[Action], goal: State, start_state: State) -> Dict[str, Any]:
+    planner = Planner(actions)
+    t0 = perf_counter()
+    try:
+        plan = engine(planner, goal, dict(start_state))
+    except PlanningFailedException:
+        plan = None
+    elapsed = perf_counter() - t0
+    if plan is not None and plan_cost(plan) >= sys.float_info.max:  # (an impossible step)
+        plan = None
+    return {'plan': plan, 'latency': elapsed, 'expanded': planner.expanded, 'costed': planner.costed}
+
+
+def run(domains: int = 1000, seed: int = 0, keys: int = 6, actions: int = 12,
+        engines: Dict[str, Callable] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Plan random domains with every engine.
+
+    :return: Per engine: domains planned, failures, invalid plans, mismatches (plans that are missing, invalid or
+             more expensive where the reference found a valid plan), and total latency, expanded and costed
+    """
+
+    engines = engines or ENGINES
+    reference = next(iter(engines))
+    report: Dict[str, Dict[str, Any]] = {name: defaultdict(float) for name in engines}
+    rng = random.Random(seed)
+    for d in range(domains):
+        domain, start_state, goal = random_domain(rng, keys, actions, prefix=f'H{d}')
+        results = {name: run_engine(engine, domain, goal, start_state) for name, engine in engines.items()}
+        expected = results[reference]['plan']
+        expected_valid = expected is not None and replay(expected, goal, start_state)
+        for name, result in results.items():
+            stats, plan = report[name], result['plan']
+            stats['domains'] += 1
+            for field in ('latency', 'expanded', 'costed'):
+                stats[field] += result[field]
+            valid = plan is not None and replay(plan, goal, start_state)
+            if plan is None:
+                stats['failures'] += 1
+            elif not valid:
+                stats['invalid'] += 1
+            if expected_valid and (not valid or abs(plan_cost(plan) - plan_cost(expected)) > 1e-9):
+                stats['mismatches'] += 1
+                stats.setdefault('mismatched_domains', []).append(d)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--domains', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keys', type=int, default=6, help='state keys per domain')
+    parser.add_argument('--actions', type=int, default=12, help='actions per domain')
+    args = parser.parse_args()
+
+    report = run(args.domains, args.seed, args.keys, args.actions)
+    print(f"{'engine':<14} {'latency [ms]':>12} {'expanded':>9} {'costed':>9} {'failed':>7} {'invalid':>8} {'mismatch':>9}")
+    for name, stats in report.items():
+        print(f"{name:<14} {stats['latency'] * 1e3:12.2f} {stats['expanded']:9.0f} {stats['costed']:9.0f} "
+              f"{stats['failures']:7.0f} {stats['invalid']:8.0f} {stats['mismatches']:9.0f}")
+    mismatched = {name: stats['mismatched_domains'][:10] for name, stats in report.items() if stats['mismatches']}
+    if mismatched:
+        print(f'MISMATCHES (domains): {mismatched}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
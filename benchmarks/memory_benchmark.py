@@ -0,0 +1,67 @@
+#! /usr/bin/env python3
+"""
+Memory retained per plan: plans kept as planned (Action copies) vs. as PlanSteps (action_graph.plan_step).
+
+    python benchmarks/memory_benchmark.py [--steps 20] [--plans 1000] [--target 2048]
+
+Exits with status 1 if a compact plan takes more than --target bytes.
+"""
+
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from action_graph.loader import DataAction
+from action_graph.plan_step import PlanStep
+from action_graph.planner import Planner
+
+
+def chain_actions(steps: int):
+    # step i requires the effect of step i-1; the last one is templated (bound to the goal value)
+    actions = [DataAction(name=f"Step{i}", effects={f"MEM_S{i}": True, f"MEM_LOG{i}": "step done"},
+                          preconditions={f"MEM_S{i - 1}": True, "MEM_POWER": True} if i else {"MEM_POWER": True})
+               for i in range(steps - 1)]
+    actions.append(DataAction(name="Deliver", effects={"MEM_AT": ...}, preconditions={f"MEM_S{steps - 2}": True}))
+    return actions
+
+
+def retained(make_plan, plans: int) -> float:
+    # bytes allocated (and kept) per plan
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [make_plan(i) for i in range(plans)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / plans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--steps', type=int, default=20)
+    parser.add_argument('--plans', type=int, default=1000)
+    parser.add_argument('--target', type=float, default=2048, help='bytes per compact plan')
+    args = parser.parse_args()
+
+    planner = Planner(chain_actions(args.steps))
+    start_state = {"MEM_POWER": True}
+
+    def plan(i: int):
+        return planner.generate_plan({"MEM_AT": f"dock{i}"}, start_state)
+
+    assert len(plan(0)) == args.steps
+    as_actions = retained(plan, args.plans)
+    as_steps = retained(lambda i: [PlanStep.of(step) for step in plan(i)], args.plans)
+    print(f'{args.steps} steps per plan, {args.plans} plans retained')
+    print(f'  Action copies: {as_actions:10.0f} bytes/plan')
+    print(f'  PlanSteps:     {as_steps:10.0f} bytes/plan (target {args.target:.0f})')
+    if as_steps > args.target:
+        print('TARGET MISSED')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
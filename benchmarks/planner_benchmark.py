@@ -0,0 +1,59 @@
+#! /usr/bin/env python3
+"""
+Planning time of the backward (default) and the bidirectional search (Planner.generate_plan(bidirectional=True))
+on chains of sub-goals where each sub-goal has several alternative achievers (fan-in).
+
+    python benchmarks/planner_benchmark.py [--depth 16] [--fan-in 3] [--max-paths 200000]
+"""
+
+import argparse
+import os
+import sys
+from time import perf_counter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from action_graph.loader import DataAction
+from action_graph.planner import Planner
+
+
+def chain_domain(depth: int, fan_in: int):
+    # level i is achieved by `fan_in` alternative actions (of different costs) that all require level i-1
+    actions = []
+    for level in range(1, depth + 1):
+        for j in range(fan_in):
+            actions.append(DataAction(name=f"Step{level}_{j}", cost=1 + j,
+                                      effects={f"BENCH_L{level}": True},
+                                      preconditions={f"BENCH_L{level - 1}": True}))
+    return actions, {"BENCH_L0": True}, {f"BENCH_L{depth}": True}
+
+
+def timed(planner: Planner, goal: dict, state: dict, bidirectional: bool):
+    t0 = perf_counter()
+    plan = planner.generate_plan(goal, state, bidirectional=bidirectional)
+    return plan, perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--depth', type=int, default=16)
+    parser.add_argument('--fan-in', type=int, default=3)
+    parser.add_argument('--max-paths', type=int, default=200_000,
+                        help='skip the backward search where it would explore more paths than this')
+    args = parser.parse_args()
+
+    print(f"{'depth':>5} {'fan-in':>6} {'backward [ms]':>14} {'bidirectional [ms]':>19} {'same plan':>9}")
+    for depth in range(2, args.depth + 1, 2):
+        actions, state, goal = chain_domain(depth, args.fan_in)
+        planner = Planner(actions)
+        plan, bidirectional = timed(planner, goal, state, True)
+        if args.fan_in ** depth <= args.max_paths:
+            expected, backward = timed(planner, goal, state, False)
+            backward, same = f'{backward * 1e3:14.2f}', str([str(a) for a in plan] == [str(a) for a in expected])
+        else:
+            backward, same = f"{'-':>14}", '-'
+        print(f"{depth:>5} {args.fan_in:>6} {backward} {bidirectional * 1e3:19.2f} {same:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#! /usr/bin/env python3
+"""
+Run time of the Monte Carlo plan simulator (action_graph.simulator.PlanSimulator).
+
+    python benchmarks/simulator_benchmark.py [--steps 50] [--rollouts 10000] [--neutral 0.05] [--failure 0.001]
+"""
+
+import argparse
+import os
+import sys
+from time import perf_counter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from action_graph.action import ActionStatus
+from action_graph.loader import DataAction
+from action_graph.simulator import PlanSimulator
+
+
+def chain_plan(steps: int):
+    # step i requires the effect of step i-1
+    return [DataAction(name=f"Step{i}", effects={f"SIM_S{i}": True},
+                       preconditions={f"SIM_S{i - 1}": True} if i else {}) for i in range(steps)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--steps', type=int, default=50)
+    parser.add_argument('--rollouts', type=int, default=10_000)
+    parser.add_argument('--neutral', type=float, default=0.05, help='probability of a NEUTRAL outcome per step')
+    parser.add_argument('--failure', type=float, default=0.001, help='probability of a FAILURE per step')
+    args = parser.parse_args()
+
+    plan = chain_plan(args.steps)
+    outcomes = {ActionStatus.SUCCESS: 1.0 - args.neutral - args.failure,
+                ActionStatus.NEUTRAL: args.neutral, ActionStatus.FAILURE: args.failure}
+    simulator = PlanSimulator(lambda action: outcomes, seed=0)
+    t0 = perf_counter()
+    report = simulator.simulate(plan, {}, args.rollouts, goal={f"SIM_S{args.steps - 1}": True})
+    elapsed = perf_counter() - t0
+    print(f"{args.rollouts} rollouts of {args.steps} steps: {elapsed * 1e3:.1f} ms; {report}")
+
+
+if __name__ == "__main__":
+    main()
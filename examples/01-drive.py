@@ -6,6 +6,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from action_graph.agent import Agent
 from action_graph.action import Action, State, ActionStatus
+from action_graph.log import enable_console_logging
 
 
 class Drive(Action):
@@ -40,6 +41,8 @@ if __name__ == "__main__":
     world_state = {"has_car": False, "has_drivers_license": True}
     goal_state = {"driving": True}
 
+    enable_console_logging()
+
     ai = Agent()
 
     actions = [a(ai) for a in Action.__subclasses__()]
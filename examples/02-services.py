@@ -8,6 +8,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from action_graph.agent import Agent
 from action_graph.action import Action, State
+from action_graph.log import enable_console_logging
 
 
 class Drive(Action):
@@ -70,6 +71,8 @@ if __name__ == "__main__":
     world_state = {"has_drivers_license": False}
     goal_state = {"driving": "Delorean"}
 
+    enable_console_logging()
+
     ai = Agent()
 
     actions = [a(ai) for a in Action.__subclasses__()]
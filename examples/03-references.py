@@ -6,6 +6,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from action_graph.action import Action, ActionStatus, State
 from action_graph.agent import Agent
+from action_graph.log import enable_console_logging
 
 
 class GoBackToTheFuture(Action):
@@ -81,6 +82,8 @@ if __name__ == "__main__":
 
     goal_state = {"year": "1985"}
 
+    enable_console_logging()
+
     ai = Agent()
 
     actions = [a(ai) for a in Action.__subclasses__()]
@@ -6,6 +6,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from action_graph.action import Action
 from action_graph.agent import Agent
+from action_graph.log import enable_console_logging
 
 
 class Action1(Action):
@@ -27,6 +28,8 @@ if __name__ == "__main__":
     world_state = {"FIRST": False, "SECOND": False, "THIRD": False}
     goal_state = {"THIRD": True}
 
+    enable_console_logging()
+
     ai = Agent()
 
     actions = [a(ai) for a in Action.__subclasses__()]
@@ -4,26 +4,28 @@ import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from action_graph.action import Action, State, ActionStatus
+from action_graph.action import Action, State, ActionStatus, Increment
 from action_graph.agent import Agent
+from action_graph.log import enable_console_logging
 
 
 class FibonacciIncrement(Action):
-    effects = {"counter": ...}
+    # relative effect; the planner repeats the action until the counter reaches the goal
+    effects = {"counter": Increment(1)}
 
     def apply_effects(self, outcome: State, state: State):
         # store the sum in the state
         state["fibonacci_sum"] = state["fibonacci_sum"] + state["counter"] + 1
-        # now apply effects
-        # dont apply the final effect(base class implementation);
-        # instead increment by 1
-        state["counter"] = state["counter"] + 1
+        # now apply effects (the counter value of this step)
+        super().apply_effects(outcome, state)
 
 
 if __name__ == "__main__":
     world_state = {"fibonacci_sum": 0, "counter": 0}
     goal_state = {"counter": 10}
 
+    enable_console_logging()
+
     ai = Agent()
 
     actions = [a(ai) for a in Action.__subclasses__()]
@@ -35,7 +37,8 @@ if __name__ == "__main__":
     print("Goal State:   ", goal_state)
     #
     # # option 2
-    for plan in ai.plan_and_execute(goal_state, verbose=True):
+    # the whole repetition is planned in one search; the rest of the plan is reused after each step
+    for plan in ai.plan_and_execute(goal_state, verbose=True, reuse_plan=True):
         pass  # input()
 
     print(ai.state['fibonacci_sum'])
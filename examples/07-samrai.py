@@ -6,6 +6,7 @@ import time
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from action_graph import Agent, Action, ActionStatus, State
+from action_graph.log import enable_console_logging
 
 
 class ApproachSeam(Action):
@@ -303,6 +304,8 @@ class ScanProduct(Action):
 
 if __name__ == "__main__":
 
+    enable_console_logging()
+
     ai = Agent()
     ai.state = {"SEAL.DATA.LOADED": '',
                 "TASK.DATA.LOADED": '',
@@ -0,0 +1,58 @@
+#! /usr/bin/env python3
+
+import io
+import importlib.util
+
+from action_graph.action import ActionStatus
+from action_graph.agent import Agent
+from action_graph.loader import load_csv, load_json, load_yaml
+
+
+JSON_LINES = """
+{"name": "OpenValve", "effects": {"LDR_VALVE_OPEN": true}, "handler": "open"}
+{"name": "SetFlow", "effects": {"LDR_FLOW": "..."}, "preconditions": {"LDR_VALVE_OPEN": true, "LDR_PUMP": "$LDR_FLOW"}}
+"""
+
+CSV_ROWS = """name,cost,effects,preconditions
+StartPumpSlow,5,"{""LDR_PUMP"": ""..."" }",
+StartPumpFast,1,"{""LDR_PUMP"": ""..."" }",
+"""
+
+YAML_ROWS = """
+- name: Report
+  effects: {LDR_REPORTED: true}
+  preconditions: {LDR_FLOW: high}
+"""
+# the same row, for when PyYAML (an optional dependency) is not installed
+YAML_AS_JSON = '{"name": "Report", "effects": {"LDR_REPORTED": true}, "preconditions": {"LDR_FLOW": "high"}}'
+
+
+def test():
+    ai = Agent()
+    opened = []
+
+    def open_valve(action, outcome):
+        opened.append(outcome)
+        action.status = ActionStatus.SUCCESS
+
+    handlers = {"open": open_valve}
+    actions = list(load_json(io.StringIO(JSON_LINES), ai, handlers))
+    actions += list(load_csv(io.StringIO(CSV_ROWS), ai, handlers))
+    if importlib.util.find_spec("yaml"):
+        actions += list(load_yaml(io.StringIO(YAML_ROWS), ai, handlers))
+    else:
+        actions += list(load_json(io.StringIO(YAML_AS_JSON), ai, handlers))
+    ai.load_actions(actions)
+    ai.update_state({"LDR_VALVE_OPEN": False})
+
+    plan = ai.get_plan({"LDR_REPORTED": True})
+
+    expected_actions = ["OpenValve", "StartPumpFast", "SetFlow", "Report"]
+    expected_outcome = [{'LDR_VALVE_OPEN': True}, {'LDR_PUMP': 'high'}, {'LDR_FLOW': 'high'}, {'LDR_REPORTED': True}]
+
+    assert [str(a) for a in plan] == expected_actions, f'Incorrect Actions!'
+    assert [a.effects for a in plan] == expected_outcome, f'Incorrect Action Outcome!'
+
+    ai.execute_plan(plan)
+    assert opened == [{'LDR_VALVE_OPEN': True}], f'Handler not bound!'
+    assert ai.state["LDR_REPORTED"] is True
@@ -0,0 +1,65 @@
+#! /usr/bin/env python3
+
+from action_graph.action import Action
+from action_graph.agent import Agent
+from action_graph.planner import Planner, PlanningFailedException
+
+
+class StrmPrepare(Action):
+    effects = {"STRM_PREPARED": True}
+
+
+class StrmFetchSlow(Action):
+    effects = {"STRM_PART": ...}
+    cost = 5
+
+
+class StrmFetchFast(Action):
+    effects = {"STRM_PART": ...}
+    cost = 2
+
+
+class StrmAssemble(Action):
+    effects = {"STRM_ASSEMBLED": ...}
+    preconditions = {"STRM_PREPARED": True, "STRM_PART": "$STRM_ASSEMBLED"}
+
+
+class StrmShip(Action):
+    effects = {"STRM_SHIPPED": True}
+    preconditions = {"STRM_ASSEMBLED": "widget", "STRM_LABELLED": True}
+
+
+def test():
+    ai = Agent()
+    actions = [StrmPrepare(ai), StrmFetchSlow(ai), StrmFetchFast(ai), StrmAssemble(ai)]
+    planner = Planner(actions)
+    goal = {"STRM_ASSEMBLED": "widget"}
+
+    plan = planner.generate_plan(goal, {})
+    streamed = list(planner.iter_plan(goal, {}))
+    assert [str(a) for a in streamed] == [str(a) for a in plan] == ["StrmPrepare", "StrmFetchFast", "StrmAssemble"]
+    assert [a.effects for a in streamed] == [a.effects for a in plan]
+
+    # no step is yielded if a later part of the plan is infeasible
+    planner.update_actions(actions + [StrmShip(ai)])
+    steps = planner.iter_plan({"STRM_SHIPPED": True}, {})
+    try:
+        next(steps)
+        assert False, 'Infeasible plan not detected!'
+    except PlanningFailedException:
+        pass
+
+    # ...so the agent does not act on a goal it cannot reach
+    ai.load_actions(actions + [StrmShip(ai)])
+    try:
+        for plan in ai.plan_and_execute({"STRM_SHIPPED": True}, stream=True):
+            pass
+        assert False, 'Infeasible plan not detected!'
+    except PlanningFailedException:
+        pass
+    assert ai.state == {}
+
+    ai.load_actions(actions)
+    for plan in ai.plan_and_execute(goal, stream=True):
+        assert len(plan) == 1
+    assert ai.state == {"STRM_PREPARED": True, "STRM_PART": "widget", "STRM_ASSEMBLED": "widget"}
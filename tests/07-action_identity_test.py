@@ -0,0 +1,35 @@
+#! /usr/bin/env python3
+
+from action_graph.action import Action
+from action_graph.planner import Planner
+
+
+class IdnLoad(Action):
+    effects = {"IDN_LOADED": ...}
+
+
+class IdnCheck(Action):
+    effects = {"IDN_CHECKED": True}
+    preconditions = {"IDN_LOADED": "part"}
+
+
+class IdnPack(Action):
+    effects = {"IDN_PACKED": True}
+    preconditions = {"IDN_LOADED": "part", "IDN_CHECKED": True}
+
+
+def test():
+    template = IdnLoad()
+    a, b, c = template.__copy__(), template.__copy__(), template.__copy__()
+    a.effects["IDN_LOADED"] = "part"
+    b.effects["IDN_LOADED"] = "part"
+    c.effects["IDN_LOADED"] = "tool"
+
+    assert a == b and hash(a) == hash(b), f'Identical steps should be equal!'
+    assert a != c, f'Differently bound steps should differ!'
+    assert a == template and c == template, f'Templated effects should match any value!'
+    assert a.signature() is a.signature(), f'Signature should be computed once!'
+
+    # the shared precondition is planned once
+    plan = Planner([IdnLoad(), IdnCheck(), IdnPack()]).generate_plan({"IDN_PACKED": True}, {})
+    assert [str(x) for x in plan] == ["IdnLoad", "IdnCheck", "IdnPack"]
@@ -0,0 +1,46 @@
+#! /usr/bin/env python3
+
+from action_graph.action import Action
+from action_graph.loader import DataAction
+from action_graph.planner import Planner, PlanningFailedException
+
+
+class RefCut(Action):
+    effects = {"REF_CUT": ..., "REF_TOOL": "$REF_CUT"}
+    preconditions = {"REF_BLADE": "$REF_TOOL", "REF_POWER": "@REF_REQUIRED_POWER"}
+
+
+class RefMountBlade(Action):
+    effects = {"REF_BLADE": ...}
+
+
+class RefSwitchOn(Action):
+    effects = {"REF_POWER": ...}
+
+
+def test():
+    start_state = {"REF_REQUIRED_POWER": "@REF_MAINS", "REF_MAINS": "400V"}
+    planner = Planner([RefCut(), RefMountBlade(), RefSwitchOn()])
+    plan = planner.generate_plan({"REF_CUT": "steel"}, start_state)
+
+    expected_actions = ["RefMountBlade", "RefSwitchOn", "RefCut"]
+    expected_outcome = [{"REF_BLADE": "steel"}, {"REF_POWER": "400V"}, {"REF_CUT": "steel", "REF_TOOL": "$REF_CUT"}]
+
+    assert len(plan) == len(expected_actions), f'Incorrect Plan!'
+    for ax, eax, eoc in zip(plan, expected_actions, expected_outcome):
+        assert ax.__class__.__name__ == eax, f'Incorrect Action!'
+        assert ax.effects == eoc, f'Incorrect Action Outcome!'
+
+    # `@` references are compiled once; they are looked up in the start state of each plan
+    start_state = {"REF_REQUIRED_POWER": "230V", "REF_BLADE": "wood"}
+    plan = planner.generate_plan({"REF_CUT": "@REF_BLADE"}, start_state)
+    assert [str(a) for a in plan] == ["RefSwitchOn", "RefCut"], f'Incorrect Plan!'
+    assert plan[0].effects == {"REF_POWER": "230V"}, f'Incorrect Action Outcome!'
+
+    # reference cycles are reported when the actions are loaded
+    cyclic = DataAction(name="RefCyclic", effects={"REF_A": "$REF_B", "REF_B": "$REF_A"}, preconditions={"REF_C": "$REF_A"})
+    try:
+        Planner([cyclic])
+        assert False, 'Cyclic reference not detected!'
+    except PlanningFailedException:
+        pass
@@ -0,0 +1,52 @@
+#! /usr/bin/env python3
+
+from action_graph.action import Action
+from action_graph.planner import Planner
+
+
+class LftSeal(Action):
+    effects = {"LFT_SEAL": ...}
+    preconditions = {"LFT_AT_SEAM": "$LFT_SEAL", "LFT_NOZZLE": "$LFT_SEAL"}
+
+
+class LftApproach(Action):
+    effects = {"LFT_AT_SEAM": ...}
+    preconditions = {"LFT_READY": True}
+    cost = 10
+
+
+class LftLoadNozzle(Action):
+    effects = {"LFT_NOZZLE": ...}
+    cost = 5
+
+
+class LftLoadSpecialNozzle(Action):
+    effects = {"LFT_NOZZLE": "P9|X9"}
+    cost = 1
+
+
+class LftPrepare(Action):
+    effects = {"LFT_READY": True}
+
+
+def test():
+    planner = Planner([LftSeal(), LftApproach(), LftLoadNozzle(), LftLoadSpecialNozzle(), LftPrepare()])
+
+    for start_state in ({}, {"LFT_NOZZLE": "P2|W2"}, {"LFT_READY": True}, {"LFT_READY": True, "LFT_OTHER": 1}):
+        for product in ("P1|A1", "P2|W2", "P9|X9", "P3|A3"):
+            goal = {"LFT_SEAL": product}
+            lifted = planner.generate_lifted_plan(goal, start_state)
+            plan = planner.generate_plan(goal, start_state)
+            assert [str(a) for a in lifted] == [str(a) for a in plan], f'Incorrect Action!'
+            assert [a.effects for a in lifted] == [a.effects for a in plan], f'Incorrect Action Outcome!'
+
+    # one skeleton per goal key
+    assert len(planner._lifted_plans) == 1
+
+    # reused while the state values it was searched with are unchanged
+    skeleton = planner._lifted_plans[("LFT_SEAL", ())]
+    planner.generate_lifted_plan({"LFT_SEAL": "P1|A1"}, {"LFT_READY": True, "LFT_OTHER": 2, "LFT_NOZZLE": "P7|A7"})
+    assert planner._lifted_plans[("LFT_SEAL", ())] is skeleton
+    plan = planner.generate_lifted_plan({"LFT_SEAL": "P1|A1"}, {})
+    assert planner._lifted_plans[("LFT_SEAL", ())] is not skeleton
+    assert [str(a) for a in plan] == ["LftPrepare", "LftApproach", "LftLoadNozzle", "LftSeal"]
@@ -0,0 +1,58 @@
+#! /usr/bin/env python3
+
+import io
+import json
+import time
+
+from action_graph.action import Action, ActionStatus, State
+from action_graph.agent import Agent
+from action_graph.telemetry import JsonLinesExporter, OpenMetricsExporter, RingBufferExporter, Telemetry
+
+
+class TlmFlakyHeat(Action):
+    effects = {"TLM_HOT": True}
+
+    def on_execute(self, outcome: State):
+        self.status = ActionStatus.FAILURE
+
+
+class TlmHeat(Action):
+    effects = {"TLM_HOT": True}
+    cost = 2
+
+
+class TlmPour(Action):
+    effects = {"TLM_POURED": True}
+    preconditions = {"TLM_HOT": True}
+
+    def on_execute(self, outcome: State):
+        self.status = ActionStatus.SUCCESS
+        time.sleep(0.05)  # the agent moves on before on_execute returns
+
+
+def test():
+    ring, metrics, lines = RingBufferExporter(), OpenMetricsExporter(), io.StringIO()
+    ai = Agent(telemetry=Telemetry([ring, metrics, JsonLinesExporter(lines)]))
+    ai.load_actions([TlmFlakyHeat(ai), TlmHeat(ai), TlmPour(ai)])
+
+    for plan in ai.plan_and_execute({"TLM_POURED": True}):
+        pass
+
+    actions = [r for r in ring.records if r['type'] == 'action']
+    assert [(r['action'], r['outcome']) for r in actions] == \
+        [('TlmFlakyHeat', 'FAILURE'), ('TlmHeat', 'SUCCESS'), ('TlmPour', 'SUCCESS')]
+    for r in actions:
+        assert None not in (r['dispatch_latency'], r['run_time'], r['callback_time']), r
+        assert r['dispatch_latency'] >= 0 and r['run_time'] >= 0 and r['callback_time'] >= 0
+    assert actions[-1]['run_time'] < 0.05  # until the status was set
+
+    plans = [r for r in ring.records if r['type'] == 'plan']
+    assert len(plans) == 1 and plans[0]['outcome'] == 'SUCCESS' and plans[0]['replans'] == 2
+
+    assert len(lines.getvalue().splitlines()) == len(ring.records)
+    assert json.loads(lines.getvalue().splitlines()[-1])['type'] == 'plan'
+
+    text = metrics.render()
+    assert 'action_graph_action_outcomes_total{agent="Agent",action="TlmHeat",outcome="SUCCESS"} 1' in text
+    assert 'action_graph_replans_total{agent="Agent"} 2' in text
+    assert text.endswith('# EOF\n')
@@ -0,0 +1,65 @@
+#! /usr/bin/env python3
+
+import logging
+import threading
+
+from action_graph.agent import Agent
+from action_graph.loader import DataAction
+from action_graph.log import disable_async_logging, enable_async_logging
+
+
+class _Collect(logging.Handler):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages = []
+        self.records = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def emit(self, record: logging.LogRecord):
+        self.gate.wait()
+        self.messages.append(self.format(record))
+        self.records.append(record)
+
+
+def test():
+    # importing the library does not configure logging
+    assert [h.__class__ for h in logging.getLogger('action_graph').handlers] == [logging.NullHandler]
+
+    collect = _Collect()
+    listener = enable_async_logging([collect])
+    try:
+        ai = Agent()
+        ai.load_actions([DataAction(ai, name="LogShip", effects={"LOG_SHIPPED": True},
+                                    preconditions={"LOG_UNREACHABLE": True})])
+        assert ai.get_plan({"LOG_SHIPPED": True}, {}) == []
+    finally:
+        disable_async_logging()
+
+    assert listener._thread is None
+    assert collect.messages == ["PLANNING FAILED! No action available to satisfy: {'LOG_UNREACHABLE': True}"]
+    logging.getLogger('action_graph').removeHandler(collect)
+
+    # queued records hold a snapshot of their arguments (and no traceback frames)
+    collect = _Collect()
+    collect.gate.clear()  # hold the listener at the first record
+    enable_async_logging([collect])
+    logger = logging.getLogger('action_graph.test')
+    try:
+        logger.warning("first")
+        state = {"LOG_COUNT": 1}
+        logger.warning("state: %s", state)
+        state["LOG_COUNT"] = 2
+        try:
+            raise ValueError("LOG_BROKEN")
+        except ValueError:
+            logger.exception("failed")
+        collect.gate.set()
+    finally:
+        disable_async_logging()
+
+    assert collect.messages[:2] == ["first", "state: {'LOG_COUNT': 1}"]
+    assert collect.messages[2].startswith("failed\nTraceback") and "ValueError: LOG_BROKEN" in collect.messages[2]
+    assert all(r.exc_info is None and r.args is None for r in collect.records)
+    logging.getLogger('action_graph').removeHandler(collect)
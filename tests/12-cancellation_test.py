@@ -0,0 +1,78 @@
+#! /usr/bin/env python3
+
+import threading
+import time
+
+from action_graph.action import Action, ActionStatus, State, ActionAbortedException, ActionTimedOutException
+from action_graph.agent import Agent
+
+
+class CnlPoll(Action):
+    effects = {"CNL_POLLED": True}
+    timeout = 0.2
+
+    def on_execute(self, outcome: State):
+        while not self.cancellation.wait(0.01):
+            pass
+        self.status = ActionStatus.ABORTED
+
+
+class CnlBlockingProcess(Action):
+    effects = {"CNL_DONE": True}
+    timeout = 0.3
+    run_in_process = True
+
+    def on_execute(self, outcome: State):
+        time.sleep(30)
+        self.status = ActionStatus.SUCCESS
+
+
+class CnlProcessCheck(Action):
+    effects = {"CNL_CHECKED": True}
+    run_in_process = True
+    process_start_method = 'spawn'
+    expected = None
+
+    def on_execute(self, outcome: State):
+        # runs on a copy of the action, without the agent
+        ok = self.agent is None and self.expected == 42 and outcome == {"CNL_CHECKED": True}
+        self.status = ActionStatus.SUCCESS if ok else ActionStatus.FAILURE
+
+
+def _expect(exception, func, *args):
+    try:
+        func(*args)
+    except exception:
+        return
+    assert False, f'{exception.__name__} not raised!'
+
+
+def test():
+    ai = Agent()
+
+    # timeout enforced by the watchdog; the cooperative action stops
+    action = CnlPoll(ai)
+    _expect(ActionTimedOutException, ai.execute_action, action)
+    assert action.cancellation.reason == 'timeout' and action._join(0), f'Action thread leaked!'
+
+    # abort cancels the running action
+    action = CnlPoll(ai)
+    action.timeout = 60
+    threading.Timer(0.1, ai.abort).start()
+    _expect(ActionAbortedException, ai.execute_action, action)
+    assert action.cancellation.reason == 'aborted' and action._join(0), f'Action thread leaked!'
+    ai.reset()
+
+    # actions running in a process are terminated
+    action = CnlBlockingProcess(ai)
+    t0 = time.time()
+    _expect(ActionTimedOutException, ai.execute_action, action)
+    assert time.time() - t0 < 5 and action._join(0) and action._process is None, f'Process leaked!'
+
+    # the agent (locks, threads) is not pickled to start the process
+    ai.start_state_ingestion()
+    action = CnlProcessCheck(ai)
+    action.expected = 42
+    ai.execute_action(action)
+    ai.stop_state_ingestion()
+    assert action.status == ActionStatus.SUCCESS and ai.state["CNL_CHECKED"] is True
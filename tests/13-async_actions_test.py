@@ -0,0 +1,112 @@
+#! /usr/bin/env python3
+
+import threading
+import time
+
+from action_graph.action import Action, ActionStatus, State, ActionAbortedException, AsyncActionFailedException
+from action_graph.agent import Agent
+
+_lock = threading.Lock()
+_running = {"now": 0, "max": 0}
+
+
+class _Tracked(Action):
+    allow_async = True
+    outcome = ActionStatus.SUCCESS
+
+    def on_execute(self, outcome: State):
+        with _lock:
+            _running["now"] += 1
+            _running["max"] = max(_running["max"], _running["now"])
+        time.sleep(0.1)
+        with _lock:
+            _running["now"] -= 1
+        self.status = self.outcome
+
+
+class AsyPrime(_Tracked):
+    effects = {"ASY_PRIMED": True}
+
+
+class AsyFlakyHeat(_Tracked):
+    effects = {"ASY_HOT": True}
+    outcome = ActionStatus.FAILURE
+
+
+class AsyHeat(Action):
+    effects = {"ASY_HOT": True}
+    cost = 5
+
+
+class AsyFinish(Action):
+    effects = {"ASY_DONE": True}
+    preconditions = {"ASY_PRIMED": True, "ASY_HOT": True}
+
+
+_release = threading.Event()
+
+
+class AsyStubborn(Action):
+    # ignores its cancellation token
+    effects = {"ASY_STUBBORN": True}
+    allow_async = True
+    cancel_grace = 0.1
+
+    def on_execute(self, outcome: State):
+        _release.wait(30)
+        self.status = ActionStatus.SUCCESS
+
+
+class AsyAfterStubborn(Action):
+    effects = {"ASY_AFTER": True}
+    preconditions = {"ASY_STUBBORN": True}
+
+
+def _expect(exception, func, *args):
+    try:
+        func(*args)
+    except exception:
+        return
+    assert False, f'{exception.__name__} not raised!'
+
+
+def _join_points_do_not_hang():
+    # abort wakes up the join point; the stubborn action is given up after its cancel_grace
+    ai = Agent()
+    ai.execute_action(AsyStubborn(ai))
+    threading.Timer(0.1, ai.abort).start()
+    t0 = time.time()
+    _expect(ActionAbortedException, ai.execute_action, AsyAfterStubborn(ai))
+    assert time.time() - t0 < 5
+
+    # the watchdog timeout also ends the wait
+    ai = Agent()
+    action = AsyStubborn(ai)
+    action.timeout = 0.1
+    ai.execute_action(action)
+    t0 = time.time()
+    _expect(AsyncActionFailedException, ai.join_async)
+    assert time.time() - t0 < 5
+    assert "ASY_STUBBORN" not in ai.state and not ai.async_actions()
+
+
+def test():
+    ai = Agent(max_async_actions=1)
+    ai.load_actions([AsyPrime(ai), AsyFlakyHeat(ai), AsyHeat(ai), AsyFinish(ai)])
+
+    plans = [[str(a) for a in plan] for plan in ai.plan_and_execute({"ASY_DONE": True})]
+
+    # the late failure of the async heater was detected at the join point before AsyFinish
+    assert plans == [["AsyPrime", "AsyFlakyHeat", "AsyFinish"],
+                     ["AsyFlakyHeat", "AsyFinish"],
+                     ["AsyFinish"],
+                     ["AsyHeat", "AsyFinish"],
+                     ["AsyFinish"]]
+    assert ai.state == {"ASY_PRIMED": True, "ASY_HOT": True, "ASY_DONE": True}
+    assert not ai.async_actions()
+    assert _running["max"] == 1, f'Concurrency limit not respected!'
+
+    try:
+        _join_points_do_not_hang()
+    finally:
+        _release.set()
@@ -0,0 +1,57 @@
+#! /usr/bin/env python3
+
+from action_graph.action import Action, ActionStatus, State
+from action_graph.agent import Agent
+from action_graph.telemetry import RingBufferExporter, Telemetry
+
+
+class SubFetch(Action):
+    effects = {"SUB_FETCHED": True}
+
+
+class SubCut(Action):
+    effects = {"SUB_CUT": True}
+    preconditions = {"SUB_FETCHED": True}
+
+    def on_execute(self, outcome: State):
+        # a sensor reports a change to a key the plan depends on
+        if self.agent.state.get("SUB_DISTURB"):
+            self.agent.update_state({"SUB_FETCHED": "moved"})
+            self.agent.update_state({"SUB_FETCHED": True})
+        self.status = ActionStatus.SUCCESS
+
+
+class SubPack(Action):
+    effects = {"SUB_PACKED": True}
+    preconditions = {"SUB_FETCHED": True, "SUB_CUT": True}
+
+
+def _replans(disturb: bool) -> int:
+    ring = RingBufferExporter()
+    ai = Agent(telemetry=Telemetry([ring]))
+    ai.load_actions([SubFetch(ai), SubCut(ai), SubPack(ai)])
+    ai.update_state({"SUB_DISTURB": disturb})
+    for plan in ai.plan_and_execute({"SUB_PACKED": True}, reuse_plan=True):
+        pass
+    assert ai.state["SUB_PACKED"] is True
+    return [r for r in ring.records if r['type'] == 'plan'][0]['replans']
+
+
+def test():
+    ai = Agent()
+    changes = []
+    subscription = ai.subscribe(["SUB_LEVEL"], lambda key, old, new: changes.append((key, old, new)))
+
+    ai.update_state({"SUB_LEVEL": 1, "SUB_OTHER": 1})
+    ai.update_state({"SUB_LEVEL": 1, "SUB_OTHER": 2})
+    ai.state = {"SUB_LEVEL": 2}  # replacing the state keeps the subscriptions
+    ai.update_state({"SUB_LEVEL": 3})
+    ai.unsubscribe(subscription)
+    ai.update_state({"SUB_LEVEL": 4})
+
+    missing = ai.state.MISSING
+    assert changes == [("SUB_LEVEL", missing, 1), ("SUB_LEVEL", 1, 2), ("SUB_LEVEL", 2, 3)]
+
+    # the rest of the plan is reused unless the state it depends on is changed externally
+    assert _replans(disturb=False) == 0
+    assert _replans(disturb=True) == 1
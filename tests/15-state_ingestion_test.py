@@ -0,0 +1,67 @@
+#! /usr/bin/env python3
+
+import sys
+import threading
+
+from action_graph.agent import Agent
+
+UPDATES = 5000
+
+
+def test():
+    ai = Agent()
+    notified = []
+    ai.subscribe(["ING_A"], lambda key, old, new: notified.append(new))
+
+    # updates queued while nothing is flushing are coalesced per key
+    for i in range(UPDATES):
+        ai.submit_state({"ING_A": i, "ING_B": i})
+    assert "ING_A" not in ai.state
+    assert ai.flush_state() == 2
+    assert ai.state["ING_A"] == ai.state["ING_B"] == UPDATES - 1
+    assert notified == [UPDATES - 1]
+
+    # producers submit paired updates; the snapshots never see one without the other
+    ai.start_state_ingestion(0.001)
+    producers = [threading.Thread(target=lambda: [ai.submit_state({"ING_A": i, "ING_B": i}) for i in range(UPDATES)])
+                 for _ in range(4)]
+    for p in producers:
+        p.start()
+    torn = 0
+    while any(p.is_alive() for p in producers):
+        snapshot = ai.snapshot()
+        torn += snapshot["ING_A"] != snapshot["ING_B"]
+    for p in producers:
+        p.join()
+    ai.stop_state_ingestion()
+
+    assert torn == 0, f'{torn} torn reads!'
+    assert ai.state["ING_A"] == ai.state["ING_B"] == UPDATES - 1
+    assert len(notified) < 4 * UPDATES
+
+    # concurrent flushers never apply an older batch after a newer one
+    backwards = []
+
+    def on_change(key, old, new):
+        if old is not ai.state.MISSING and new < old:
+            backwards.append(new)
+
+    ai.subscribe(["ING_C"], on_change)
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        stop = threading.Event()
+        flushers = [threading.Thread(target=lambda: [ai.flush_state() for _ in iter(stop.is_set, True)])
+                    for _ in range(2)]
+        ai.start_state_ingestion(0.0001)
+        for f in flushers:
+            f.start()
+        for i in range(20 * UPDATES):
+            ai.submit_state({"ING_C": i})
+        stop.set()
+        for f in flushers:
+            f.join()
+        ai.stop_state_ingestion()
+    finally:
+        sys.setswitchinterval(interval)
+    assert not backwards and ai.state["ING_C"] == 20 * UPDATES - 1
@@ -0,0 +1,58 @@
+#! /usr/bin/env python3
+
+import random
+
+from action_graph.analysis import PlanProfiler, summarise
+from action_graph.loader import DataAction
+
+
+def _library():
+    return [DataAction(name="AnlWalk", effects={"ANL_AT_SHOP": True}, cost=5),
+            DataAction(name="AnlDrive", effects={"ANL_AT_SHOP": True}, preconditions={"ANL_HAS_CAR": True}, cost=2),
+            DataAction(name="AnlRentCar", effects={"ANL_HAS_CAR": True}, cost=2),
+            DataAction(name="AnlBuy", effects={"ANL_BOUGHT": True}, preconditions={"ANL_AT_SHOP": True}, cost=1)]
+
+
+def _large_library(size: int = 300, keys: int = 100):
+    rng = random.Random(7)
+    actions = []
+    for i in range(size):
+        k = i % keys
+        preconditions = {f"ANL_K{p}": True for p in rng.sample(range(k), min(k, rng.randint(0, 2)))}
+        actions.append(DataAction(name=f"AnlAction{i}", effects={f"ANL_K{k}": True},
+                                  preconditions=preconditions, cost=rng.randint(1, 10)))
+    return actions
+
+
+def test():
+    profiler = PlanProfiler(_library())
+
+    report = profiler.analyse({"ANL_BOUGHT": True}, {"ANL_HAS_CAR": True})
+    assert [str(a) for a in report.plan] == ["AnlDrive", "AnlBuy"] and report.cost == 3
+    assert [str(a) for a in report.alternative] == ["AnlWalk", "AnlBuy"] and report.margin == 3
+    assert report.flips == {"AnlDrive": 3, "AnlBuy": float('inf'), "AnlWalk": -3}
+
+    report = profiler.analyse({"ANL_BOUGHT": True}, {})
+    assert [str(a) for a in report.plan] == ["AnlRentCar", "AnlDrive", "AnlBuy"] and report.margin == 1
+    assert report.flips["AnlRentCar"] == 1 and report.flips["AnlWalk"] == -1
+
+    # what-if: making the rental more expensive than the margin flips the decision
+    profiler = PlanProfiler([a if str(a) != "AnlRentCar" else
+                             DataAction(name="AnlRentCar", effects={"ANL_HAS_CAR": True}, cost=3.5) for a in _library()])
+    assert [str(a) for a in profiler.analyse({"ANL_BOUGHT": True}, {}).plan] == ["AnlWalk", "AnlBuy"]
+
+    assert not profiler.analyse({"ANL_FLYING": True}, {}).feasible
+
+    # sweep over a large library
+    profiler = PlanProfiler(_large_library())
+    states = [{f"ANL_K{k}": True for k in range(s, 100, 7)} for s in range(5)]
+    reports = profiler.sweep([{f"ANL_K{k}": True} for k in range(100)], states)
+    assert len(reports) == 500 and all(r.feasible for r in reports)
+    assert all(r.margin >= 0 for r in reports)
+    summary = summarise(reports)
+    assert sum(sum(entry['plans'].values()) for entry in summary.values()) == 500
+
+    # plans generated with a shared memo do not share steps
+    plans = [profiler.planner.generate_plan({"ANL_K99": True}, {}, memo=memo) for memo in [{}] for _ in range(2)]
+    assert [str(a) for a in plans[0]] == [str(a) for a in plans[1]]
+    assert not {id(a) for a in plans[0]} & {id(a) for a in plans[1]}
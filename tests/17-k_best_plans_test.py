@@ -0,0 +1,63 @@
+#! /usr/bin/env python3
+
+from action_graph.action import Action, ActionStatus, State
+from action_graph.agent import Agent
+from action_graph.loader import DataAction
+from action_graph.planner import Planner
+from action_graph.telemetry import RingBufferExporter, Telemetry
+
+
+class KbpPrepare(Action):
+    effects = {"KBP_READY": True}
+
+
+class KbpFast(Action):
+    effects = {"KBP_DONE": True}
+    preconditions = {"KBP_READY": True}
+
+    def on_execute(self, outcome: State):
+        self.status = ActionStatus.FAILURE
+
+
+class KbpSlow(Action):
+    effects = {"KBP_DONE": True}
+    preconditions = {"KBP_READY": True}
+    cost = 3
+
+
+def _names(plans):
+    return [[str(a) for a in plan] for plan in plans]
+
+
+def test():
+    planner = Planner([DataAction(name="KbpX1", effects={"KBP_X": True}, cost=1),
+                       DataAction(name="KbpX2", effects={"KBP_X": True}, cost=2),
+                       DataAction(name="KbpX3", effects={"KBP_X": True}, cost=5),
+                       DataAction(name="KbpViaX", effects={"KBP_G": True}, preconditions={"KBP_X": True}),
+                       DataAction(name="KbpDirect", effects={"KBP_G": True}, cost=10)])
+
+    plans = planner.generate_plans({"KBP_G": True}, {}, k=3)
+    assert _names(plans) == [["KbpX1", "KbpViaX"], ["KbpX2", "KbpViaX"], ["KbpX3", "KbpViaX"]]
+    assert plans[0] == planner.generate_plan({"KBP_G": True}, {})
+    # plans differing in at least 3 actions from each other
+    assert _names(planner.generate_plans({"KBP_G": True}, {}, k=3, min_difference=3)) == \
+        [["KbpX1", "KbpViaX"], ["KbpDirect"]]
+    assert planner.generate_plans({"KBP_G": True}, {"KBP_G": True}) == [[]]
+
+    # `@` preconditions refer to the start state, also when the plan is checked again
+    planner = Planner([DataAction(name="KbpSwitch", effects={"KBP_MODE": "b"}),
+                       DataAction(name="KbpCopy", effects={"KBP_COPY": "a"}),
+                       DataAction(name="KbpUse", effects={"KBP_USED": True},
+                                  preconditions={"KBP_MODE": "b", "KBP_COPY": "@KBP_MODE"})])
+    plan = planner.generate_plan({"KBP_USED": True}, {"KBP_MODE": "a"})
+    assert planner.check_plan(plan, {"KBP_USED": True}, {"KBP_MODE": "a"}) == plan, f'Valid plan rejected!'
+    assert planner.check_plan(plan, {"KBP_USED": True}, {"KBP_MODE": "c"}) is None, f'Invalid plan accepted!'
+
+    # the agent continues with the precomputed alternative, without replanning
+    ring = RingBufferExporter()
+    ai = Agent(telemetry=Telemetry([ring]))
+    ai.load_actions([KbpPrepare(ai), KbpFast(ai), KbpSlow(ai)])
+    plans = _names(ai.plan_and_execute({"KBP_DONE": True}, failover=1))
+    assert plans == [["KbpPrepare", "KbpFast"], ["KbpFast"], ["KbpSlow"]]
+    record = [r for r in ring.records if r['type'] == 'plan'][0]
+    assert record['outcome'] == 'SUCCESS' and record['failovers'] == 1
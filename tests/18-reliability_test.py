@@ -0,0 +1,49 @@
+#! /usr/bin/env python3
+
+from action_graph.action import Action, ActionStatus, State
+from action_graph.agent import Agent
+from action_graph.reliability import ActionStatistics
+
+attempts = []
+
+
+class RelFlakyGrip(Action):
+    effects = {"REL_HELD": True}
+
+    def on_execute(self, outcome: State):
+        attempts.append(str(self))
+        self.status = ActionStatus.FAILURE
+
+
+class RelSteadyGrip(Action):
+    effects = {"REL_HELD": True}
+    cost = 1.2
+
+    def on_execute(self, outcome: State):
+        attempts.append(str(self))
+        self.status = ActionStatus.SUCCESS
+
+
+def _wasted_attempts(reliability: ActionStatistics, runs: int = 5) -> int:
+    attempts.clear()
+    ai = Agent(reliability=reliability)
+    ai.load_actions([RelFlakyGrip(ai), RelSteadyGrip(ai)])
+    for _ in range(runs):
+        ai.update_state({"REL_HELD": False})
+        for plan in ai.plan_and_execute({"REL_HELD": True}):
+            pass
+    assert attempts.count("RelSteadyGrip") == runs
+    return attempts.count("RelFlakyGrip")
+
+
+def test():
+    # without statistics, every run tries the flaky gripper first
+    assert _wasted_attempts(None) == 5
+
+    # with statistics, the flaky gripper is given up once its expected cost exceeds the alternative's
+    stats = ActionStatistics()
+    assert _wasted_attempts(stats) == 1
+    learned = stats.as_dict()
+    assert learned["RelFlakyGrip"]["successes"] == 0 and learned["RelFlakyGrip"]["failures"] == 1
+    assert learned["RelSteadyGrip"]["success_probability"] == 6 / 7
+    assert stats.expected_cost(RelFlakyGrip()) == 1 / (1 / 3)
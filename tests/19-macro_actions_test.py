@@ -0,0 +1,77 @@
+#! /usr/bin/env python3
+
+from action_graph.action import ActionStatus
+from action_graph.agent import Agent
+from action_graph.loader import DataAction
+from action_graph.macro import MacroAction, MacroLearner
+from action_graph.planner import Planner
+
+DEPTH = 10
+executed = []
+
+
+def _run(action, outcome):
+    executed.append(str(action))
+    action.status = ActionStatus.SUCCESS
+
+
+def _chain(agent=None):
+    # two alternative actions per level; the flat search explores 2^DEPTH paths
+    actions = []
+    for k in range(DEPTH + 1):
+        preconditions = {f"MAC_S{k-1}": True} if k else {}
+        actions.append(DataAction(agent, f"MacFast{k}", {f"MAC_S{k}": True}, preconditions, cost=1, handler=_run))
+        actions.append(DataAction(agent, f"MacSlow{k}", {f"MAC_S{k}": True}, preconditions, cost=2, handler=_run))
+    return actions
+
+
+def _searched(actions, goal):
+    # search effort: number of (partial) paths costed
+    costed = []
+    plan = Planner(actions, cost_model=lambda a: costed.append(a) or a.cost).generate_plan(goal, {})
+    return plan, len(costed)
+
+
+def test():
+    goal = {f"MAC_S{DEPTH}": True}
+    actions = _chain()
+    flat_plan, _ = _searched(actions, goal)
+    assert [str(a) for a in flat_plan] == [f"MacFast{k}" for k in range(DEPTH + 1)]
+
+    # a declared macro is used as a single edge; it wins the tie with the same (flat) steps
+    macro = MacroAction(steps=flat_plan, name="MacAscend")
+    assert macro.preconditions == {} and macro.cost == DEPTH + 1
+    macro_plan, _ = _searched(actions + [macro], goal)
+    assert [str(a) for a in macro_plan] == ["MacAscend"]
+
+    # macros compete on cost with the flat actions; the same choice by every search
+    direct = DataAction(None, "MacDirect", {"MAC_TOP": True}, cost=1)
+    detour = MacroAction(steps=[DataAction(None, "MacA", {"MAC_MID": True}, cost=5),
+                                DataAction(None, "MacB", {"MAC_TOP": True}, {"MAC_MID": True}, cost=5)])
+    planner = Planner([direct, detour])
+    top = {"MAC_TOP": True}
+    assert [str(a) for a in planner.generate_plan(top, {})] == ["MacDirect"], f'Incorrect Plan!'
+    assert [str(a) for a in planner.generate_plan(top, {}, bidirectional=True)] == ["MacDirect"]
+    assert [str(a) for a in planner.iter_plan(top, {})] == ["MacDirect"]
+    assert [[str(a) for a in p] for p in planner.generate_plans(top, {}, k=2)] == [["MacDirect"], ["MacA+MacB"]]
+
+    # macros learned from the executed plans; the agent executes the underlying steps
+    learner = MacroLearner(min_length=2, max_length=DEPTH + 1, min_support=2)
+    ai = Agent(macro_learner=learner)
+    ai.load_actions(_chain(ai))
+    for _ in range(2):
+        ai.reset()
+        ai.state = {}
+        for plan in ai.plan_and_execute(goal, reuse_plan=True):
+            pass
+    ai.load_macros()
+    assert str(learner.macros()[0]) == '+'.join(f"MacFast{k}" for k in range(DEPTH + 1))
+
+    executed.clear()
+    ai.state = {}
+    plans = list(ai.plan_and_execute(goal))
+    assert len(plans) == DEPTH + 1
+    # the macro is replanned at each step; its executed steps are not repeated
+    assert [str(a) for a in plans[1]] == [f"MacFast{k}" for k in range(1, DEPTH + 1)]
+    assert executed == [f"MacFast{k}" for k in range(DEPTH + 1)]
+    assert ai.state[f"MAC_S{DEPTH}"] is True
@@ -0,0 +1,61 @@
+#! /usr/bin/env python3
+
+from action_graph.action import Action, Decrement, GreaterEqual, Increment, LessThan
+from action_graph.agent import Agent
+from action_graph.macro import expand_macros
+from action_graph.planner import Planner
+
+
+class NumWork(Action):
+    effects = {"NUM_MONEY": Increment(4)}
+
+
+class NumBuy(Action):
+    effects = {"NUM_HAS_ITEM": True, "NUM_MONEY": Decrement(10)}
+    preconditions = {"NUM_MONEY": GreaterEqual(10)}
+
+
+class NumRefill(Action):
+    effects = {"NUM_TANK": Increment(5)}
+    preconditions = {"NUM_TANK": LessThan(8)}
+
+
+class NumTopUp(Action):
+    effects = {"NUM_TANK": Increment(1)}
+
+
+class NumCount(Action):
+    effects = {"NUM_COUNTER": Increment(1)}
+
+
+def test():
+    planner = Planner([NumWork(), NumBuy(), NumRefill(), NumTopUp()])
+
+    # comparison preconditions are met by repeating relative effects; planned in one search
+    start_state = {"NUM_MONEY": 3}
+    plan = expand_macros(planner.generate_plan({"NUM_HAS_ITEM": True}, start_state), start_state)
+    assert [str(a) for a in plan] == ["NumWork", "NumWork", "NumBuy"], f'Incorrect Plan!'
+    assert [a.effects["NUM_MONEY"] for a in plan[:2]] == [7, 11], f'Incorrect Action Outcome!'
+    state = dict(start_state)
+    for action in plan:
+        action.apply_effects(action.effects, state)
+    assert state == {"NUM_MONEY": 1, "NUM_HAS_ITEM": True}
+
+    # the preconditions on the variable itself are checked for each repetition
+    start_state = {"NUM_TANK": 0}
+    plan = expand_macros(planner.generate_plan({"NUM_TANK": GreaterEqual(12)}, start_state), start_state)
+    assert len(plan) == 4, f'Incorrect Plan!'
+    assert plan[-1].effects["NUM_TANK"] >= 12
+    assert planner.check_plan(plan, {"NUM_TANK": GreaterEqual(12)}, start_state) == plan
+
+    # no decrement available
+    plan = planner.generate_plan({"NUM_TANK": LessThan(0)}, {"NUM_TANK": 3})
+    assert len(plan) == 1 and plan[0].cost == float('inf'), f'Impossible goal planned!'
+
+    # the agent reuses the plan of the whole repetition; no replan per step
+    ai = Agent()
+    ai.load_actions([NumCount(ai)])
+    ai.update_state({"NUM_COUNTER": 0})
+    lengths = [len(plan) for plan in ai.plan_and_execute({"NUM_COUNTER": 10}, reuse_plan=True)]
+    assert lengths == list(range(10, 0, -1)), f'Plan not reused!'
+    assert ai.state["NUM_COUNTER"] == 10
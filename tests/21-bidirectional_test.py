@@ -0,0 +1,38 @@
+#! /usr/bin/env python3
+
+from action_graph.loader import DataAction
+from action_graph.planner import Planner, PlanningFailedException
+
+DEPTH = 7
+FAN_IN = 3
+
+
+def test():
+    # each level has alternative achievers (of different costs) that all require the previous level
+    actions = [DataAction(name=f"BidStep{level}_{j}", cost=3 - j if level % 2 else 1 + j,
+                          effects={f"BID_L{level}": True}, preconditions={f"BID_L{level - 1}": True})
+               for level in range(1, DEPTH + 1) for j in range(FAN_IN)]
+    start_state, goal = {"BID_L0": True}, {f"BID_L{DEPTH}": True}
+
+    costed = {False: [], True: []}
+    plans = {}
+    for bidirectional in (False, True):
+        planner = Planner(actions, cost_model=lambda a, c=costed[bidirectional]: c.append(a) or a.cost)
+        plans[bidirectional] = planner.generate_plan(goal, start_state, bidirectional=bidirectional)
+
+    expected_actions = [f"BidStep{level}_{2 if level % 2 else 0}" for level in range(1, DEPTH + 1)]
+    assert [str(a) for a in plans[False]] == expected_actions, f'Incorrect Plan!'
+    assert [str(a) for a in plans[True]] == expected_actions, f'Incorrect Plan!'
+    # the alternatives that cannot be cheaper are not searched
+    assert len(costed[True]) * 10 < len(costed[False]), f'Search not pruned!'
+
+    # achievers whose preconditions cannot be reached from the start state are not searched at all
+    planner = Planner([DataAction(name="BidFast", effects={"BID_GOAL": True}, preconditions={"BID_KEY": True}),
+                       DataAction(name="BidKey", effects={"BID_KEY": True}, preconditions={"BID_LOST": True}),
+                       DataAction(name="BidSlow", cost=5, effects={"BID_GOAL": True})])
+    try:
+        planner.generate_plan({"BID_GOAL": True}, {})
+        assert False, 'Dead end not reported!'
+    except PlanningFailedException:
+        pass
+    assert [str(a) for a in planner.generate_plan({"BID_GOAL": True}, {}, bidirectional=True)] == ["BidSlow"]
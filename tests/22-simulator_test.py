@@ -0,0 +1,59 @@
+#! /usr/bin/env python3
+
+from action_graph.action import Action, ActionStatus, GreaterEqual, State
+from action_graph.loader import DataAction
+from action_graph.reliability import ActionStatistics
+from action_graph.simulator import PlanSimulator
+
+ROLLOUTS = 10_000
+
+
+class SimCount(Action):
+    effects = {"SIM_COUNT": ...}
+
+    def apply_effects(self, outcome: State, state: State):
+        state["SIM_COUNT"] = state["SIM_COUNT"] + 1
+
+
+def test():
+    plan = [DataAction(name="SimOpen", cost=1, effects={"SIM_OPEN": True}),
+            DataAction(name="SimFill", cost=2, effects={"SIM_FULL": True}, preconditions={"SIM_OPEN": True}),
+            DataAction(name="SimClose", cost=4, effects={"SIM_OPEN": False}, preconditions={"SIM_FULL": True})]
+    goal = {"SIM_FULL": True, "SIM_OPEN": False}
+
+    # failures stop the rollout
+    outcomes = {"SimFill": {ActionStatus.SUCCESS: 0.9, ActionStatus.FAILURE: 0.1}}
+    report = PlanSimulator(outcomes, seed=1).simulate(plan, {}, ROLLOUTS, goal)
+    assert abs(report.success_probability - 0.9) < 0.02, f'Incorrect success probability!'
+    assert abs(report.expected_cost - (0.9 * 7 + 0.1 * 3)) < 0.1, f'Incorrect expected cost!'
+    assert set(report.failures) == {"SimFill"} and report.successes + report.failures["SimFill"] == ROLLOUTS
+    # reproducible
+    again = PlanSimulator(outcomes, seed=1).simulate(plan, {}, ROLLOUTS, goal)
+    assert (again.successes, again.costs) == (report.successes, report.costs)
+
+    # neutral steps leave the state as is; the next step then lacks its preconditions
+    outcomes = {"SimOpen": {ActionStatus.SUCCESS: 0.5, ActionStatus.NEUTRAL: 0.5}}
+    report = PlanSimulator(outcomes, seed=2).simulate(plan, {}, ROLLOUTS, goal)
+    assert abs(report.success_probability - 0.5) < 0.02, f'Incorrect success probability!'
+    assert report.unmet_preconditions["SimFill"] == ROLLOUTS - report.successes
+
+    # outcome probabilities learned by an agent
+    statistics = ActionStatistics(prior_successes=1, prior_failures=0)  # never executed: always succeeds
+    for success in (True, True, True, False):
+        statistics.record(plan[2], success)
+    report = PlanSimulator(statistics, seed=3).simulate(plan, {}, ROLLOUTS, goal)
+    assert abs(report.success_probability - 0.8) < 0.02, f'Incorrect success probability!'
+
+    # apply_effects is applied to the state of each rollout
+    counts = [SimCount() for _ in range(4)]
+    report = PlanSimulator(lambda action: {ActionStatus.SUCCESS: 0.5, ActionStatus.NEUTRAL: 0.5}, seed=4) \
+        .simulate(counts, {"SIM_COUNT": 0}, ROLLOUTS, {"SIM_COUNT": GreaterEqual(2)})
+    assert abs(report.success_probability - 11 / 16) < 0.02, f'Incorrect success probability!'
+    assert report.goal_unmet == ROLLOUTS - report.successes
+
+    # `@` preconditions refer to the start state (as for the planner)
+    plan = [DataAction(name="SimSwitch", effects={"SIM_MODE": "b"}),
+            DataAction(name="SimCopy", effects={"SIM_COPY": "a"}),
+            DataAction(name="SimUse", effects={"SIM_USED": True}, preconditions={"SIM_MODE": "b", "SIM_COPY": "@SIM_MODE"})]
+    assert PlanSimulator(seed=5).simulate(plan, {"SIM_MODE": "a"}, 100).success_probability == 1.0
+    assert PlanSimulator(seed=5).simulate(plan, {"SIM_MODE": "c"}, 100).unmet_preconditions["SimUse"] == 100
@@ -0,0 +1,87 @@
+#! /usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+from time import perf_counter
+
+from action_graph.action import ActionStatus
+from action_graph.agent import Agent
+from action_graph.journal import Journal
+from action_graph.loader import DataAction
+
+
+def _actions(ai: Agent, executed: list, crash=None):
+    def handler(action, outcome):
+        executed.append(str(action))
+        if crash is not None and str(action) == "JrnStep2":
+            crash()
+        action.status = ActionStatus.SUCCESS
+
+    return [DataAction(ai, name="JrnStep1", effects={"JRN_A": True}, handler=handler),
+            DataAction(ai, name="JrnStep2", effects={"JRN_B": True}, preconditions={"JRN_A": True}, handler=handler),
+            DataAction(ai, name="JrnStep3", effects={"JRN_C": True}, preconditions={"JRN_B": True}, handler=handler)]
+
+
+def test():
+    directory = tempfile.mkdtemp()
+    try:
+        path, crashed = os.path.join(directory, 'agent.journal'), os.path.join(directory, 'crashed.journal')
+        goal = {"JRN_C": True}
+
+        # the process "crashes" while executing the second step: the journal as it is on disk then
+        journal = Journal(path)
+        ai, executed = Agent(journal=journal), []
+        ai.load_actions(_actions(ai, executed, crash=lambda: (journal.sync(), shutil.copy(path, crashed))))
+        ai.update_state({"JRN_START": 1})
+        for _ in ai.plan_and_execute(goal):
+            pass
+        assert executed == ["JrnStep1", "JrnStep2", "JrnStep3"]
+        journal.close()
+        assert Journal(path).goal is None, 'Finished plan resumed!'
+
+        # resume: the state and the rest of the plan, from the interrupted step on
+        with open(crashed, 'ab') as f:
+            f.write(b'\x10\x00\x00\x00torn')  # (a record cut short)
+        t0 = perf_counter()
+        journal = Journal(crashed)
+        ai, executed = Agent(journal=journal), []
+        ai.load_actions(_actions(ai, executed))
+        resumed_goal, remaining = ai.resume()
+        assert perf_counter() - t0 < 0.5
+        assert dict(ai.state) == {"JRN_START": 1, "JRN_A": True}, f'Incorrect State!'
+        assert resumed_goal == goal and [str(a) for a in remaining] == ["JrnStep2", "JrnStep3"], f'Incorrect Plan!'
+        for _ in ai.plan_and_execute(resumed_goal):
+            pass
+        assert executed == ["JrnStep2", "JrnStep3"], f'Completed steps executed again!'
+        journal.close()
+
+        # snapshots keep the journal (and its replay) bounded
+        journal = Journal(os.path.join(directory, 'counter.journal'), sync_interval=0, snapshot_every=100)
+        for i in range(1000):
+            journal.record_change("JRN_COUNTER", i)
+        journal.record_change("JRN_START")
+        journal.close()
+        assert os.path.getsize(journal.path) < 100 * 64
+        assert Journal(journal.path).state == {"JRN_COUNTER": 999}
+
+        # a step recorded as running (async) is done only once it succeeds; others may complete meanwhile
+        journal = Journal(os.path.join(directory, 'async.journal'), sync_interval=0)
+        plan = _actions(None, [])
+        journal.record_plan(goal, plan)
+        for step, status in zip(plan, (ActionStatus.RUNNING, ActionStatus.SUCCESS, ActionStatus.RUNNING)):
+            step.status = status
+            journal.record_outcome(step)
+        journal.record_outcome(plan[0], ActionStatus.FAILURE)
+        journal.record_outcome(plan[2], ActionStatus.SUCCESS)
+        journal.close()
+        assert [name for name, _ in Journal(journal.path).remaining_steps] == ["JrnStep1"], f'Unfinished step done!'
+
+        # closing ends the syncer right away (it does not wait for the rest of its interval)
+        journal = Journal(os.path.join(directory, 'slow.journal'), sync_interval=30)
+        journal.record_change("JRN_SLOW", True)
+        t0 = perf_counter()
+        journal.close()
+        assert perf_counter() - t0 < 1 and Journal(journal.path).state == {"JRN_SLOW": True}
+    finally:
+        shutil.rmtree(directory)
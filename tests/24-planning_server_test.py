@@ -0,0 +1,78 @@
+#! /usr/bin/env python3
+
+import os
+import shutil
+import socket
+import struct
+import tempfile
+
+from action_graph.action import Decrement, GreaterEqual
+from action_graph.loader import DataAction
+from action_graph.planner import Planner, PlanningFailedException
+from action_graph.server import PlanningClient, PlanningServer
+
+
+def _actions():
+    return [DataAction(name="SrvDrive", cost=2, effects={"SRV_AT": ...}, preconditions={"SRV_FUEL": True}),
+            DataAction(name="SrvRefuel", effects={"SRV_FUEL": True}),
+            DataAction(name="SrvFly", cost=10, effects={"SRV_AT": ...}),
+            DataAction(name="SrvShip", effects={"SRV_SHIPPED": True}, preconditions={"SRV_PARCEL": True}),
+            # numeric state variables
+            DataAction(name="SrvCharge", effects={"SRV_BATTERY": 100}),
+            DataAction(name="SrvDeliver", effects={"SRV_BATTERY": Decrement(30), "SRV_DELIVERED": True},
+                       preconditions={"SRV_BATTERY": GreaterEqual(30)})]
+
+
+def _unix_connection(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(path)
+    return sock
+
+
+def test():
+    directory = tempfile.mkdtemp()
+    addresses = [('127.0.0.1', 0)]
+    if hasattr(socket, 'AF_UNIX'):
+        addresses.append(os.path.join(directory, 'planner.sock'))
+    try:
+        for address in addresses:
+            server = PlanningServer(_actions(), address).start()
+            try:
+                with PlanningClient(server.address) as client:
+                    # same plan as a local planner
+                    expected = Planner(_actions()).generate_plan({"SRV_AT": "home"}, {"SRV_AT": "work"})
+                    plan = client.get_plan({"SRV_AT": "home"}, {"SRV_AT": "work"})
+                    assert [(s.name, s.cost, s.effects) for s in plan] == \
+                        [(str(a), a.cost, a.effects) for a in expected], f'Incorrect Plan!'
+                    assert [s.name for s in client.get_plan({"SRV_AT": "home"}, {"SRV_AT": "work"},
+                                                            avoid_actions=["SrvRefuel"])] == ["SrvFly"]
+
+                    # pipelined requests; answered in order
+                    plans = client.get_plans([({"SRV_AT": place}, {"SRV_FUEL": True}) for place in ("a", "b", "c")])
+                    assert [p[0].effects for p in plans] == [{"SRV_AT": "a"}, {"SRV_AT": "b"}, {"SRV_AT": "c"}]
+
+                    try:
+                        client.get_plan({"SRV_SHIPPED": True}, {})
+                        assert False, 'Planning failure not reported!'
+                    except PlanningFailedException:
+                        pass
+                    # numeric effects and comparisons (goals and steps)
+                    expected = Planner(_actions()).generate_plan({"SRV_DELIVERED": True}, {"SRV_BATTERY": 10})
+                    plan = client.get_plan({"SRV_DELIVERED": True}, {"SRV_BATTERY": 10})
+                    assert [(s.name, s.effects) for s in plan] == [(str(a), a.effects) for a in expected]
+                    assert plan[-1].effects["SRV_BATTERY"] == Decrement(30)
+                    assert [s.name for s in client.get_plan({"SRV_BATTERY": GreaterEqual(50)}, {})] == ["SrvCharge"]
+
+                    # the connection was reused for all requests
+                    assert server.connections == 1
+                # anything but an encoded request is refused
+                with socket.create_connection(server.address) if not isinstance(server.address, str) else \
+                        _unix_connection(server.address) as sock:
+                    payload = b'["t",[["object",[]]]]'
+                    sock.sendall(struct.pack('<I', len(payload)) + payload)
+                    sock.settimeout(5)
+                    assert sock.recv(1) == b'', 'Unknown type accepted!'
+            finally:
+                server.shutdown()
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,52 @@
+#! /usr/bin/env python3
+
+import threading
+import tracemalloc
+
+from action_graph.loader import DataAction
+from action_graph.plan_step import PlanStep
+from action_graph.planner import Planner
+
+
+def test():
+    actions = [DataAction(name="StpPower", effects={"STP_POWER": True, "STP_LOG": "powered"}),
+               DataAction(name="StpMove", effects={"STP_AT": ...}, preconditions={"STP_POWER": True})]
+
+    # actions do not start (or hold) a thread until they are executed
+    threads = threading.active_count()
+    copies = [actions[1].__copy__() for _ in range(100)]
+    assert threading.active_count() == threads and not copies[0].is_running() and copies[0]._join(0)
+
+    planner = Planner(actions)
+    plan = planner.generate_plan({"STP_AT": "dock"}, {})
+    steps = [PlanStep.of(step) for step in plan]
+    assert [s.name for s in steps] == ["StpPower", "StpMove"]
+    assert [s.effects for s in steps] == [a.effects for a in plan], f'Incorrect Action Outcome!'
+    # only the bound values are kept; the definitions are shared
+    assert steps[0].bound == () and steps[1].bound == (("STP_AT", "dock"),)
+    assert steps[1].action is actions[1] and steps[1].preconditions is actions[1].preconditions
+    try:
+        steps[1].bound = ()
+        assert False, 'PlanStep modified!'
+    except AttributeError:
+        pass
+    # executable again
+    assert [s.to_action() for s in steps] == plan
+    assert PlanStep.of(steps[1].to_action()) == steps[1]
+
+    # lifted plans are cached as PlanSteps; still instantiated per target value
+    assert [a.effects["STP_AT"] for a in planner.generate_lifted_plan({"STP_AT": "a"}, {})[-1:]] == ["a"]
+    assert [a.effects["STP_AT"] for a in planner.generate_lifted_plan({"STP_AT": "b"}, {})[-1:]] == ["b"]
+
+    # compact plans are a fraction of the size of the planned copies
+    def retained(make):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        kept = [make(i) for i in range(200)]
+        size = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        return size, kept
+
+    as_actions, _ = retained(lambda i: planner.generate_plan({"STP_AT": i}, {}))
+    as_steps, _ = retained(lambda i: [PlanStep.of(a) for a in planner.generate_plan({"STP_AT": i}, {})])
+    assert as_steps * 3 < as_actions, f'{as_steps} >= {as_actions} / 3'
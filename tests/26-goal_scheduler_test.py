@@ -0,0 +1,61 @@
+#! /usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import threading
+
+from action_graph.action import ActionStatus
+from action_graph.agent import Agent
+from action_graph.journal import Journal
+from action_graph.loader import DataAction
+from action_graph.telemetry import OpenMetricsExporter, RingBufferExporter, Telemetry
+
+
+def test():
+    executed, entered, gate, journaled = [], threading.Event(), threading.Event(), []
+    directory = tempfile.mkdtemp()
+    journal = Journal(os.path.join(directory, 'goals.journal'))
+
+    def run(action, outcome):
+        executed.append(str(action))
+        if str(action) == "GqStep2":
+            entered.set()
+            gate.wait(5)
+        if str(action) == "GqSafetyStop":  # the preempted goal is still unfinished in the journal
+            journaled.append((journal.goal, [(goal, [n for n, _ in steps]) for goal, steps in journal.suspended]))
+        action.status = ActionStatus.SUCCESS
+
+    ring, metrics = RingBufferExporter(), OpenMetricsExporter()
+    ai = Agent(telemetry=Telemetry([ring, metrics]), journal=journal)
+    ai.load_actions([DataAction(ai, name="GqStep1", effects={"GQ_A": True}, handler=run),
+                     DataAction(ai, name="GqStep2", effects={"GQ_B": True}, preconditions={"GQ_A": True}, handler=run),
+                     DataAction(ai, name="GqStep3", effects={"GQ_DONE": True}, preconditions={"GQ_B": True}, handler=run),
+                     DataAction(ai, name="GqSafetyStop", effects={"GQ_SAFE": True}, handler=run)])
+    ai.start_goal_scheduler()
+    try:
+        low = ai.submit_goal({"GQ_DONE": True})
+        assert entered.wait(5)
+        high = ai.submit_goal({"GQ_SAFE": True}, priority=10)
+        assert ai.pending_goals() == [high]
+        gate.set()
+        assert high.result(5) == ActionStatus.SUCCESS and low.result(5) == ActionStatus.SUCCESS
+    finally:
+        ai.stop_goal_scheduler()
+        journal.close()
+        shutil.rmtree(directory)
+
+    # preempted at the action boundary; then resumed with the rest of its plan
+    assert executed == ["GqStep1", "GqStep2", "GqSafetyStop", "GqStep3"], f'Incorrect Execution Order!'
+    assert (low.preemptions, high.preemptions) == (1, 0)
+    assert high.finished_at < low.finished_at and 0 <= high.queue_latency < 5
+    plan_records = [r for r in ring.records if r['type'] == 'plan']
+    assert plan_records[-1]['planning_time'] == 0.0, f'Plan not reused!'
+    # a preemption is neither a failure nor the end of the goal
+    assert [r['outcome'] for r in plan_records] == ['SUSPENDED', 'SUCCESS', 'SUCCESS']
+    assert journaled == [({"GQ_SAFE": True}, [({"GQ_DONE": True}, ["GqStep3"])])], f'{journaled}'
+    assert journal.goal is None and journal.suspended == []
+
+    goal_records = [r for r in ring.records if r['type'] == 'goal']
+    assert [(r['priority'], r['outcome'], r['preemptions']) for r in goal_records] == [(10, 'SUCCESS', 0), (0, 'SUCCESS', 1)]
+    assert 'action_graph_queue_latency_seconds_count{agent="Agent",priority="10"} 1' in metrics.render()
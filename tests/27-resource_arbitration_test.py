@@ -0,0 +1,88 @@
+#! /usr/bin/env python3
+
+import threading
+import time
+
+from action_graph.action import ActionFailedException, ActionStatus
+from action_graph.agent import Agent
+from action_graph.loader import DataAction
+from action_graph.resources import DeadlockException, ResourceManager, state_key
+
+
+def _run_all(calls):
+    errors = []
+
+    def run(call):
+        try:
+            call()
+        except Exception as ex:
+            errors.append(ex)
+
+    threads = [threading.Thread(target=run, args=(call,)) for call in calls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return errors
+
+
+def test():
+    manager = ResourceManager()
+    agents = [Agent(f"ResAgent{i}", resource_manager=manager) for i in range(2)]
+    running, overlaps = set(), []
+
+    def occupy(action, outcome):
+        running.add(str(action))
+        time.sleep(0.05)
+        overlaps.append(set(running))
+        running.discard(str(action))
+        action.status = ActionStatus.SUCCESS
+
+    # the same resource: one at a time
+    arm = [DataAction(ai, name=f"ResArm{i}", effects={f"RES_ARM{i}": True}, handler=occupy) for i, ai in enumerate(agents)]
+    for action in arm:
+        action.resources = ["arm"]
+    assert _run_all([lambda ai=ai, a=a: ai.execute_action(a) for ai, a in zip(agents, arm)]) == []
+    assert all(len(seen) == 1 for seen in overlaps), f'Conflicting actions overlapped!'
+    assert manager.statistics()["arm"]["contended"] == 1 and manager.statistics()["arm"]["acquisitions"] == 2
+
+    # writers of the same state key: one at a time; readers of a resource run together
+    overlaps.clear()
+    same_key = [DataAction(ai, name=f"ResWrite{i}", effects={"RES_SHARED": i}, handler=occupy) for i, ai in enumerate(agents)]
+    assert _run_all([lambda ai=ai, a=a: ai.execute_action(a) for ai, a in zip(agents, same_key)]) == []
+    assert all(len(seen) == 1 for seen in overlaps), f'Conflicting actions overlapped!'
+    assert manager.statistics()[state_key("RES_SHARED")]["contended"] == 1
+    together = threading.Barrier(2, timeout=5)
+
+    def read(action, outcome):
+        together.wait()  # both hold the shared claim at once
+        action.status = ActionStatus.SUCCESS
+
+    readers = [DataAction(ai, name=f"ResRead{i}", effects={f"RES_READ{i}": True}, handler=read) for i, ai in enumerate(agents)]
+    for action in readers:
+        action.shared_resources = ["camera"]
+    assert _run_all([lambda ai=ai, a=a: ai.execute_action(a) for ai, a in zip(agents, readers)]) == []
+
+    # each holds one resource and claims the other's: the second request is refused
+    holding = threading.Barrier(2, timeout=5)
+    deadlocks = []
+
+    def claim_more(action, outcome):
+        holding.wait()
+        try:
+            manager.acquire(action, [action.next_resource])
+            action.status = ActionStatus.SUCCESS
+        except DeadlockException:
+            deadlocks.append(str(action))
+            action.status = ActionStatus.FAILURE
+
+    crossed = []
+    for i, (first, second) in enumerate((("arm", "conveyor"), ("conveyor", "arm"))):
+        action = DataAction(agents[i], name=f"ResCross{i}", effects={f"RES_CROSS{i}": True}, handler=claim_more)
+        action.resources, action.next_resource = [first], second
+        crossed.append(action)
+    errors = _run_all([lambda ai=ai, a=a: ai.execute_action(a) for ai, a in zip(agents, crossed)])
+    assert len(deadlocks) == 1 and manager.deadlocks == 1, f'Deadlock not detected!'
+    assert len(errors) == 1 and isinstance(errors[0], ActionFailedException)
+    assert sorted(a.status.name for a in crossed) == ["FAILURE", "SUCCESS"]
+    assert manager.holders("arm") == [] and manager.holders("conveyor") == []
@@ -0,0 +1,25 @@
+#! /usr/bin/env python3
+
+import importlib.util
+import os
+
+spec = importlib.util.spec_from_file_location(
+    'harness', os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'harness.py'))
+harness = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(harness)
+
+
+def test():
+    # every engine plans as cheap (and valid) plans as the reference, where it finds one
+    report = harness.run(domains=200, seed=7)
+    assert set(report) == set(harness.ENGINES)
+    for name, stats in report.items():
+        assert stats['mismatches'] == 0, f'{name}: plans differ from the reference in {stats["mismatched_domains"]}'
+        assert stats['domains'] == 200 and stats['expanded'] > 0
+    reference = report['reference']
+    assert reference['domains'] - reference['failures'] - reference['invalid'] > 50, 'Too few plans compared!'
+
+    # an engine that drops the last step is caught
+    broken = dict(harness.ENGINES, broken=lambda planner, goal, state: planner.generate_plan(goal, state)[:-1])
+    report = harness.run(domains=50, seed=7, engines=broken)
+    assert report['broken']['mismatches'] > 0 and report['bidirectional']['mismatches'] == 0
@@ -0,0 +1,83 @@
+#! /usr/bin/env python3
+
+import time
+
+from action_graph.action import ActionStatus
+from action_graph.agent import Agent
+from action_graph.loader import DataAction
+
+CHECK_TIME = 0.1
+
+
+class _Checked(DataAction):
+    """Action with a slow runtime precondition check (e.g. a hardware query)"""
+
+    def __init__(self, agent=None, checks: list = None, passes: bool = True, **kwargs) -> None:
+        super().__init__(agent, **kwargs)
+        self.checks = checks
+        self.passes = passes
+
+    def check_runtime_precondition(self, outcome) -> bool:
+        time.sleep(CHECK_TIME)
+        self.checks.append(str(self))
+        return self.passes
+
+
+def test():
+    checks, executed = [], []
+
+    def run(action, outcome):
+        executed.append(str(action))
+        action.status = ActionStatus.SUCCESS
+
+    ai = Agent()
+    chain = [_Checked(ai, checks, name=f"PfStep{i}", effects={f"PF_S{i}": True},
+                      preconditions={f"PF_S{i - 1}": True} if i else {}, handler=run) for i in range(4)]
+    for action in chain:
+        action.runtime_check_validity = 10.0
+    ai.load_actions(chain)
+
+    # settings of an instance are kept by the planned copies
+    chain[0].run_in_process, chain[0].cancel_grace = True, 2.5
+    planned = ai.get_plan({"PF_S0": True}, {})[0]
+    assert planned is not chain[0] and planned.run_in_process and planned.cancel_grace == 2.5
+    assert planned.checks is checks and planned.runtime_check_validity == 10.0
+    del chain[0].run_in_process, chain[0].cancel_grace
+
+    # the checks of the plan run concurrently; their results are used by execute_action
+    plan = ai.get_plan({"PF_S3": True}, {})
+    t0 = time.perf_counter()
+    assert ai.preflight(plan) == []
+    assert time.perf_counter() - t0 < CHECK_TIME * 3, f'Checks not concurrent!'
+    assert sorted(checks) == [f"PfStep{i}" for i in range(4)]
+    ai.execute_plan(plan)
+    assert len(checks) == 4 and executed == [str(a) for a in plan], f'Checks repeated!'
+
+    # without a validity window, the check is repeated right before execution
+    checks.clear()
+    step = _Checked(ai, checks, name="PfOnce", effects={"PF_ONCE": True}, handler=run)
+    ai.preflight([step])
+    ai.execute_action(step)
+    assert checks == ["PfOnce", "PfOnce"]
+
+    # each step is pre-flighted once, not again with every replan
+    checks.clear(), executed.clear()
+    for action in chain:
+        action.runtime_check_validity = 0.0
+    ai.state = {}
+    for _ in ai.plan_and_execute({"PF_S3": True}, preflight=True):
+        pass
+    assert executed == [f"PfStep{i}" for i in range(4)]
+    assert sorted(checks) == sorted([f"PfStep{i}" for i in range(4)] * 2), f'{checks}'
+
+    # a failed check is found before anything is executed; the plan is replaced
+    checks.clear(), executed.clear()
+    ai = Agent()
+    ai.load_actions([_Checked(ai, checks, name="PfMove", effects={"PF_AT": True}, handler=run),
+                     _Checked(ai, checks, name="PfGrip", effects={"PF_HELD": True}, preconditions={"PF_AT": True},
+                              passes=False, handler=run),
+                     _Checked(ai, checks, name="PfGripSlow", cost=5, effects={"PF_HELD": True},
+                              preconditions={"PF_AT": True}, handler=run)])
+    plans = [[str(a) for a in plan] for plan in ai.plan_and_execute({"PF_HELD": True}, preflight=True)]
+    assert plans[0] == ["PfMove", "PfGripSlow"], f'Failed check not found before execution!'
+    assert executed == ["PfMove", "PfGripSlow"]